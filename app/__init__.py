@@ -20,6 +20,104 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # We'll handle expiration in tokens
     
+    # Video storage configuration
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local')  # local or s3
+    app.config['VIDEO_STORE_DIR'] = os.environ.get('VIDEO_STORE_DIR', os.path.join('data', 'videos'))
+    app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET', '')
+    app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', 'videos')
+    app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL', '')  # e.g. MinIO at http://minio:9000
+    app.config['S3_REGION'] = os.environ.get('S3_REGION', '')
+    app.config['S3_ACCESS_KEY_ID'] = os.environ.get('S3_ACCESS_KEY_ID', '')
+    app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+    app.config['S3_MULTIPART_CHUNK_SIZE'] = int(os.environ.get('S3_MULTIPART_CHUNK_SIZE', 64 * 1024 * 1024))  # 64MB
+    app.config['S3_MAX_CONCURRENCY'] = int(os.environ.get('S3_MAX_CONCURRENCY', 8))
+    
+    # Media probing configuration
+    app.config['FFPROBE_BIN'] = os.environ.get('FFPROBE_BIN', 'ffprobe')
+    app.config['PROBE_WORKERS'] = int(os.environ.get('PROBE_WORKERS', 2))
+    app.config['PROBE_BATCH_SIZE'] = int(os.environ.get('PROBE_BATCH_SIZE', 50))
+    app.config['PROBE_FLUSH_SECONDS'] = float(os.environ.get('PROBE_FLUSH_SECONDS', 2))
+    
+    # HLS packaging configuration
+    app.config['FFMPEG_BIN'] = os.environ.get('FFMPEG_BIN', 'ffmpeg')
+    app.config['HLS_CACHE_DIR'] = os.environ.get('HLS_CACHE_DIR', os.path.join('data', 'hls'))
+    app.config['HLS_SEGMENT_SECONDS'] = int(os.environ.get('HLS_SEGMENT_SECONDS', 6))
+    app.config['HLS_WORKERS'] = int(os.environ.get('HLS_WORKERS', 2))
+    app.config['HLS_WAIT_SECONDS'] = float(os.environ.get('HLS_WAIT_SECONDS', 20))  # then 503 + Retry-After
+    app.config['HLS_PACKAGE_TIMEOUT'] = int(os.environ.get('HLS_PACKAGE_TIMEOUT', 3600))
+    
+    # Rendition ladder (height:kbps) and transcoding pool configuration
+    app.config['RENDITIONS_DIR'] = os.environ.get('RENDITIONS_DIR', os.path.join('data', 'renditions'))
+    app.config['RENDITION_LADDER'] = os.environ.get('RENDITION_LADDER', '1080:5000,720:2800,360:800')
+    app.config['RENDITION_AUDIO_BITRATE'] = int(os.environ.get('RENDITION_AUDIO_BITRATE', 128000))
+    app.config['TRANSCODE_WORKERS'] = int(os.environ.get('TRANSCODE_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    app.config['TRANSCODE_THREADS'] = int(os.environ.get('TRANSCODE_THREADS', 2))  # ffmpeg threads per job
+    app.config['TRANSCODE_PRESET'] = os.environ.get('TRANSCODE_PRESET', 'veryfast')
+    app.config['TRANSCODE_TIMEOUT'] = int(os.environ.get('TRANSCODE_TIMEOUT', 6 * 3600))
+    
+    # Faststart normalization of uploads with moov after the media data
+    app.config['FASTSTART_WORKERS'] = int(os.environ.get('FASTSTART_WORKERS', 1))
+    app.config['FASTSTART_TIMEOUT'] = int(os.environ.get('FASTSTART_TIMEOUT', 3600))
+    
+    # Low-resolution scrubbing proxies (PROXY_KEYINT=1 makes them all-intra)
+    app.config['PROXY_CACHE_DIR'] = os.environ.get('PROXY_CACHE_DIR', os.path.join('data', 'proxies'))
+    app.config['PROXY_HEIGHT'] = int(os.environ.get('PROXY_HEIGHT', 360))
+    app.config['PROXY_KEYINT'] = int(os.environ.get('PROXY_KEYINT', 10))  # frames between key frames
+    app.config['PROXY_CRF'] = int(os.environ.get('PROXY_CRF', 30))
+    app.config['PROXY_WORKERS'] = int(os.environ.get('PROXY_WORKERS', 1))
+    app.config['PROXY_THREADS'] = int(os.environ.get('PROXY_THREADS', 2))  # ffmpeg threads per job
+    app.config['PROXY_WAIT_SECONDS'] = float(os.environ.get('PROXY_WAIT_SECONDS', 2))  # then 503 + Retry-After
+    app.config['PROXY_TIMEOUT'] = int(os.environ.get('PROXY_TIMEOUT', 3600))
+    
+    # Keyframe seek index sidecars
+    app.config['KEYFRAME_INDEX_DIR'] = os.environ.get('KEYFRAME_INDEX_DIR', os.path.join('data', 'keyframes'))
+    app.config['KEYFRAME_INDEX_WORKERS'] = int(os.environ.get('KEYFRAME_INDEX_WORKERS', 2))
+    
+    # In-memory cache of hot video chunks, per worker process (0 disables it)
+    app.config['CHUNK_CACHE_BYTES'] = int(os.environ.get('CHUNK_CACHE_BYTES', 256 * 1024 * 1024))  # 256MB
+    app.config['CHUNK_CACHE_CHUNK_SIZE'] = int(os.environ.get('CHUNK_CACHE_CHUNK_SIZE', 1024 * 1024))  # 1MB
+    app.config['CHUNK_CACHE_READ_AHEAD'] = int(os.environ.get('CHUNK_CACHE_READ_AHEAD', 4))  # chunks
+    app.config['CHUNK_CACHE_HOT_REQUESTS'] = int(os.environ.get('CHUNK_CACHE_HOT_REQUESTS', 3))
+    app.config['CHUNK_CACHE_HOT_WINDOW_SECONDS'] = float(os.environ.get('CHUNK_CACHE_HOT_WINDOW_SECONDS', 60))
+    
+    # Batch frame extraction
+    app.config['FRAMES_DIR'] = os.environ.get('FRAMES_DIR', os.path.join('data', 'frames'))
+    app.config['FRAME_WORKERS'] = int(os.environ.get('FRAME_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    app.config['FRAME_THREADS'] = int(os.environ.get('FRAME_THREADS', 2))  # ffmpeg threads per batch
+    app.config['FRAME_PROGRESS_SECONDS'] = float(os.environ.get('FRAME_PROGRESS_SECONDS', 2))
+    app.config['FRAME_INSERT_BATCH_SIZE'] = int(os.environ.get('FRAME_INSERT_BATCH_SIZE', 1000))
+    app.config['FRAME_EXTRACT_TIMEOUT'] = int(os.environ.get('FRAME_EXTRACT_TIMEOUT', 6 * 3600))
+    app.config['FRAME_STORAGE'] = os.environ.get('FRAME_STORAGE', 'files')  # default batch format: files or pack
+    app.config['FRAME_MOTION_THRESHOLD'] = float(os.environ.get('FRAME_MOTION_THRESHOLD', 0.02))  # auto batches
+    app.config['FRAME_MOTION_MAX_GAP_SECONDS'] = float(os.environ.get('FRAME_MOTION_MAX_GAP_SECONDS', 300))
+    app.config['FRAME_DEDUPE'] = os.environ.get('FRAME_DEDUPE', 'tag')  # near-duplicates: off, tag or skip
+    app.config['FRAME_DEDUPE_DISTANCE'] = int(os.environ.get('FRAME_DEDUPE_DISTANCE', 5))  # Hamming bits of 64
+    app.config['FRAME_DEDUPE_WINDOW'] = int(os.environ.get('FRAME_DEDUPE_WINDOW', 8))  # recent frames compared
+    
+    # Single-frame snapshots, cached per (content, offset, size, quality)
+    app.config['SNAPSHOT_CACHE_DIR'] = os.environ.get('SNAPSHOT_CACHE_DIR', os.path.join('data', 'snapshots'))
+    app.config['SNAPSHOT_WORKERS'] = int(os.environ.get('SNAPSHOT_WORKERS', os.cpu_count() or 2))
+    app.config['SNAPSHOT_TIMEOUT'] = int(os.environ.get('SNAPSHOT_TIMEOUT', 60))
+    
+    # Frame downloads in another format or size, cached per (frame, format, quality, size)
+    app.config['FRAME_VARIANT_CACHE_DIR'] = os.environ.get('FRAME_VARIANT_CACHE_DIR', os.path.join('data', 'frame_variants'))
+    app.config['FRAME_CONVERT_WORKERS'] = int(os.environ.get('FRAME_CONVERT_WORKERS', os.cpu_count() or 2))
+    
+    # Timeline hover previews: sprite sheets of COLUMNS x ROWS thumbnails with a WebVTT track
+    app.config['SPRITE_CACHE_DIR'] = os.environ.get('SPRITE_CACHE_DIR', os.path.join('data', 'sprites'))
+    app.config['SPRITE_WIDTH'] = int(os.environ.get('SPRITE_WIDTH', 160))
+    app.config['SPRITE_COLUMNS'] = int(os.environ.get('SPRITE_COLUMNS', 10))
+    app.config['SPRITE_ROWS'] = int(os.environ.get('SPRITE_ROWS', 10))
+    app.config['SPRITE_INTERVAL_SECONDS'] = float(os.environ.get('SPRITE_INTERVAL_SECONDS', 2))  # shortest interval
+    app.config['SPRITE_MAX_THUMBNAILS'] = int(os.environ.get('SPRITE_MAX_THUMBNAILS', 200))  # interval grows past this
+    app.config['SPRITE_QUALITY'] = int(os.environ.get('SPRITE_QUALITY', 5))
+    app.config['SPRITE_WORKERS'] = int(os.environ.get('SPRITE_WORKERS', 1))
+    app.config['SPRITE_WAIT_SECONDS'] = float(os.environ.get('SPRITE_WAIT_SECONDS', 2))  # then 503 + Retry-After
+    
+    # Resumable upload configuration
+    app.config['UPLOAD_CHUNK_SIZE'] = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # 8MB
+    app.config['UPLOAD_SESSION_TTL_SECONDS'] = int(os.environ.get('UPLOAD_SESSION_TTL_SECONDS', 24 * 3600))
+    
     # Telegram Bot Configuration
     app.config['TELEGRAM_BOT_TOKEN'] = os.environ.get('TELEGRAM_BOT_TOKEN', '')
     app.config['TELEGRAM_WEBHOOK_SECRET'] = os.environ.get('TELEGRAM_WEBHOOK_SECRET', 'your-webhook-secret')
@@ -30,6 +128,29 @@ def create_app():
     CORS(app)
     jwt.init_app(app)
     
+    from app.services.media_probe import probe_pipeline
+    probe_pipeline.init_app(app)
+    from app.services.hls_packager import hls_packager
+    hls_packager.init_app(app)
+    from app.services.transcoder import transcoder
+    transcoder.init_app(app)
+    from app.services.chunk_cache import chunk_cache
+    chunk_cache.init_app(app)
+    from app.services.keyframe_index import keyframe_indexer
+    keyframe_indexer.init_app(app)
+    from app.services.proxy_generator import proxy_generator
+    proxy_generator.init_app(app)
+    from app.services.faststart import faststart_normalizer
+    faststart_normalizer.init_app(app)
+    from app.services.frame_extractor import frame_extractor
+    frame_extractor.init_app(app)
+    from app.services.snapshot_cache import snapshot_cache
+    snapshot_cache.init_app(app)
+    from app.services.frame_converter import frame_converter
+    frame_converter.init_app(app)
+    from app.services.sprite_generator import sprite_generator
+    sprite_generator.init_app(app)
+    
     # Configure JWT
     from app.utils.auth_utils import is_token_revoked
     jwt.token_in_blocklist_loader(is_token_revoked)
@@ -38,8 +159,10 @@ def create_app():
     from app.controllers import main_bp, api_bp, auth_bp
     from app.controllers.web_auth_controller import web_auth_bp
     from app.controllers.video_controller import video_bp
+    from app.controllers.upload_controller import upload_bp
     from app.controllers.recording_controller import recording_bp
     from app.controllers.project_controller import project_bp
+    from app.controllers.frame_controller import frame_bp
     from app.controllers.telegram_controller import bp as telegram_bp
     from app.controllers.webhook_controller import bp as webhook_bp
     
@@ -51,8 +174,10 @@ def create_app():
     
     # Register new API blueprints
     app.register_blueprint(video_bp, url_prefix='/api/v2')
+    app.register_blueprint(upload_bp, url_prefix='/api/v2')
     app.register_blueprint(recording_bp, url_prefix='/api/v2')
     app.register_blueprint(project_bp, url_prefix='/api/v2')
+    app.register_blueprint(frame_bp, url_prefix='/api/v2')
     
     # Register Telegram integration blueprints
     app.register_blueprint(telegram_bp)  # Telegram API routes (/api/telegram/ingest)
@@ -60,4 +185,8 @@ def create_app():
     
     # Note: Server blueprints removed - using new API structure
     
+    # Register CLI commands
+    from app.commands import videos_cli
+    app.cli.add_command(videos_cli)
+    
     return app
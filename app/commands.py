@@ -0,0 +1,141 @@
+"""Flask CLI commands (``flask videos ...``)"""
+from app import db
+from app.models import Project, VideoBlob
+from app.services import bulk_import
+from app.services.faststart import faststart_normalizer
+from app.services.storage import storage_for
+from app.utils import mp4_parser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask.cli import AppGroup
+import click
+import hashlib
+import os
+import time
+
+videos_cli = AppGroup('videos', help='Video library maintenance.')
+
+@videos_cli.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--project-id', type=int, help='Project the imported videos are assigned to.')
+@click.option('--user-id', type=int, help='User recorded as the uploader.')
+@click.option('--workers', type=int, default=os.cpu_count(), show_default=True,
+              help='Hashing processes.')
+@click.option('--batch-size', type=int, default=500, show_default=True,
+              help='Videos inserted per transaction.')
+@click.option('--state-file', type=click.Path(dir_okay=False),
+              help='Where hashing progress is kept for resuming [default: data/imports/<dir hash>.jsonl].')
+@click.option('--link/--copy', default=False,
+              help='Hard-link files into a local store instead of copying them.')
+def import_videos(directory, project_id, user_id, workers, batch_size, state_file, link):
+    """Import every video file under DIRECTORY.
+
+    Content already in the library is skipped, so the command can be re-run
+    on the same tree, and a run that was interrupted picks up where it
+    stopped without hashing the same files again.
+    """
+    if project_id is not None and Project.query.get(project_id) is None:
+        raise click.BadParameter(f'Project {project_id} does not exist', param_hint='--project-id')
+
+    root = os.path.abspath(directory)
+    if state_file is None:
+        state_file = os.path.join('data', 'imports', hashlib.sha1(root.encode()).hexdigest()[:16] + '.jsonl')
+    state = bulk_import.ImportState(state_file)
+
+    started = time.monotonic()
+    files = list(bulk_import.scan_directory(root))
+    total_bytes = sum(size for _, size, _ in files)
+    click.echo(f'Found {len(files)} video files ({total_bytes / 1024 ** 3:.1f} GB) under {root}')
+
+    stats = dict(imported=0, known=0, duplicate=0, failed=0, resumed=0, hashed_bytes=0)
+    seen = set()
+    batch = []
+
+    def flush():
+        state.flush()
+        known = bulk_import.known_checksums({entry['checksum'] for entry in batch})
+        new = []
+        for entry in batch:
+            if entry['checksum'] in known:
+                stats['known'] += 1
+            elif entry['checksum'] in seen:
+                stats['duplicate'] += 1
+            else:
+                seen.add(entry['checksum'])
+                new.append(entry)
+        imported = bulk_import.store_batch(new, project_id=project_id, user_id=user_id, link=link, workers=workers)
+        stats['imported'] += len(imported)
+        stats['failed'] += len(new) - len(imported)
+        batch.clear()
+
+    def add(entry, bar):
+        batch.append(entry)
+        bar.update(entry['size'])
+        if len(batch) >= batch_size:
+            flush()
+
+    pending = []
+    with click.progressbar(length=total_bytes, label='Importing', show_pos=False) as bar:
+        for path, size, mtime_ns in files:
+            entry = state.lookup(path, size, mtime_ns)
+            if entry is None:
+                pending.append((path, mtime_ns))
+            else:
+                stats['resumed'] += 1
+                add(entry, bar)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(bulk_import.hash_file, path): mtime_ns for path, mtime_ns in pending}
+            for future in as_completed(futures):
+                try:
+                    entry = dict(future.result(), mtime_ns=futures[future])
+                except Exception as e:
+                    stats['failed'] += 1
+                    click.echo(f'\nCould not read a file: {e}', err=True)
+                    continue
+                state.record(entry)
+                stats['hashed_bytes'] += entry['size']
+                add(entry, bar)
+        if batch:
+            flush()
+    state.close()
+
+    elapsed = time.monotonic() - started
+    click.echo(
+        f"Imported {stats['imported']} videos in {elapsed:.1f}s: "
+        f"{stats['known']} already in the library, {stats['duplicate']} duplicates, "
+        f"{stats['failed']} failed, {stats['resumed']} resumed from {state_file}"
+    )
+    click.echo(
+        f"Throughput: {len(files) / elapsed if elapsed else 0:.1f} files/s, "
+        f"{stats['hashed_bytes'] / 1024 ** 2 / elapsed if elapsed else 0:.1f} MB/s hashed"
+    )
+
+@videos_cli.command('faststart')
+@click.option('--dry-run', is_flag=True, help='Only list the content that would be rewritten.')
+def faststart_videos(dry_run):
+    """Move moov to the front of stored MP4/MOV content that has it at the end.
+
+    Uploads are normalized as they arrive, this catches up on content stored
+    before that or imported in bulk.
+    """
+    blobs = [(blob.checksum, blob.stored_path) for blob in VideoBlob.query.order_by(VideoBlob.id)]
+    normalized = skipped = failed = 0
+    with click.progressbar(blobs, label='Checking') as bar:
+        for checksum, location in bar:
+            local_path = storage_for(location).local_path(location)
+            if not local_path or not os.path.exists(local_path) or mp4_parser.faststart_muxer(local_path) is None:
+                skipped += 1
+                continue
+            if dry_run:
+                click.echo(f'\n{checksum} {local_path}')
+                normalized += 1
+                continue
+            try:
+                if faststart_normalizer.normalize(checksum, location):
+                    normalized += 1
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                click.echo(f'\nCould not normalize {checksum}: {e}', err=True)
+    verb = 'Would normalize' if dry_run else 'Normalized'
+    click.echo(f'{verb} {normalized} of {len(blobs)} stored files, {skipped} already faststart or remote, {failed} failed')
@@ -0,0 +1,343 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app import db
+from app.models import Frame, FrameBatch, Video
+from app.models.frame import FrameType
+from app.schemas import FrameSchema, FrameBatchSchema, FrameBatchStatusSchema, FrameSnapshotSchema, FrameSearchSchema, FrameDownloadSchema
+from app.services import frame_pack
+from app.services.frame_converter import FORMATS, frame_converter, variant_format, variant_key
+from app.services.frame_extractor import frame_extractor
+from app.services.snapshot_cache import SnapshotError, snapshot_cache, snapshot_key
+from app.utils import http_cache, range_utils
+from app.utils.pagination import InvalidCursor, keyset_page
+from app.utils.zip_stream import ZipStream
+from marshmallow import ValidationError
+from urllib.parse import quote
+import os
+import zlib
+
+frame_bp = Blueprint('frame_api', __name__)
+frames_schema = FrameSchema(many=True)
+frame_batch_schema = FrameBatchSchema()
+frame_batch_status_schema = FrameBatchStatusSchema()
+frame_snapshot_schema = FrameSnapshotSchema()
+frame_search_schema = FrameSearchSchema()
+frame_download_schema = FrameDownloadSchema()
+
+@frame_bp.route('/frames', methods=['GET'])
+def search_frames():
+    """Search frames with filters, paged by cursor"""
+    try:
+        search_params = frame_search_schema.load(request.args)
+        
+        query = Frame.query
+        
+        if search_params.get('video_id'):
+            query = query.filter(Frame.video_id == search_params['video_id'])
+        
+        if search_params.get('batch_id'):
+            query = query.filter(Frame.batch_id == search_params['batch_id'])
+        
+        if search_params.get('frame_type'):
+            query = query.filter(Frame.frame_type == FrameType(search_params['frame_type']))
+        
+        if search_params.get('user_id'):
+            query = query.filter(Frame.user_id == search_params['user_id'])
+        
+        if search_params.get('project_id'):
+            query = query.filter(Frame.project_id == search_params['project_id'])
+        
+        if search_params.get('min_offset') is not None:
+            query = query.filter(Frame.offset_seconds >= search_params['min_offset'])
+        
+        if search_params.get('max_offset') is not None:
+            query = query.filter(Frame.offset_seconds <= search_params['max_offset'])
+        
+        if search_params.get('min_quality') is not None:
+            query = query.filter(Frame.quality >= search_params['min_quality'])
+        
+        if search_params.get('max_quality') is not None:
+            query = query.filter(Frame.quality <= search_params['max_quality'])
+        
+        if search_params.get('created_after'):
+            query = query.filter(Frame.created_at >= search_params['created_after'])
+        
+        if search_params.get('created_before'):
+            query = query.filter(Frame.created_at <= search_params['created_before'])
+        
+        if search_params['collapse_duplicates']:
+            query = query.filter(Frame.is_duplicate.is_(False))
+        
+        # Keyset pagination on (sort key, id), each page is an index range scan however deep it is
+        sort_by = search_params['sort_by']
+        sort_order = search_params['sort_order']
+        per_page = search_params['per_page']
+        frames, next_cursor = keyset_page(
+            query, getattr(Frame, sort_by), Frame.id, sort_order == 'desc', per_page,
+            cursor=search_params.get('cursor'), sort=f'{sort_by}:{sort_order}'
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': frames_schema.dump(frames),
+            'pagination': {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/snapshot', methods=['GET'])
+def get_frame_snapshot():
+    """JPEG still of a video at an offset, decoded once per content and served from cache"""
+    try:
+        data = frame_snapshot_schema.load(request.args.to_dict())
+        video = db.session.get(Video, data['video_id'])
+        if video is None:
+            return jsonify({'status': 'error', 'message': 'Video not found'}), 404
+        if video.duration_seconds is not None and data['offset_seconds'] >= video.duration_seconds:
+            return jsonify({'status': 'error', 'message': 'offset_seconds is past the end of the video'}), 400
+        
+        # The cache key is the ETag, a revalidation never needs the snapshot itself
+        params = (data['offset_seconds'], data.get('width'), data.get('height'), data['quality'])
+        etag = snapshot_key(video.checksum, *params)
+        if http_cache.is_fresh(etag):
+            return http_cache.not_modified(etag)
+        
+        _, path = snapshot_cache.get(video, *params)
+        with open(path, 'rb') as f:
+            response = Response(f.read(), mimetype='image/jpeg')
+        response.headers['Cache-Control'] = 'no-cache'
+        return http_cache.set_validators(response, etag), 200
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except SnapshotError as e:
+        return jsonify({'status': 'error', 'message': f'Snapshot cannot be decoded: {e}'}), 422
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/<int:frame_id>/image', methods=['GET'])
+def get_frame_image(frame_id):
+    """Encoded image of a frame, whether stored as a file or in a batch pack"""
+    try:
+        frame = Frame.query.get_or_404(frame_id)
+        
+        etag, last_modified = http_cache.frame_validators(frame)
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        response = _frame_response(frame)
+        return http_cache.set_validators(response, etag, last_modified), 200
+        
+    except (FileNotFoundError, IndexError):
+        return jsonify({'status': 'error', 'message': 'Frame image not found'}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/<int:frame_id>/download', methods=['GET'])
+def download_frame(frame_id):
+    """A frame as stored, or converted to another format or size and served from cache"""
+    try:
+        data = frame_download_schema.load(request.args.to_dict())
+        frame = Frame.query.get_or_404(frame_id)
+        fmt, width, height = data['format'], data.get('width'), data.get('height')
+        _, extension, mimetype = FORMATS[variant_format(fmt)]
+        download_name = f'{os.path.splitext(frame.filename)[0]}.{extension}'
+        disposition = 'attachment' if data['as_attachment'] else 'inline'
+        headers = {'Content-Disposition': f"{disposition}; filename*=UTF-8''{quote(download_name)}"}
+        
+        if fmt == 'original' and not width and not height:
+            etag, last_modified = http_cache.frame_validators(frame)
+            if http_cache.is_fresh(etag, last_modified):
+                return http_cache.not_modified(etag, last_modified)
+            response = _frame_response(frame)
+            response.headers.update(headers)
+            return http_cache.set_validators(response, etag, last_modified), 200
+        
+        # The cache key is the ETag, a revalidation never needs the variant itself
+        etag = variant_key(frame, fmt, data['quality'], width, height)
+        if http_cache.is_fresh(etag):
+            return http_cache.not_modified(etag)
+        
+        _, path = frame_converter.get(frame, fmt, data['quality'], width, height)
+        with open(path, 'rb') as f:
+            response = Response(f.read(), mimetype=mimetype, headers=headers)
+        response.headers['Cache-Control'] = 'no-cache'
+        return http_cache.set_validators(response, etag), 200
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except (FileNotFoundError, IndexError):
+        return jsonify({'status': 'error', 'message': 'Frame image not found'}), 404
+    except OSError as e:
+        # Pillow could not decode the stored image
+        return jsonify({'status': 'error', 'message': f'Frame cannot be converted: {e}'}), 422
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def _frame_response(frame):
+    """The stored JPEG of a frame, whether a file or a slice of a batch pack"""
+    # A packed frame is a byte range of the pack, sent like any file range
+    path, offset, length = frame_pack.resolve(frame.file_path, frame.file_size)
+    body = range_utils.file_body(request.environ, path, offset, length)
+    return Response(body, mimetype='image/jpeg', headers={'Content-Length': str(length)},
+                    direct_passthrough=True)
+
+@frame_bp.route('/frames/batches', methods=['POST'])
+def create_frame_batch():
+    """Extract frames of a video at a fixed interval in the background"""
+    try:
+        data = frame_batch_schema.load(request.get_json(silent=True) or {})
+        video = db.session.get(Video, data['video_id'])
+        if video is None:
+            return jsonify({'status': 'error', 'message': 'Video not found'}), 404
+        
+        batch = frame_extractor.create_batch(video, data)
+        return jsonify({
+            'status': 'success',
+            'message': 'Frame extraction queued',
+            'data': frame_batch_status_schema.dump(batch)
+        }), 202
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/batches/<int:batch_id>', methods=['GET'])
+def get_frame_batch(batch_id):
+    """Progress and result of a frame batch"""
+    try:
+        batch = FrameBatch.query.get_or_404(batch_id)
+        
+        data = frame_batch_status_schema.dump(batch)
+        etag, last_modified = http_cache.record_validators(batch, data)
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        response = jsonify({'status': 'success', 'data': data})
+        return http_cache.set_validators(response, etag, last_modified), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/batches/<int:batch_id>/frames', methods=['GET'])
+def get_frame_batch_frames(batch_id):
+    """Frames extracted so far, in sampling order"""
+    try:
+        batch = FrameBatch.query.get_or_404(batch_id)
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 100, type=int), 1000)
+        
+        frames = batch.frames
+        if request.args.get('collapse_duplicates', 'false').lower() in ('1', 'true', 'yes'):
+            # Near-duplicates point at their original in metadata.duplicate_of
+            frames = frames.filter(Frame.is_duplicate.is_(False))
+        paginated = frames.order_by(Frame.batch_index).paginate(
+            page=page,
+            per_page=per_page,
+            error_out=False
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': frames_schema.dump(paginated.items),
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': paginated.total,
+                'pages': paginated.pages,
+                'has_next': paginated.has_next,
+                'has_prev': paginated.has_prev
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@frame_bp.route('/frames/batches/<int:batch_id>/archive', methods=['GET'])
+def download_frame_batch(batch_id):
+    """ZIP of a batch's frames, streamed from the frame files with range support"""
+    try:
+        batch = FrameBatch.query.get_or_404(batch_id)
+        if not batch.is_completed:
+            return jsonify({'status': 'error', 'message': 'Frame batch is still being extracted'}), 409
+        
+        # Frames do not change once a batch is complete, its status versions the archive
+        etag, last_modified = http_cache.record_validators(batch, frame_batch_status_schema.dump(batch))
+        etag = f'{etag}-zip'
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        rows = db.session.query(
+            Frame.filename, Frame.file_path, Frame.file_size, Frame.frame_metadata, Frame.created_at
+        ).filter(Frame.batch_id == batch.id).order_by(Frame.batch_index)
+        archive = ZipStream(
+            (filename, *frame_pack.resolve(file_path, file_size), _frame_crc32(file_path, metadata), created_at)
+            for filename, file_path, file_size, metadata, created_at in rows
+        )
+        return _archive_response(archive, etag, last_modified, f'{batch.batch_name}.zip')
+    except FileNotFoundError:
+        return jsonify({'status': 'error', 'message': 'Frame files not found'}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def _frame_crc32(file_path, metadata):
+    """CRC-32 recorded at extraction, computed for frames extracted before it was"""
+    crc = (metadata or {}).get('crc32')
+    return crc if crc is not None else zlib.crc32(frame_pack.read_frame(file_path))
+
+def _archive_response(archive, etag, last_modified, download_name):
+    """Serve a streamed archive whole or by byte ranges, resumable with If-Range"""
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': f"attachment; filename*=UTF-8''{quote(download_name)}"
+    }
+    ranges = []
+    if http_cache.if_range_matches(etag, last_modified):
+        ranges = range_utils.requested_ranges(request.range, archive.size)
+    if ranges is None:
+        headers['Content-Range'] = f'bytes */{archive.size}'
+        return http_cache.set_validators(Response(status=416, headers=headers), etag, last_modified)
+    
+    if len(ranges) > 1:
+        body, content_type, length = range_utils.multipart_byteranges(
+            archive.iter_range, ranges, archive.size, 'application/zip'
+        )
+        headers['Content-Length'] = str(length)
+        response = Response(stream_with_context(body), status=206, content_type=content_type,
+                            headers=headers, direct_passthrough=True)
+        return http_cache.set_validators(response, etag, last_modified)
+    
+    status = 200
+    start, stop = 0, archive.size
+    if ranges:
+        (start, stop), = ranges
+        status = 206
+        headers['Content-Range'] = range_utils.content_range(start, stop, archive.size)
+    headers['Content-Length'] = str(stop - start)
+    response = Response(stream_with_context(archive.iter_range(start, stop - start)), status=status,
+                        mimetype='application/zip', headers=headers, direct_passthrough=True)
+    return http_cache.set_validators(response, etag, last_modified)
+
+@frame_bp.route('/frames/batches/<int:batch_id>', methods=['DELETE'])
+def delete_frame_batch(batch_id):
+    """Delete a batch with its frames"""
+    try:
+        batch = FrameBatch.query.get_or_404(batch_id)
+        if frame_extractor.is_running(batch.id):
+            return jsonify({'status': 'error', 'message': 'Frame batch is still being extracted'}), 409
+        
+        frame_extractor.discard(batch)
+        return jsonify({'status': 'success', 'message': 'Frame batch deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Project, ProjectMember, User
 from app.schemas import ProjectSchema, ProjectCreateSchema, ProjectMemberSchema
+from app.utils import http_cache
 from marshmallow import ValidationError
 from datetime import datetime
 from uuid import uuid4
@@ -68,10 +69,17 @@ def get_project(project_id):
     """Get a specific project by ID"""
     try:
         project = Project.query.get_or_404(project_id)
-        return jsonify({
+        
+        data = project_schema.dump(project)
+        etag, last_modified = http_cache.record_validators(project, data)
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        response = jsonify({
             'status': 'success',
-            'data': project_schema.dump(project)
-        }), 200
+            'data': data
+        })
+        return http_cache.set_validators(response, etag, last_modified), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
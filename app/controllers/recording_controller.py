@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Recording, RecordingSession, Device
 from app.schemas import RecordingSchema, RecordingStartSchema, RecordingSessionSchema
+from app.utils import http_cache
 from marshmallow import ValidationError
 from datetime import datetime
 import threading
@@ -68,10 +69,17 @@ def get_recording(recording_id):
     """Get a specific recording by ID"""
     try:
         recording = Recording.query.get_or_404(recording_id)
-        return jsonify({
+        
+        data = recording_schema.dump(recording)
+        etag, last_modified = http_cache.record_validators(recording, data)
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        response = jsonify({
             'status': 'success',
-            'data': recording_schema.dump(recording)
-        }), 200
+            'data': data
+        })
+        return http_cache.set_validators(response, etag, last_modified), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -0,0 +1,222 @@
+from flask import Blueprint, request, jsonify, current_app
+from app import db
+from app.models import Video, UploadSession
+from app.models.upload_session import UploadStatus
+from app.models.video import VideoStatus
+from app.schemas import VideoSchema, UploadSessionSchema, UploadChunkSchema, UploadSessionCreateSchema
+from app.services import upload_sessions
+from app.services.upload_sessions import ChunkError
+from app.services import video_dedup, video_store
+from app.services.faststart import faststart_normalizer
+from app.services.media_probe import probe_container, probe_pipeline
+from app.utils.upload_utils import ALLOWED_VIDEO_EXTENSIONS, build_video_metadata, format_size, sniff_mimetype
+from marshmallow import ValidationError
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import os
+
+upload_bp = Blueprint('upload_api', __name__)
+video_schema = VideoSchema()
+upload_session_schema = UploadSessionSchema()
+upload_chunks_schema = UploadChunkSchema(many=True)
+upload_create_schema = UploadSessionCreateSchema()
+
+def _get_active_session(upload_id):
+    """Load a session, returning an error response if it can no longer take data"""
+    session = UploadSession.query.filter_by(upload_id=upload_id).first_or_404()
+    if session.status == UploadStatus.ACTIVE and session.expires_at < datetime.utcnow():
+        upload_sessions.abort_session(session, status=UploadStatus.EXPIRED)
+        db.session.commit()
+    if session.status != UploadStatus.ACTIVE:
+        return session, (jsonify({
+            'status': 'error',
+            'message': f'Upload session is {session.status.value}'
+        }), 410)
+    return session, None
+
+def _session_payload(session):
+    data = upload_session_schema.dump(session)
+    data['received_chunks'] = upload_chunks_schema.dump(upload_sessions.received_chunks(session))
+    data['missing_chunks'] = upload_sessions.missing_chunks(session)
+    return data
+
+@upload_bp.route('/videos/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable chunked upload"""
+    try:
+        data = upload_create_schema.load(request.json)
+
+        file_ext = os.path.splitext(data['filename'])[1].lower()
+        if file_ext not in ALLOWED_VIDEO_EXTENSIONS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Unsupported file type. Allowed: {", ".join(ALLOWED_VIDEO_EXTENSIONS)}'
+            }), 400
+
+        if data['size_bytes'] > current_app.config['MAX_CONTENT_LENGTH']:
+            return jsonify({'status': 'error', 'message': 'File exceeds the maximum upload size'}), 413
+
+        session = upload_sessions.create_session(
+            filename=secure_filename(data['filename']),
+            original_filename=data['filename'],
+            size_bytes=data['size_bytes'],
+            chunk_size=data.get('chunk_size') or current_app.config['UPLOAD_CHUNK_SIZE'],
+            ttl_seconds=current_app.config['UPLOAD_SESSION_TTL_SECONDS'],
+            checksum=(data.get('checksum') or '').lower() or None,
+            user_id=data.get('user_id'),
+            project_id=data.get('project_id'),
+            upload_metadata=build_video_metadata(data)
+        )
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Upload session created',
+            'data': upload_session_schema.dump(session)
+        }), 201
+
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@upload_bp.route('/videos/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Get an upload session with the chunks received so far"""
+    try:
+        session = UploadSession.query.filter_by(upload_id=upload_id).first_or_404()
+        return jsonify({
+            'status': 'success',
+            'data': _session_payload(session)
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@upload_bp.route('/videos/uploads/<upload_id>/chunks/<int:chunk_index>', methods=['PUT'])
+def put_chunk(upload_id, chunk_index):
+    """Upload one chunk, chunks may be sent in any order and in parallel
+
+    An optional ``X-Chunk-Checksum`` header carries the SHA-256 of the chunk.
+    Re-sending a chunk that was already received is a no-op.
+    """
+    try:
+        session, error = _get_active_session(upload_id)
+        if error:
+            return error
+
+        chunk = upload_sessions.write_chunk(
+            session,
+            chunk_index,
+            request.stream,
+            expected_checksum=request.headers.get('X-Chunk-Checksum'),
+            ttl_seconds=current_app.config['UPLOAD_SESSION_TTL_SECONDS']
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'chunk_index': chunk.chunk_index,
+                'offset': chunk.offset,
+                'size_bytes': chunk.size_bytes,
+                'checksum': chunk.checksum
+            }
+        }), 200
+
+    except ChunkError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@upload_bp.route('/videos/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Assemble a fully received upload into a video"""
+    try:
+        session, error = _get_active_session(upload_id)
+        if error:
+            return error
+
+        checksum = upload_sessions.finalize_session(session)
+
+        existing = video_dedup.find_existing(checksum, session.size_bytes)
+        if existing:
+            # Same content is already stored, keep that copy
+            os.remove(session.part_path)
+            video = video_dedup.link_video(
+                existing,
+                filename=session.filename,
+                original_filename=session.original_filename,
+                user_id=session.user_id,
+                project_id=session.project_id,
+                video_metadata=dict(session.upload_metadata or {})
+            )
+        else:
+            with open(session.part_path, 'rb') as f:
+                mime_type = sniff_mimetype(f.read(64), session.original_filename)
+            # MP4/MOV are parsed inline, anything else is probed in the background
+            technical_fields = probe_container(session.part_path)
+
+            blob = video_store.store_file(session.part_path, checksum, session.size_bytes)
+            session.part_path = blob.stored_path
+
+            video = Video(
+                filename=session.filename,
+                original_filename=session.original_filename,
+                stored_path=blob.stored_path,
+                stored_name=os.path.basename(blob.stored_path),
+                size_bytes=session.size_bytes,
+                size_human=format_size(session.size_bytes),
+                checksum=checksum,
+                mimetype=mime_type,
+                status=VideoStatus.READY if technical_fields else VideoStatus.PROCESSING,
+                user_id=session.user_id,
+                project_id=session.project_id,
+                video_metadata=dict(session.upload_metadata or {}),
+                **(technical_fields or {})
+            )
+            db.session.add(video)
+        db.session.flush()
+        session.video_id = video.id
+        session.chunks.delete()
+        db.session.commit()
+
+        # Technical fields are filled in the background, new content is
+        # normalized to faststart before its keyframe index and proxy are built
+        if video.status == VideoStatus.PROCESSING:
+            probe_pipeline.submit(video.checksum, video.stored_path)
+        if not existing:
+            faststart_normalizer.submit(video.checksum, video.stored_path)
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Video uploaded successfully',
+            'data': video_schema.dump(video)
+        }), 201
+
+    except ChunkError as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@upload_bp.route('/videos/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Abort an upload session and discard its partial data"""
+    try:
+        session, error = _get_active_session(upload_id)
+        if error:
+            return error
+
+        upload_sessions.abort_session(session)
+        db.session.commit()
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Upload session aborted'
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -1,12 +1,29 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from app import db
-from app.models import Video, VideoMetadata
-from app.schemas import VideoSchema, VideoUploadSchema, VideoUpdateSchema, VideoSearchSchema
+from app.models import Segment, Video, VideoMetadata
+from app.models.rendition import Rendition, RenditionStatus
+from app.models.segment import SegmentStatus
+from app.models.video import VideoStatus
+from app.schemas import VideoSchema, VideoUploadSchema, VideoUpdateSchema, VideoSearchSchema, VideoPreflightSchema
+from app.schemas import RenditionSchema, RenditionCreateSchema
+from app.services import video_dedup, video_store
+from app.services.chunk_cache import chunk_cache, file_loader, storage_loader
+from app.services.faststart import faststart_normalizer
+from app.services.hls_packager import PLAYLIST_NAME, PackagingError, hls_packager
+from app.services.keyframe_index import keyframe_indexer
+from app.services.media_probe import probe_container, probe_pipeline
+from app.services.proxy_generator import ProxyError, proxy_generator
+from app.services.sprite_generator import SpriteError, sprite_generator
+from app.services.storage import storage_for
+from app.services.transcoder import PLAYLIST_NAME as RENDITION_PLAYLIST_NAME, transcoder
+from app.utils import http_cache, range_utils
+from app.utils.upload_utils import HashingFileWriter, ALLOWED_VIDEO_EXTENSIONS, build_video_metadata, format_size
+from concurrent.futures import TimeoutError
 from marshmallow import ValidationError
-from werkzeug.utils import secure_filename
+from werkzeug.formparser import parse_form_data, default_stream_factory
+from werkzeug.utils import safe_join, secure_filename
+from urllib.parse import quote
 import os
-import hashlib
-import mimetypes
 from datetime import datetime
 
 video_bp = Blueprint('video_api', __name__)
@@ -15,6 +32,9 @@ videos_schema = VideoSchema(many=True)
 video_upload_schema = VideoUploadSchema()
 video_update_schema = VideoUpdateSchema()
 video_search_schema = VideoSearchSchema()
+video_preflight_schema = VideoPreflightSchema()
+renditions_schema = RenditionSchema(many=True)
+rendition_create_schema = RenditionCreateSchema()
 
 @video_bp.route('/videos', methods=['GET'])
 def get_videos():
@@ -34,7 +54,6 @@ def get_videos():
             query = query.filter(Video.metadata['category'].astext == search_params['category'])
         
         if search_params.get('status'):
-            from app.models.video import VideoStatus
             query = query.filter(Video.status == VideoStatus(search_params['status']))
         
         if search_params.get('user_id'):
@@ -98,86 +117,111 @@ def get_video(video_id):
     """Get a specific video by ID"""
     try:
         video = Video.query.get_or_404(video_id)
-        return jsonify({
+        
+        data = video_schema.dump(video)
+        etag, last_modified = http_cache.record_validators(video, data)
+        if http_cache.is_fresh(etag, last_modified):
+            return http_cache.not_modified(etag, last_modified)
+        
+        response = jsonify({
             'status': 'success',
-            'data': video_schema.dump(video)
-        }), 200
+            'data': data
+        })
+        return http_cache.set_validators(response, etag, last_modified), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @video_bp.route('/videos', methods=['POST'])
 def upload_video():
-    """Upload a new video"""
+    """Upload a new video
+
+    The multipart body is parsed here rather than through ``request.files`` so
+    the file part is streamed straight into its final location while being
+    hashed, instead of being spooled to a temp file and read back.
+    """
+    writers = []
     try:
+        def stream_factory(total_content_length, content_type, filename, content_length=None):
+            file_ext = os.path.splitext(filename or '')[1].lower()
+            if file_ext not in ALLOWED_VIDEO_EXTENSIONS:
+                return default_stream_factory(total_content_length, content_type, filename, content_length)
+            writer = HashingFileWriter(video_store.incoming_path(secure_filename(filename)))
+            writers.append(writer)
+            return writer
+
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_content_length=current_app.config.get('MAX_CONTENT_LENGTH')
+        )
+
         # Validate upload parameters
-        upload_data = video_upload_schema.load(request.form)
+        upload_data = video_upload_schema.load(form)
         
-        if 'file' not in request.files:
+        if 'file' not in files:
             return jsonify({'status': 'error', 'message': 'No file provided'}), 400
         
-        file = request.files['file']
+        file = files['file']
         if file.filename == '':
             return jsonify({'status': 'error', 'message': 'No file selected'}), 400
         
         # Validate file type
-        allowed_extensions = {'.mp4', '.mov', '.mkv', '.avi', '.webm'}
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in allowed_extensions:
+        if not isinstance(file.stream, HashingFileWriter):
             return jsonify({
                 'status': 'error', 
-                'message': f'Unsupported file type. Allowed: {", ".join(allowed_extensions)}'
+                'message': f'Unsupported file type. Allowed: {", ".join(ALLOWED_VIDEO_EXTENSIONS)}'
             }), 400
         
-        # Generate unique filename
-        from uuid import uuid4
-        video_id = uuid4().hex
+        writer = file.stream
+        writer.close()
         secure_name = secure_filename(file.filename)
-        stored_name = f"{video_id}__{secure_name}"
-        
-        # Create video directory
-        video_dir = os.path.join('data', 'videos')
-        os.makedirs(video_dir, exist_ok=True)
-        stored_path = os.path.join(video_dir, stored_name)
-        
-        # Save file
-        file.save(stored_path)
-        
-        # Get file info
-        file_size = os.path.getsize(stored_path)
-        file_size_human = f"{file_size / 1024 / 1024:.1f} MB"
-        
-        # Calculate checksum
-        with open(stored_path, 'rb') as f:
-            checksum = hashlib.sha256(f.read()).hexdigest()
-        
-        # Get MIME type
-        mime_type = mimetypes.guess_type(file.filename)[0] or 'application/octet-stream'
-        
-        # Create video record
-        video = Video(
-            filename=secure_name,
-            original_filename=file.filename,
-            stored_path=stored_path,
-            stored_name=stored_name,
-            size_bytes=file_size,
-            size_human=file_size_human,
-            checksum=checksum,
-            mimetype=mime_type,
-            user_id=upload_data.get('user_id'),
-            project_id=upload_data.get('project_id'),
-            metadata={
-                'description': upload_data.get('description'),
-                'tags': upload_data.get('tags', []),
-                'category': upload_data.get('category'),
-                'is_public': upload_data.get('is_public', False),
-                'allow_download': upload_data.get('allow_download', True),
-                'allow_streaming': upload_data.get('allow_streaming', True)
-            }
-        )
         
-        db.session.add(video)
+        existing = video_dedup.find_existing(writer.checksum, writer.size_bytes)
+        if existing:
+            # Same content is already stored, the new copy is discarded below
+            video = video_dedup.link_video(
+                existing,
+                filename=secure_name,
+                original_filename=file.filename,
+                user_id=upload_data.get('user_id'),
+                project_id=upload_data.get('project_id'),
+                video_metadata=build_video_metadata(upload_data)
+            )
+        else:
+            # MP4/MOV are parsed inline, anything else is probed in the background
+            technical_fields = probe_container(writer.path)
+            
+            # Move the upload into the content-addressable store
+            blob = video_store.store_file(writer.path, writer.checksum, writer.size_bytes)
+            writers.remove(writer)
+            
+            # Create video record
+            video = Video(
+                filename=secure_name,
+                original_filename=file.filename,
+                stored_path=blob.stored_path,
+                stored_name=os.path.basename(blob.stored_path),
+                size_bytes=writer.size_bytes,
+                size_human=format_size(writer.size_bytes),
+                checksum=writer.checksum,
+                mimetype=writer.mimetype(file.filename),
+                status=VideoStatus.READY if technical_fields else VideoStatus.PROCESSING,
+                user_id=upload_data.get('user_id'),
+                project_id=upload_data.get('project_id'),
+                video_metadata=build_video_metadata(upload_data),
+                **(technical_fields or {})
+            )
+            db.session.add(video)
+        
         db.session.commit()
         
+        # Technical fields are filled in the background, new content is
+        # normalized to faststart before its keyframe index and proxy are built
+        if video.status == VideoStatus.PROCESSING:
+            probe_pipeline.submit(video.checksum, video.stored_path)
+        if not existing:
+            faststart_normalizer.submit(video.checksum, video.stored_path)
+        
         return jsonify({
             'status': 'success',
             'message': 'Video uploaded successfully',
@@ -189,6 +233,63 @@ def upload_video():
     except Exception as e:
         db.session.rollback()
         return jsonify({'status': 'error', 'message': str(e)}), 500
+    finally:
+        # Anything not attached to a committed video is a partial or rejected upload
+        for writer in writers:
+            writer.discard()
+
+@video_bp.route('/videos/preflight', methods=['POST'])
+def preflight_video():
+    """Check whether a file's content is already stored before uploading it
+
+    On a hit the existing file is linked to a new video with the given
+    metadata, so no bytes need to be transferred.
+    """
+    try:
+        data = video_preflight_schema.load(request.json)
+        
+        file_ext = os.path.splitext(data['filename'])[1].lower()
+        if file_ext not in ALLOWED_VIDEO_EXTENSIONS:
+            return jsonify({
+                'status': 'error', 
+                'message': f'Unsupported file type. Allowed: {", ".join(ALLOWED_VIDEO_EXTENSIONS)}'
+            }), 400
+        
+        existing = video_dedup.find_existing(data['checksum'], data['size_bytes'])
+        if not existing:
+            return jsonify({
+                'status': 'success',
+                'message': 'Content not stored yet, upload required',
+                'data': {'exists': False, 'upload_required': True}
+            }), 200
+        
+        # The same content is already attached here, nothing to link
+        if existing.project_id == data.get('project_id') and existing.user_id == data.get('user_id'):
+            video = existing
+            status_code = 200
+        else:
+            video = video_dedup.link_video(
+                existing,
+                filename=secure_filename(data['filename']),
+                original_filename=data['filename'],
+                user_id=data.get('user_id'),
+                project_id=data.get('project_id'),
+                video_metadata=build_video_metadata(data)
+            )
+            db.session.commit()
+            status_code = 201
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Content already stored, upload skipped',
+            'data': {'exists': True, 'upload_required': False, 'video': video_schema.dump(video)}
+        }), status_code
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @video_bp.route('/videos/<int:video_id>', methods=['PUT'])
 def update_video(video_id):
@@ -222,14 +323,23 @@ def delete_video(video_id):
     try:
         video = Video.query.get_or_404(video_id)
         
-        # Delete physical file
-        if os.path.exists(video.stored_path):
-            os.remove(video.stored_path)
+        # Release the stored content, the file goes with its last reference
+        try:
+            unlink_path = video_store.release(video.checksum)
+        except LookupError:
+            unlink_path = None if video_dedup.is_file_shared(video) else video.stored_path
         
-        # Delete from database
+        # Delete from database, cached HLS packages are evicted separately
+        video.segments.delete()
         db.session.delete(video)
         db.session.commit()
         
+        if unlink_path and video_store.unlink(unlink_path, video.checksum):
+            transcoder.discard(video.checksum)
+            keyframe_indexer.discard(video.checksum)
+            proxy_generator.discard(video.checksum)
+            sprite_generator.discard(video.checksum)
+        
         return jsonify({
             'status': 'success',
             'message': 'Video deleted successfully'
@@ -239,27 +349,89 @@ def delete_video(video_id):
         db.session.rollback()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def _content_response(storage, location, size, mimetype, etag, last_modified, download_name=None):
+    """Serve stored content with conditional and byte range request support
+    
+    Hot content is served from the in-memory chunk cache. Otherwise local
+    files go through the server's sendfile path and remote content is
+    proxied with ranged GETs.
+    """
+    if http_cache.is_fresh(etag, last_modified):
+        return http_cache.not_modified(etag, last_modified)
+    
+    headers = {'Accept-Ranges': 'bytes'}
+    if download_name:
+        headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    
+    # A resumed download whose If-Range no longer matches gets the whole new content
+    ranges = []
+    if http_cache.if_range_matches(etag, last_modified):
+        ranges = range_utils.requested_ranges(request.range, size)
+    if ranges is None:
+        headers['Content-Range'] = f'bytes */{size}'
+        return http_cache.set_validators(Response(status=416, headers=headers), etag, last_modified)
+    
+    local_path = storage.local_path(location)
+    read_range = None
+    if chunk_cache.admit((location, etag)):
+        load = file_loader(local_path) if local_path is not None else storage_loader(storage, location)
+        read_range = lambda start, length: chunk_cache.iter_range((location, etag), load, size, start, length)
+    
+    if len(ranges) > 1:
+        body, content_type, length = range_utils.multipart_byteranges(
+            read_range or (lambda start, length: storage.iter_range(location, start, length)),
+            ranges, size, mimetype
+        )
+        headers['Content-Length'] = str(length)
+        response = Response(stream_with_context(body), status=206, content_type=content_type,
+                            headers=headers, direct_passthrough=True)
+        return http_cache.set_validators(response, etag, last_modified)
+    
+    status = 200
+    start, stop = 0, size
+    if ranges:
+        (start, stop), = ranges
+        status = 206
+        headers['Content-Range'] = range_utils.content_range(start, stop, size)
+    headers['Content-Length'] = str(stop - start)
+    
+    if read_range is not None:
+        body = read_range(start, stop - start)
+    elif local_path is not None:
+        body = range_utils.file_body(request.environ, local_path, start, stop - start)
+    else:
+        body = stream_with_context(storage.iter_range(location, start, stop - start))
+    response = Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+    return http_cache.set_validators(response, etag, last_modified)
+
+@video_bp.route('/videos/cache/stats', methods=['GET'])
+def chunk_cache_stats():
+    """Hit/miss counters of the serving worker process's chunk cache"""
+    return jsonify({'status': 'success', 'data': chunk_cache.stats()}), 200
+
+def _video_response(video, storage, as_attachment=False):
+    """Serve a video's content"""
+    etag, last_modified = http_cache.media_validators(video)
+    return _content_response(
+        storage, video.stored_path, video.size_bytes, video.mimetype, etag, last_modified,
+        download_name=video.original_filename if as_attachment else None
+    )
+
 @video_bp.route('/videos/<int:video_id>/stream', methods=['GET'])
 def stream_video(video_id):
     """Stream video with range support"""
     try:
         video = Video.query.get_or_404(video_id)
+        storage = storage_for(video.stored_path)
         
-        if not os.path.exists(video.stored_path):
+        if not storage.exists(video.stored_path):
             return jsonify({'status': 'error', 'message': 'Video file not found'}), 404
         
         # Check if streaming is allowed
-        if not video.metadata.get('allow_streaming', True):
+        if not (video.video_metadata or {}).get('allow_streaming', True):
             return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
         
-        # Handle range requests
-        range_header = request.headers.get('Range')
-        if range_header:
-            # Implement range request handling
-            from app.server.utils import stream_bytes
-            return stream_bytes(video.stored_path, None, None, video.mimetype)
-        else:
-            return send_file(video.stored_path, mimetype=video.mimetype, as_attachment=False)
+        return _video_response(video, storage)
             
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -269,15 +441,248 @@ def download_video(video_id):
     """Download video file"""
     try:
         video = Video.query.get_or_404(video_id)
+        storage = storage_for(video.stored_path)
         
-        if not os.path.exists(video.stored_path):
+        if not storage.exists(video.stored_path):
             return jsonify({'status': 'error', 'message': 'Video file not found'}), 404
         
         # Check if download is allowed
-        if not video.metadata.get('allow_download', True):
+        if not (video.video_metadata or {}).get('allow_download', True):
             return jsonify({'status': 'error', 'message': 'Download not allowed for this video'}), 403
         
-        return send_file(video.stored_path, as_attachment=True, download_name=video.original_filename)
+        return _video_response(video, storage, as_attachment=True)
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/proxy', methods=['GET'])
+def scrub_proxy(video_id):
+    """Low-resolution short-GOP proxy for timeline scrubbing, the original is streamed on pause"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        path = proxy_generator.ensure(video.checksum, video.stored_path, current_app.config['PROXY_WAIT_SECONDS'])
+        if path is None:
+            response = jsonify({'status': 'processing', 'message': 'Scrubbing proxy is being generated'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        stat = os.stat(path)
+        etag = f"{video.checksum}-proxy-{stat.st_mtime_ns}"
+        return _content_response(storage_for(path), path, stat.st_size, 'video/mp4',
+                                 etag, datetime.utcfromtimestamp(int(stat.st_mtime)))
+        
+    except ProxyError as e:
+        return jsonify({'status': 'error', 'message': f'Scrubbing proxy cannot be generated: {e}'}), 422
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/thumbnails/<file_name>', methods=['GET'])
+def timeline_thumbnails(video_id, file_name):
+    """WebVTT thumbnail track (thumbnails.vtt) for timeline hover previews and the sprite sheets it points at"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        directory = sprite_generator.ensure(video.checksum, video.stored_path,
+                                            current_app.config['SPRITE_WAIT_SECONDS'])
+        if directory is None:
+            response = jsonify({'status': 'processing', 'message': 'Thumbnail sprites are being generated'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        # Sheets are referenced relative to the track, both are served from this folder
+        path = safe_join(directory, file_name)
+        if path is None or not os.path.isfile(path):
+            return jsonify({'status': 'error', 'message': 'Thumbnail file not found'}), 404
+        
+        stat = os.stat(path)
+        etag = f"{video.checksum}-sprites-{file_name}-{stat.st_mtime_ns}"
+        mimetype = 'text/vtt' if file_name.endswith('.vtt') else 'image/jpeg'
+        return _content_response(storage_for(path), path, stat.st_size, mimetype,
+                                 etag, datetime.utcfromtimestamp(int(stat.st_mtime)))
+        
+    except SpriteError as e:
+        return jsonify({'status': 'error', 'message': f'Thumbnail sprites cannot be generated: {e}'}), 422
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/keyframes', methods=['GET'])
+def get_keyframes(video_id):
+    """Keyframe index summary, or with ``t`` the keyframe to start reading at for that time"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        seconds = request.args.get('t', type=float)
+        
+        index = keyframe_indexer.index_for(video, timeout=current_app.config['HLS_WAIT_SECONDS'])
+        data = {
+            'video_id': video.id,
+            'keyframe_count': len(index),
+            'first_keyframe': index.times[0] if len(index) else None,
+            'last_keyframe': index.times[-1] if len(index) else None,
+        }
+        if seconds is not None:
+            found = index.seek(seconds)
+            if found is None:
+                return jsonify({'status': 'error', 'message': 'Video has no keyframes'}), 404
+            number, keyframe_time, byte_offset = found
+            data['seek'] = {
+                'time': seconds,
+                'keyframe_number': number,
+                'keyframe_time': keyframe_time,
+                'byte_offset': byte_offset,
+            }
+        return jsonify({'status': 'success', 'data': data}), 200
+        
+    except TimeoutError:
+        response = jsonify({'status': 'processing', 'message': 'Keyframe index is being built'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/hls/index.m3u8', methods=['GET'])
+def hls_playlist(video_id):
+    """HLS media playlist, the video is packaged on the first request"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        segments = hls_packager.ensure_segments(video, current_app.config['HLS_WAIT_SECONDS'])
+        if not segments:
+            response = jsonify({'status': 'processing', 'message': 'Video is being packaged for streaming'})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        hls_packager.touch(video.checksum)
+        path = os.path.join(hls_packager.package_dir(video.checksum), PLAYLIST_NAME)
+        etag = f"{video.checksum}-{segments[0].segment_seconds:g}"
+        return _content_response(storage_for(path), path, os.path.getsize(path),
+                                 'application/vnd.apple.mpegurl', etag, segments[0].created_at)
+        
+    except PackagingError as e:
+        return jsonify({'status': 'error', 'message': f'Video cannot be packaged for HLS: {e}'}), 422
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/hls/master.m3u8', methods=['GET'])
+def hls_master_playlist(video_id):
+    """HLS master playlist over the renditions that are ready
+    
+    Renditions are only queued by ``POST /renditions``, opening a video does
+    not transcode it. H.264 sources are also offered untranscoded through the
+    stream-copy playlist, so a video plays before any rendition is ready.
+    """
+    try:
+        video = Video.query.get_or_404(video_id)
+        
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        renditions = transcoder.renditions(video.checksum)
+        variants = [
+            (rendition.bandwidth, rendition.width, rendition.height, f'{rendition.name}/{RENDITION_PLAYLIST_NAME}')
+            for rendition in renditions if rendition.status == RenditionStatus.READY
+        ]
+        if video.codec == 'h264' or not variants:
+            bandwidth = video.bitrate or (int(video.size_bytes * 8 / video.duration_seconds) if video.duration_seconds else 0)
+            variants.append((bandwidth, video.width, video.height, PLAYLIST_NAME))
+        
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        # By bandwidth only, the source's width and height may be unknown
+        for bandwidth, width, height, uri in sorted(variants, key=lambda variant: variant[0]):
+            attributes = f'BANDWIDTH={bandwidth}'
+            if width and height:
+                attributes += f',RESOLUTION={width}x{height}'
+            lines += [f'#EXT-X-STREAM-INF:{attributes}', uri]
+        
+        response = Response('\n'.join(lines) + '\n', mimetype='application/vnd.apple.mpegurl')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/hls/<rendition_name>/<file_name>', methods=['GET'])
+def hls_rendition_file(video_id, rendition_name, file_name):
+    """Playlist or segment of a transcoded rendition"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        rendition = Rendition.query.filter_by(
+            checksum=video.checksum, name=rendition_name, status=RenditionStatus.READY
+        ).first()
+        path = safe_join(os.path.dirname(rendition.playlist_path), file_name) if rendition else None
+        if path is None or not os.path.isfile(path):
+            return jsonify({'status': 'error', 'message': 'Rendition file not found'}), 404
+        
+        mimetype = 'application/vnd.apple.mpegurl' if file_name.endswith('.m3u8') else 'video/mp2t'
+        etag = f"{video.checksum}-{rendition.name}-{rendition.id}-{file_name}"
+        return _content_response(storage_for(path), path, os.path.getsize(path), mimetype,
+                                 etag, rendition.processing_completed_at)
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/renditions', methods=['GET'])
+def get_renditions(video_id):
+    """Renditions of a video and their transcoding status"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        return jsonify({
+            'status': 'success',
+            'data': renditions_schema.dump(transcoder.renditions(video.checksum))
+        }), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/renditions', methods=['POST'])
+def create_renditions(video_id):
+    """Queue transcoding of the rendition ladder, renditions are made once per content"""
+    try:
+        video = Video.query.get_or_404(video_id)
+        data = rendition_create_schema.load(request.get_json(silent=True) or {})
+        
+        renditions = transcoder.enqueue(video, names=data.get('renditions'))
+        return jsonify({
+            'status': 'success',
+            'message': 'Renditions queued',
+            'data': renditions_schema.dump(renditions)
+        }), 202
+        
+    except ValidationError as e:
+        return jsonify({'status': 'error', 'message': 'Validation error', 'errors': e.messages}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@video_bp.route('/videos/<int:video_id>/hls/<segment_name>', methods=['GET'])
+def hls_segment(video_id, segment_name):
+    """One HLS segment from the packaging cache"""
+    try:
+        segment = Segment.query.filter_by(
+            video_id=video_id, filename=segment_name, status=SegmentStatus.READY
+        ).first()
+        if segment is None or not os.path.exists(segment.file_path):
+            return jsonify({'status': 'error', 'message': 'Segment not found'}), 404
+        
+        video = segment.video
+        if not (video.video_metadata or {}).get('allow_streaming', True):
+            return jsonify({'status': 'error', 'message': 'Streaming not allowed for this video'}), 403
+        
+        etag = f"{video.checksum}-{segment.segment_seconds:g}-{segment.segment_index}"
+        return _content_response(storage_for(segment.file_path), segment.file_path, segment.file_size,
+                                 'video/mp2t', etag, segment.created_at)
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -1,24 +1,27 @@
 from .base import BaseModel
 from .user import User
-from .video import Video, VideoMetadata
+from .video import Video, VideoMetadata, VideoBlob
 from .recording import Recording, RecordingSession
 from .frame import Frame, FrameBatch
 from .clip import Clip
 from .segment import Segment
+from .rendition import Rendition, RenditionStatus
 from .device import Device, DeviceType
 from .project import Project, ProjectMember
 from .analytics import Analytics, ViewEvent
 from .outbound_message import OutboundMessage, MessageStatus
+from .upload_session import UploadSession, UploadChunk
 
 __all__ = [
     'BaseModel',
     'User', 
-    'Video', 'VideoMetadata',
+    'Video', 'VideoMetadata', 'VideoBlob',
     'Recording', 'RecordingSession',
     'Frame', 'FrameBatch',
-    'Clip', 'Segment',
+    'Clip', 'Segment', 'Rendition', 'RenditionStatus',
     'Device', 'DeviceType',
     'Project', 'ProjectMember',
     'Analytics', 'ViewEvent',
-    'OutboundMessage', 'MessageStatus'
+    'OutboundMessage', 'MessageStatus',
+    'UploadSession', 'UploadChunk'
 ]
@@ -31,6 +31,10 @@ class Frame(BaseModel):
     batch_id = db.Column(db.Integer, db.ForeignKey('frame_batches.id'), nullable=True)
     batch_index = db.Column(db.Integer, nullable=True)
     
+    # Near-duplicate detection (64-bit dHash as hex)
+    perceptual_hash = db.Column(db.String(16), nullable=True)
+    is_duplicate = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    
     # Metadata
     frame_metadata = db.Column(JSON, default=dict)
     
@@ -39,6 +43,15 @@ class Frame(BaseModel):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
     
+    # Frame search filters and sorts, keyset pagination adds the id to each
+    __table_args__ = (
+        db.Index('ix_frames_video_id_offset_seconds', 'video_id', 'offset_seconds', 'id'),
+        db.Index('ix_frames_video_id_created_at', 'video_id', 'created_at', 'id'),
+        db.Index('ix_frames_batch_id_batch_index', 'batch_id', 'batch_index', 'id'),
+        db.Index('ix_frames_project_id_created_at', 'project_id', 'created_at', 'id'),
+        db.Index('ix_frames_created_at', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Frame {self.filename} at {self.offset_seconds}s>'
     
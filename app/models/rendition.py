@@ -0,0 +1,57 @@
+from app import db
+from app.models.base import BaseModel
+import enum
+
+class RenditionStatus(enum.Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    READY = "ready"
+    ERROR = "error"
+
+class Rendition(BaseModel):
+    """Transcoded HLS rendition of video content.
+
+    Renditions belong to the content (checksum) rather than to one video row,
+    so deduplicated videos share them.
+    """
+    __tablename__ = 'renditions'
+
+    checksum = db.Column(db.String(64), nullable=False, index=True)
+    name = db.Column(db.String(20), nullable=False)  # e.g. 720p
+
+    # Encoding settings
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=False)
+    video_bitrate = db.Column(db.Integer, nullable=False)  # bits/s
+    audio_bitrate = db.Column(db.Integer, nullable=False)  # bits/s
+    codec = db.Column(db.String(50), nullable=False, default='h264')
+
+    # Output
+    playlist_path = db.Column(db.String(500), nullable=True)
+    size_bytes = db.Column(db.BigInteger, nullable=True)
+
+    # Processing
+    status = db.Column(db.Enum(RenditionStatus), default=RenditionStatus.QUEUED, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error_message = db.Column(db.Text, nullable=True)
+    processing_started_at = db.Column(db.DateTime, nullable=True)
+    processing_completed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('checksum', 'name', name='uq_renditions_checksum_name'),
+        db.Index('ix_renditions_status_updated_at', 'status', 'updated_at'),
+    )
+
+    @property
+    def bandwidth(self):
+        """Peak bandwidth advertised in the master playlist"""
+        return int((self.video_bitrate * 1.07) + self.audio_bitrate)
+
+    def __repr__(self):
+        return f'<Rendition {self.checksum[:12]} {self.name} ({self.status.value if self.status else None})>'
+
+    def to_dict(self):
+        """Convert rendition to dictionary"""
+        data = super().to_dict()
+        data['status'] = self.status.value if self.status else None
+        return data
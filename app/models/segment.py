@@ -51,6 +51,8 @@ class Segment(BaseModel):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
     
+    __table_args__ = (db.UniqueConstraint('video_id', 'segment_index', name='uq_segments_video_id_segment_index'),)
+    
     def __repr__(self):
         return f'<Segment {self.filename} (#{self.segment_index})>'
     
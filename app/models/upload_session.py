@@ -0,0 +1,69 @@
+from app import db
+from app.models.base import BaseModel
+from sqlalchemy import JSON
+import enum
+
+class UploadStatus(enum.Enum):
+    ACTIVE = "active"
+    COMPLETED = "completed"
+    EXPIRED = "expired"
+    ABORTED = "aborted"
+
+class UploadSession(BaseModel):
+    """Resumable chunked upload session"""
+    __tablename__ = 'upload_sessions'
+
+    upload_id = db.Column(db.String(32), nullable=False, unique=True)
+
+    # Target file
+    filename = db.Column(db.String(255), nullable=False)
+    original_filename = db.Column(db.String(255), nullable=False)
+    part_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    total_chunks = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String(64), nullable=True)  # Expected SHA-256, if the client declared one
+
+    # Status
+    status = db.Column(db.Enum(UploadStatus), default=UploadStatus.ACTIVE)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    # Metadata copied onto the video on completion
+    upload_metadata = db.Column(JSON, default=dict)
+
+    # Relationships
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
+    video_id = db.Column(db.Integer, db.ForeignKey('videos.id'), nullable=True)
+
+    # Received chunks
+    chunks = db.relationship('UploadChunk', backref='session', lazy='dynamic', cascade='all, delete-orphan')
+
+    # Expiry sweep looks up active sessions past their deadline
+    __table_args__ = (db.Index('ix_upload_sessions_status_expires_at', 'status', 'expires_at'),)
+
+    def __repr__(self):
+        return f'<UploadSession {self.upload_id} ({self.status.value if self.status else None})>'
+
+    def to_dict(self):
+        """Convert upload session to dictionary"""
+        data = super().to_dict()
+        data['status'] = self.status.value if self.status else None
+        return data
+
+class UploadChunk(BaseModel):
+    """A chunk received for an upload session"""
+    __tablename__ = 'upload_chunks'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('upload_sessions.id'), nullable=False)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    offset = db.Column(db.BigInteger, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)  # SHA-256 of the chunk
+
+    # One row per chunk index, parallel PUTs of the same chunk race on this
+    __table_args__ = (db.UniqueConstraint('session_id', 'chunk_index'),)
+
+    def __repr__(self):
+        return f'<UploadChunk {self.session_id}#{self.chunk_index}>'
@@ -24,7 +24,7 @@ class Video(BaseModel):
     # File properties
     size_bytes = db.Column(db.BigInteger, nullable=False)
     size_human = db.Column(db.String(50), nullable=False)
-    checksum = db.Column(db.String(64), nullable=False, unique=True)
+    checksum = db.Column(db.String(64), nullable=False, index=True)  # Shared by deduplicated uploads
     mimetype = db.Column(db.String(100), nullable=False)
     
     # Video properties
@@ -59,6 +59,22 @@ class Video(BaseModel):
         data['status'] = self.status.value if self.status else None
         return data
 
+class VideoBlob(BaseModel):
+    """Stored video content, shared by every video with the same checksum"""
+    __tablename__ = 'video_blobs'
+    
+    checksum = db.Column(db.String(64), nullable=False, unique=True)
+    stored_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Content this was normalized from (faststart), still matched for dedup
+    original_checksum = db.Column(db.String(64), nullable=True, index=True)
+    original_size_bytes = db.Column(db.BigInteger, nullable=True)
+    
+    def __repr__(self):
+        return f'<VideoBlob {self.checksum[:12]} refs={self.ref_count}>'
+
 class VideoMetadata(BaseModel):
     """Additional metadata for videos"""
     __tablename__ = 'video_metadata'
@@ -1,23 +1,27 @@
 from .user_schema import UserSchema, UserUpdateSchema
-from .video_schema import VideoSchema, VideoUploadSchema, VideoUpdateSchema, VideoSearchSchema
+from .video_schema import VideoSchema, VideoUploadSchema, VideoUpdateSchema, VideoSearchSchema, VideoPreflightSchema
 from .recording_schema import RecordingSchema, RecordingStartSchema, RecordingSessionSchema
-from .frame_schema import FrameSchema, FrameBatchSchema, FrameSnapshotSchema
+from .frame_schema import FrameSchema, FrameBatchSchema, FrameBatchStatusSchema, FrameSnapshotSchema, FrameSearchSchema, FrameDownloadSchema
 from .clip_schema import ClipSchema, ClipCreateSchema
 from .segment_schema import SegmentSchema, SegmentCreateSchema
 from .device_schema import DeviceSchema, DeviceCreateSchema
 from .project_schema import ProjectSchema, ProjectCreateSchema, ProjectMemberSchema
 from .analytics_schema import AnalyticsSchema, ViewEventSchema
 from .auth_schema import LoginSchema, RegisterSchema, TokenResponseSchema, UserResponseSchema
+from .upload_schema import UploadSessionSchema, UploadChunkSchema, UploadSessionCreateSchema
+from .rendition_schema import RenditionSchema, RenditionCreateSchema
 
 __all__ = [
     'UserSchema', 'UserUpdateSchema',
-    'VideoSchema', 'VideoUploadSchema', 'VideoUpdateSchema', 'VideoSearchSchema',
+    'VideoSchema', 'VideoUploadSchema', 'VideoUpdateSchema', 'VideoSearchSchema', 'VideoPreflightSchema',
     'RecordingSchema', 'RecordingStartSchema', 'RecordingSessionSchema',
-    'FrameSchema', 'FrameBatchSchema', 'FrameSnapshotSchema',
+    'FrameSchema', 'FrameBatchSchema', 'FrameBatchStatusSchema', 'FrameSnapshotSchema', 'FrameSearchSchema', 'FrameDownloadSchema',
     'ClipSchema', 'ClipCreateSchema',
     'SegmentSchema', 'SegmentCreateSchema',
     'DeviceSchema', 'DeviceCreateSchema',
     'ProjectSchema', 'ProjectCreateSchema', 'ProjectMemberSchema',
     'AnalyticsSchema', 'ViewEventSchema',
-    'LoginSchema', 'RegisterSchema', 'TokenResponseSchema', 'UserResponseSchema'
+    'LoginSchema', 'RegisterSchema', 'TokenResponseSchema', 'UserResponseSchema',
+    'UploadSessionSchema', 'UploadChunkSchema', 'UploadSessionCreateSchema',
+    'RenditionSchema', 'RenditionCreateSchema'
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ from marshmallow import Schema, fields, validate, validates_schema, ValidationEr
 class FrameSchema(Schema):
     """Frame schema for serialization"""
     id = fields.Integer(dump_only=True)
-    frame_type = fields.String(dump_only=True)
+    frame_type = fields.Method('get_frame_type', dump_only=True)
     filename = fields.String(dump_only=True)
     file_path = fields.String(dump_only=True)
     offset_seconds = fields.Float(dump_only=True)
@@ -14,7 +14,31 @@ class FrameSchema(Schema):
     quality = fields.Integer(dump_only=True)
     batch_id = fields.String(dump_only=True)
     batch_index = fields.Integer(dump_only=True)
-    metadata = fields.Dict(dump_only=True)
+    perceptual_hash = fields.String(dump_only=True)
+    is_duplicate = fields.Boolean(dump_only=True)
+    metadata = fields.Dict(attribute='frame_metadata', dump_only=True)
+    video_id = fields.Integer(dump_only=True)
+    user_id = fields.Integer(dump_only=True)
+    project_id = fields.Integer(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+    def get_frame_type(self, obj):
+        return obj.frame_type.value if obj.frame_type else None
+
+class FrameBatchStatusSchema(Schema):
+    """Frame batch schema for serialization"""
+    id = fields.Integer(dump_only=True)
+    batch_name = fields.String(dump_only=True)
+    start_seconds = fields.Float(dump_only=True)
+    end_seconds = fields.Float(dump_only=True)
+    interval_seconds = fields.Float(dump_only=True)
+    max_frames = fields.Integer(dump_only=True)
+    total_frames = fields.Integer(dump_only=True)
+    processed_frames = fields.Integer(dump_only=True)
+    is_completed = fields.Boolean(dump_only=True)
+    error_message = fields.String(dump_only=True)
+    settings = fields.Dict(attribute='batch_settings', dump_only=True)
     video_id = fields.Integer(dump_only=True)
     user_id = fields.Integer(dump_only=True)
     project_id = fields.Integer(dump_only=True)
@@ -42,6 +66,12 @@ class FrameBatchSchema(Schema):
     height = fields.Integer(allow_none=True, validate=validate.Range(min=1))
     project_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
     batch_name = fields.String(allow_none=True, validate=validate.Length(max=255))
+    storage = fields.String(allow_none=True, validate=validate.OneOf(['files', 'pack']))
+    frame_type = fields.String(missing='batch', validate=validate.OneOf(['batch', 'auto']))
+    motion_threshold = fields.Float(allow_none=True, validate=validate.Range(min=0, max=1))  # auto: mean pixel change 0..1
+    max_gap_seconds = fields.Float(allow_none=True, validate=validate.Range(min=0.1))  # auto: longest stretch without a frame
+    dedupe = fields.String(allow_none=True, validate=validate.OneOf(['off', 'tag', 'skip']))  # near-duplicate frames
+    dedupe_distance = fields.Integer(allow_none=True, validate=validate.Range(min=0, max=64))  # Hamming bits of 64
 
     @validates_schema
     def validate_time_range(self, data, **kwargs):
@@ -61,7 +91,7 @@ class FrameSearchSchema(Schema):
     """Schema for frame search parameters"""
     video_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
     frame_type = fields.String(allow_none=True, validate=validate.OneOf(['single', 'batch', 'auto']))
-    batch_id = fields.String(allow_none=True)
+    batch_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
     min_offset = fields.Float(allow_none=True, validate=validate.Range(min=0))
     max_offset = fields.Float(allow_none=True, validate=validate.Range(min=0))
     min_quality = fields.Integer(allow_none=True, validate=validate.Range(min=1, max=31))
@@ -70,9 +100,10 @@ class FrameSearchSchema(Schema):
     created_before = fields.DateTime(allow_none=True)
     user_id = fields.Integer(allow_none=True)
     project_id = fields.Integer(allow_none=True)
-    page = fields.Integer(missing=1, validate=validate.Range(min=1))
+    collapse_duplicates = fields.Boolean(missing=False)  # leave out frames tagged as near-duplicates
+    cursor = fields.String(allow_none=True)  # next_cursor of the previous page
     per_page = fields.Integer(missing=20, validate=validate.Range(min=1, max=100))
-    sort_by = fields.String(missing='created_at', validate=validate.OneOf(['created_at', 'offset_seconds', 'file_size', 'quality']))
+    sort_by = fields.String(missing='created_at', validate=validate.OneOf(['created_at', 'offset_seconds', 'batch_index']))
     sort_order = fields.String(missing='desc', validate=validate.OneOf(['asc', 'desc']))
 
     @validates_schema
@@ -89,6 +120,14 @@ class FrameSearchSchema(Schema):
         if min_quality is not None and max_quality is not None and min_quality > max_quality:
             raise ValidationError('min_quality must be less than or equal to max_quality')
 
+    @validates_schema
+    def validate_sort(self, data, **kwargs):
+        # Each sort is only served by an index within its scope
+        if data.get('sort_by') == 'batch_index' and data.get('batch_id') is None:
+            raise ValidationError('sort_by batch_index requires batch_id')
+        if data.get('sort_by') == 'offset_seconds' and data.get('video_id') is None:
+            raise ValidationError('sort_by offset_seconds requires video_id')
+
 class FrameDownloadSchema(Schema):
     """Schema for frame download request"""
     format = fields.String(missing='original', validate=validate.OneOf(['original', 'jpg', 'png', 'webp']))
@@ -0,0 +1,26 @@
+from marshmallow import Schema, fields, validate
+
+class RenditionSchema(Schema):
+    """Rendition schema for serialization"""
+    id = fields.Integer(dump_only=True)
+    name = fields.String(dump_only=True)
+    width = fields.Integer(dump_only=True)
+    height = fields.Integer(dump_only=True)
+    video_bitrate = fields.Integer(dump_only=True)
+    audio_bitrate = fields.Integer(dump_only=True)
+    codec = fields.String(dump_only=True)
+    size_bytes = fields.Integer(dump_only=True)
+    status = fields.Method('get_status', dump_only=True)
+    attempts = fields.Integer(dump_only=True)
+    error_message = fields.String(dump_only=True)
+    processing_started_at = fields.DateTime(dump_only=True)
+    processing_completed_at = fields.DateTime(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+    def get_status(self, obj):
+        return obj.status.value if obj.status else None
+
+class RenditionCreateSchema(Schema):
+    """Schema for requesting renditions, all ladder rungs by default"""
+    renditions = fields.List(fields.String(validate=validate.Regexp(r'^\d{3,4}p$')), allow_none=True)
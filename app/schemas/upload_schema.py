@@ -0,0 +1,44 @@
+from marshmallow import Schema, fields, validate
+
+class UploadSessionSchema(Schema):
+    """Upload session schema for serialization"""
+    upload_id = fields.String(dump_only=True)
+    filename = fields.String(dump_only=True)
+    original_filename = fields.String(dump_only=True)
+    size_bytes = fields.Integer(dump_only=True)
+    chunk_size = fields.Integer(dump_only=True)
+    total_chunks = fields.Integer(dump_only=True)
+    checksum = fields.String(dump_only=True)
+    status = fields.Method('get_status', dump_only=True)
+    expires_at = fields.DateTime(dump_only=True)
+    completed_at = fields.DateTime(dump_only=True)
+    user_id = fields.Integer(dump_only=True)
+    project_id = fields.Integer(dump_only=True)
+    video_id = fields.Integer(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+    def get_status(self, obj):
+        return obj.status.value if obj.status else None
+
+class UploadChunkSchema(Schema):
+    """Upload chunk schema for serialization"""
+    chunk_index = fields.Integer(dump_only=True)
+    offset = fields.Integer(dump_only=True)
+    size_bytes = fields.Integer(dump_only=True)
+    checksum = fields.String(dump_only=True)
+
+class UploadSessionCreateSchema(Schema):
+    """Schema for starting a resumable upload"""
+    filename = fields.String(required=True, validate=validate.Length(min=1, max=255))
+    size_bytes = fields.Integer(required=True, validate=validate.Range(min=1))
+    chunk_size = fields.Integer(allow_none=True, validate=validate.Range(min=256 * 1024, max=512 * 1024 * 1024))
+    checksum = fields.String(allow_none=True, validate=validate.Regexp(r'^[0-9a-fA-F]{64}$'))
+    user_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
+    project_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
+    description = fields.String(allow_none=True, validate=validate.Length(max=1000))
+    tags = fields.List(fields.String(), allow_none=True)
+    category = fields.String(allow_none=True, validate=validate.Length(max=100))
+    is_public = fields.Boolean(missing=False)
+    allow_download = fields.Boolean(missing=True)
+    allow_streaming = fields.Boolean(missing=True)
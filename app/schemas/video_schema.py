@@ -19,7 +19,7 @@ class VideoSchema(Schema):
     bitrate = fields.Integer(dump_only=True)
     codec = fields.String(dump_only=True)
     status = fields.String(dump_only=True)
-    metadata = fields.Dict(dump_only=True)
+    metadata = fields.Dict(attribute='video_metadata', dump_only=True)
     user_id = fields.Integer(dump_only=True)
     project_id = fields.Integer(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
@@ -35,6 +35,13 @@ class VideoUploadSchema(Schema):
     allow_download = fields.Boolean(missing=True)
     allow_streaming = fields.Boolean(missing=True)
 
+class VideoPreflightSchema(VideoUploadSchema):
+    """Schema for checksum pre-flight before an upload"""
+    checksum = fields.String(required=True, validate=validate.Regexp(r'^[0-9a-fA-F]{64}$'))
+    size_bytes = fields.Integer(required=True, validate=validate.Range(min=1))
+    filename = fields.String(required=True, validate=validate.Length(min=1, max=255))
+    user_id = fields.Integer(allow_none=True, validate=validate.Range(min=1))
+
 class VideoUpdateSchema(Schema):
     """Schema for video update validation"""
     filename = fields.String(validate=validate.Length(min=1, max=255))
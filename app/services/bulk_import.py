@@ -0,0 +1,207 @@
+"""Bulk import of existing recording directories.
+
+Files are hashed in a process pool, content already known to the store is
+skipped, and the rest is copied into the content-addressable store and
+inserted as ``Video`` rows in large batches. Hashes are appended to a state
+file as they are computed, so an interrupted import resumes without reading
+the files it already hashed.
+"""
+from app import db
+from app.models.video import Video, VideoBlob, VideoStatus
+from app.services import video_store
+from app.services.media_probe import PROBE_FIELDS, probe_container
+from app.services.storage import get_storage, storage_for
+from app.utils.upload_utils import ALLOWED_VIDEO_EXTENSIONS, UPLOAD_CHUNK_SIZE, format_size, sniff_mimetype
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+def scan_directory(root):
+    """Yield ``(path, size, mtime_ns)`` for every video file under ``root``"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() not in ALLOWED_VIDEO_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime_ns
+
+def hash_file(path):
+    """Checksum, MIME type and technical fields of one file.
+
+    Runs in a pool worker process, so it only takes and returns plain data.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        head = f.read(64)
+        sha256.update(head)
+        size = len(head)
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            sha256.update(block)
+            size += len(block)
+    return {
+        'path': path,
+        'size': size,
+        'checksum': sha256.hexdigest(),
+        'mimetype': sniff_mimetype(head, path),
+        'fields': probe_container(path),
+    }
+
+class ImportState:
+    """Append-only record of the files hashed by previous runs of an import"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of an interrupted run
+                    self.entries[entry['path']] = entry
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a')
+
+    def lookup(self, path, size, mtime_ns):
+        """Previous result for ``path`` if the file did not change since"""
+        entry = self.entries.get(path)
+        if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns:
+            return entry
+        return None
+
+    def record(self, entry):
+        self.entries[entry['path']] = entry
+        self._file.write(json.dumps(entry) + '\n')
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+def known_checksums(checksums):
+    """Those of ``checksums`` that already have stored content or a video.
+
+    Content normalized since it was stored (faststart) is known by the
+    checksum it had before as well.
+    """
+    checksums = list(checksums)
+    if not checksums:
+        return set()
+    known = {c for (c,) in db.session.query(Video.checksum).filter(Video.checksum.in_(checksums))}
+    known.update(c for (c,) in db.session.query(VideoBlob.checksum).filter(VideoBlob.checksum.in_(checksums)))
+    known.update(c for (c,) in db.session.query(VideoBlob.original_checksum)
+                 .filter(VideoBlob.original_checksum.in_(checksums)))
+    return known
+
+def _stage(path, staged, link):
+    """Scratch copy of ``path`` at ``staged`` the storage backend may consume"""
+    if link:
+        try:
+            os.link(path, staged)
+            return staged
+        except OSError:
+            pass  # Different filesystem, copy instead
+    shutil.copyfile(path, staged)
+    return staged
+
+def store_batch(entries, project_id=None, user_id=None, link=False, workers=4):
+    """Copy a batch of new files into the store and bulk-insert their rows.
+
+    Returns the entries that were imported, files that could not be stored
+    or whose content was stored meanwhile are logged and left out.
+    """
+    storage = get_storage()
+
+    def put(entry, staged):
+        try:
+            _stage(entry['path'], staged, link)
+            return entry, storage.put_file(video_store.blob_key(entry['checksum']), staged)
+        except Exception:
+            if os.path.exists(staged):
+                os.remove(staged)
+            raise
+
+    stored = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(put, entry, video_store.incoming_path(secure_filename(os.path.basename(entry['path']))))
+            for entry in entries
+        ]
+        for future in futures:
+            try:
+                stored.append(future.result())
+            except Exception as e:
+                logger.error("Could not store a file: %s", e)
+    if not stored:
+        return []
+
+    now = datetime.utcnow()
+    blob_rows, video_rows = [], []
+    for entry, location in stored:
+        fields = entry.get('fields') or {}
+        blob_rows.append({
+            'checksum': entry['checksum'],
+            'stored_path': location,
+            'size_bytes': entry['size'],
+            'ref_count': 1,
+            'created_at': now,
+            'updated_at': now,
+        })
+        video_rows.append(dict(
+            {name: fields.get(name) for name in PROBE_FIELDS},
+            filename=secure_filename(os.path.basename(entry['path'])),
+            original_filename=os.path.basename(entry['path']),
+            stored_path=location,
+            stored_name=os.path.basename(location),
+            size_bytes=entry['size'],
+            size_human=format_size(entry['size']),
+            checksum=entry['checksum'],
+            mimetype=entry['mimetype'],
+            # Containers the parser cannot read are picked up by the probe backlog job
+            status=VideoStatus.READY if fields else VideoStatus.PROCESSING,
+            video_metadata={'imported_from': entry['path']},
+            user_id=user_id,
+            project_id=project_id,
+            created_at=now,
+            updated_at=now,
+        ))
+    try:
+        db.session.execute(insert(VideoBlob.__table__), blob_rows)
+        db.session.execute(insert(Video.__table__), video_rows)
+        db.session.commit()
+        return [entry for entry, _ in stored]
+    except IntegrityError:
+        # Some content was stored meanwhile (e.g. an upload), the rest goes in one by one
+        db.session.rollback()
+
+    imported = []
+    for (entry, location), blob_row, video_row in zip(stored, blob_rows, video_rows):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(VideoBlob.__table__), [blob_row])
+                db.session.execute(insert(Video.__table__), [video_row])
+            imported.append(entry)
+        except IntegrityError:
+            logger.info("Skipped %s, its content was stored meanwhile", entry['path'])
+            existing = VideoBlob.query.filter_by(checksum=entry['checksum']).first()
+            if existing is None or existing.stored_path != location:
+                storage_for(location).delete(location)
+    db.session.commit()
+    return imported
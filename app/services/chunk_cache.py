@@ -0,0 +1,207 @@
+"""In-memory cache of hot video chunks.
+
+Content is cached in fixed-size chunks under one byte budget, least recently
+used chunks are evicted first. Content is identified by ``(location, etag)``
+so a file rewritten in place (e.g. a re-packaged HLS segment) is never served
+from stale chunks. Only hot content is admitted: it has to be requested
+``CHUNK_CACHE_HOT_REQUESTS`` times within ``CHUNK_CACHE_HOT_WINDOW_SECONDS``
+before its chunks are cached, colder content keeps streaming zero-copy with
+sendfile. Sequential playback is detected per content and the following
+chunks are read ahead in the background.
+
+The cache is shared by the threads of one worker process.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+import time
+
+# Contents whose request counts and last range end are remembered
+MAX_TRACKED_CONTENTS = 4096
+
+class ChunkCache:
+    """Byte-budgeted LRU of ``((location, etag), chunk_index)`` -> bytes"""
+
+    def __init__(self, budget_bytes=0, chunk_size=1024 * 1024, read_ahead=4,
+                 hot_requests=3, hot_window_seconds=60, read_ahead_workers=2):
+        self.configure(budget_bytes, chunk_size, read_ahead, hot_requests, hot_window_seconds, read_ahead_workers)
+
+    def configure(self, budget_bytes, chunk_size, read_ahead, hot_requests, hot_window_seconds,
+                  read_ahead_workers=2):
+        self.budget_bytes = budget_bytes
+        self.chunk_size = chunk_size
+        self.read_ahead = read_ahead
+        self.hot_requests = hot_requests
+        self.hot_window_seconds = hot_window_seconds
+        self._read_ahead_workers = read_ahead_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._chunks = OrderedDict()
+        self._loading = {}
+        self._heat = OrderedDict()
+        self._last_end = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.read_aheads = 0
+        self.bypassed = 0
+
+    def init_app(self, app):
+        self.configure(
+            budget_bytes=app.config['CHUNK_CACHE_BYTES'],
+            chunk_size=app.config['CHUNK_CACHE_CHUNK_SIZE'],
+            read_ahead=app.config['CHUNK_CACHE_READ_AHEAD'],
+            hot_requests=app.config['CHUNK_CACHE_HOT_REQUESTS'],
+            hot_window_seconds=app.config['CHUNK_CACHE_HOT_WINDOW_SECONDS']
+        )
+
+    @property
+    def enabled(self):
+        return self.budget_bytes > 0
+
+    def admit(self, content):
+        """Record a request for ``content`` and tell whether to serve it from the cache"""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            count, since = self._heat.pop(content, (0, now))
+            if now - since > self.hot_window_seconds:
+                count, since = 0, now
+            count += 1
+            self._heat[content] = (count, since)
+            while len(self._heat) > MAX_TRACKED_CONTENTS:
+                self._heat.popitem(last=False)
+            hot = count >= self.hot_requests
+            if not hot:
+                self.bypassed += 1
+            return hot
+
+    def _get(self, key, load):
+        with self._lock:
+            data = self._chunks.get(key)
+            if data is not None:
+                self._chunks.move_to_end(key)
+                self.hits += 1
+                return data
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1  # Being read ahead, no second read
+        if not owner:
+            return future.result()
+
+        try:
+            data = load(key[1] * self.chunk_size, self.chunk_size)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        self._put(key, data)
+        future.set_result(data)
+        return data
+
+    def _put(self, key, data):
+        with self._lock:
+            if key in self._chunks:
+                return
+            self._chunks[key] = data
+            self.size_bytes += len(data)
+            while self.size_bytes > self.budget_bytes and self._chunks:
+                _, evicted = self._chunks.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def _prefetch(self, content, load, indexes):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._read_ahead_workers,
+                                                    thread_name_prefix='read-ahead')
+            wanted = [i for i in indexes if (content, i) not in self._chunks and (content, i) not in self._loading]
+            self.read_aheads += len(wanted)
+        for index in wanted:
+            self._executor.submit(self._get, (content, index), load)
+
+    def iter_range(self, content, load, size, start, length):
+        """Yield ``length`` bytes of ``content`` from ``start`` through the cache.
+
+        ``load(offset, length)`` reads from the backend on a miss. When the
+        range continues the previous one of this content (linear playback) or
+        runs to the end, chunks past it are read ahead as well.
+        """
+        if length <= 0:
+            return
+        stop = start + length
+        last_chunk = (size - 1) // self.chunk_size
+        with self._lock:
+            sequential = start > 0 and self._last_end.get(content) == start
+            self._last_end.pop(content, None)
+            self._last_end[content] = stop
+            while len(self._last_end) > MAX_TRACKED_CONTENTS:
+                self._last_end.popitem(last=False)
+        horizon = (stop - 1) // self.chunk_size
+        if sequential or stop == size:
+            horizon = min(horizon + self.read_ahead, last_chunk)
+
+        offset = start
+        while offset < stop:
+            index = offset // self.chunk_size
+            self._prefetch(content, load, range(index + 1, min(index + self.read_ahead, horizon) + 1))
+            data = self._get((content, index), load)
+            skip = offset - index * self.chunk_size
+            piece = data[skip:skip + (stop - offset)]
+            if not piece:
+                break
+            offset += len(piece)
+            yield piece
+
+    def invalidate(self, location):
+        """Drop everything cached for the content at ``location``"""
+        with self._lock:
+            for key in [key for key in self._chunks if key[0][0] == location]:
+                self.size_bytes -= len(self._chunks.pop(key))
+            for tracked in (self._heat, self._last_end):
+                for content in [content for content in tracked if content[0] == location]:
+                    del tracked[content]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'budget_bytes': self.budget_bytes,
+                'size_bytes': self.size_bytes,
+                'chunks': len(self._chunks),
+                'chunk_size': self.chunk_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'read_aheads': self.read_aheads,
+                'bypassed_requests': self.bypassed,
+            }
+
+def file_loader(path):
+    """Chunk loader reading a local file with ``pread``"""
+    def load(offset, length):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+    return load
+
+def storage_loader(storage, location):
+    """Chunk loader reading ranges from a storage backend"""
+    def load(offset, length):
+        return b''.join(storage.iter_range(location, offset, length))
+    return load
+
+chunk_cache = ChunkCache()
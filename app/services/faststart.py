@@ -0,0 +1,172 @@
+"""Faststart normalization of uploaded MP4/MOV files.
+
+Camera exports often write ``moov`` after the media data, so a player has to
+fetch the tail of the file before it can show the first frame. Such uploads
+are remuxed once, after they are stored, with ``moov`` in front (stream copy,
+video and audio tracks are kept, nothing is re-encoded). The result is new
+content: it is stored under its own checksum, every video referencing the
+original is moved to it in one transaction and the original is removed. The
+original checksum and size stay on the new blob so uploads of the same
+export are still deduplicated.
+"""
+from app import db
+from app.models.video import Video, VideoBlob
+from app.services import video_store
+from app.services.hls_packager import hls_packager
+from app.services.keyframe_index import keyframe_indexer
+from app.services.proxy_generator import proxy_generator
+from app.services.sprite_generator import sprite_generator
+from app.services.storage import get_storage, storage_for
+from app.services.transcoder import transcoder
+from app.utils import disk_cache, mp4_parser
+from app.utils.upload_utils import UPLOAD_CHUNK_SIZE, format_size
+from datetime import datetime
+from sqlalchemy import func, update
+import hashlib
+import logging
+import os
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+def remux(source, dest, muxer, ffmpeg_bin='ffmpeg', timeout=3600):
+    """Stream-copy ``source`` to ``dest`` with ``moov`` first, return ``(checksum, size)``"""
+    try:
+        subprocess.run(
+            [ffmpeg_bin, '-nostdin', '-v', 'error', '-y', '-i', source,
+             '-map', '0:v', '-map', '0:a?', '-c', 'copy', '-map_metadata', '0',
+             '-movflags', '+faststart', '-f', muxer, dest],
+            capture_output=True, check=True, timeout=timeout
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode(errors='replace').strip() or str(e))
+    sha256, size = hashlib.sha256(), 0
+    with open(dest, 'rb') as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            sha256.update(block)
+            size += len(block)
+    return sha256.hexdigest(), size
+
+class FaststartNormalizer:
+    """Background remuxer with per-checksum single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight(
+            'faststart', lambda checksum, e: logger.error("Faststart normalization failed for %s: %s", checksum, e)
+        )
+
+    def init_app(self, app):
+        self.app = app
+
+    def submit(self, checksum, location):
+        """Normalize stored content in the background, return the future"""
+        return self._jobs.submit(checksum, self.app.config['FASTSTART_WORKERS'], self._run, checksum, location)
+
+    def _run(self, checksum, location):
+        """Post-upload stage: normalize, then index and proxy the resulting content"""
+        with self.app.app_context():
+            try:
+                new_checksum = self.normalize(checksum, location)
+                if new_checksum is not None:
+                    checksum = new_checksum
+                    location = VideoBlob.query.filter_by(checksum=new_checksum).first().stored_path
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                keyframe_indexer.submit(checksum, location)
+                proxy_generator.submit(checksum, location)
+                sprite_generator.submit(checksum, location)
+            return new_checksum
+
+    def normalize(self, checksum, location):
+        """Rewrite content whose ``moov`` trails the media data, return the new checksum.
+
+        Returns ``None`` when the content is already faststart, is no longer
+        stored or cannot be read locally.
+        """
+        local_path = storage_for(location).local_path(location)
+        muxer = mp4_parser.faststart_muxer(local_path) if local_path else None
+        if muxer is None:
+            return None
+
+        tmp_path = video_store.incoming_path('faststart')
+        try:
+            new_checksum, new_size = remux(local_path, tmp_path, muxer, self.app.config['FFMPEG_BIN'],
+                                           self.app.config['FASTSTART_TIMEOUT'])
+            new_location = self._swap(checksum, new_checksum, new_size, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if new_location is None:
+            return None
+
+        # The original was released by the swap, it goes unless it was stored again since
+        video_store.unlink(location, checksum)
+        self._move_derived(checksum, new_checksum)
+        logger.info("Normalized %s to faststart content %s", checksum, new_checksum)
+        return new_checksum
+
+    def _swap(self, checksum, new_checksum, new_size, tmp_path):
+        """Store the remuxed file and move every reference from the original to it"""
+        blob = VideoBlob.query.filter_by(checksum=checksum).with_for_update().first()
+        if blob is None:
+            db.session.rollback()
+            return None  # Deleted meanwhile
+
+        existing = VideoBlob.query.filter_by(checksum=new_checksum).first()
+        if existing is not None and video_store.content_exists(existing.stored_path):
+            new_location = existing.stored_path
+            existing.ref_count += blob.ref_count
+        else:
+            new_location = get_storage().put_file(video_store.blob_key(new_checksum), tmp_path)
+            if existing is not None:
+                existing.stored_path = new_location
+                existing.ref_count += blob.ref_count
+            else:
+                db.session.add(VideoBlob(checksum=new_checksum, stored_path=new_location,
+                                         size_bytes=new_size, ref_count=blob.ref_count))
+        db.session.flush()
+        VideoBlob.query.filter_by(checksum=new_checksum).update({
+            VideoBlob.original_checksum: checksum,
+            VideoBlob.original_size_bytes: blob.size_bytes,
+        }, synchronize_session=False)
+
+        videos = Video.__table__
+        db.session.execute(
+            update(videos)
+            .where(videos.c.checksum == checksum)
+            .values(
+                checksum=new_checksum,
+                stored_path=new_location,
+                stored_name=os.path.basename(new_location),
+                size_bytes=new_size,
+                size_human=format_size(new_size),
+                bitrate=func.coalesce(func.round(new_size * 8 / func.nullif(videos.c.duration_seconds, 0)),
+                                      videos.c.bitrate),
+                updated_at=datetime.utcnow()
+            )
+        )
+        db.session.delete(blob)
+        db.session.commit()
+        return new_location
+
+    def _move_derived(self, checksum, new_checksum):
+        """Drop what was derived from the original, its proxy and sprites are identical and kept"""
+        old_proxy, new_proxy = proxy_generator.proxy_path(checksum), proxy_generator.proxy_path(new_checksum)
+        if os.path.exists(old_proxy) and not os.path.exists(new_proxy):
+            os.replace(old_proxy, new_proxy)
+        proxy_generator.discard(checksum)
+        sprite_generator.move(checksum, new_checksum)
+
+        # Byte offsets changed, HLS packages are made again on request and renditions queued again
+        requested = [rendition.name for rendition in transcoder.renditions(checksum)]
+        keyframe_indexer.discard(checksum)
+        transcoder.discard(checksum)
+        hls_packager.discard(checksum)
+        video = Video.query.filter_by(checksum=new_checksum).first() if requested else None
+        if video is not None:
+            transcoder.enqueue(video, names=requested)
+
+faststart_normalizer = FaststartNormalizer()
@@ -0,0 +1,108 @@
+"""Cached format and size variants of frames.
+
+A variant is a frame resized and/or re-encoded for ``FrameDownloadSchema``
+parameters. Its cache key is the frame id and CRC-32 together with the
+format, quality, width and height, so every later request for the same
+variant is served from the disk cache without decoding. Big downscales
+of JPEG frames use reduced decoding (Pillow's draft mode): libjpeg scales by
+1/2, 1/4 or 1/8 in the DCT domain while decoding, so a gallery thumbnail
+never decodes the full-resolution picture. Conversions run in a pool of
+``FRAME_CONVERT_WORKERS`` threads, and the request waits for its result, so
+the pool only caps how many conversions a process runs at once. Concurrent
+requests for a variant that is not cached share one conversion: a pool job in
+this process, and a file lock across worker processes. The cache is evicted
+least-recently-used once it outgrows ``FRAME_VARIANT_CACHE_MAX_BYTES``.
+"""
+from app.services import frame_pack
+from app.utils import disk_cache
+import hashlib
+import io
+import os
+
+FORMATS = {
+    # format: (Pillow format, extension, mimetype)
+    'jpg': ('JPEG', 'jpg', 'image/jpeg'),
+    'png': ('PNG', 'png', 'image/png'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+}
+
+def variant_format(fmt):
+    """Output format of a variant, frames are JPEGs unless converted"""
+    return 'jpg' if fmt == 'original' else fmt
+
+def variant_key(frame, fmt, quality, width=None, height=None):
+    """Cache key of a variant, the stored bytes are part of it through their CRC-32"""
+    crc = (frame.frame_metadata or {}).get('crc32', frame.file_size)
+    params = f'{frame.id}:{crc}:{variant_format(fmt)}:{quality}:{width or 0}:{height or 0}'
+    return hashlib.sha256(params.encode()).hexdigest()
+
+def target_size(size, width=None, height=None):
+    """Output size for the requested width and/or height, keeping the aspect ratio when only one is given"""
+    source_width, source_height = size
+    if width and height:
+        return width, height
+    if width:
+        return width, max(1, round(source_height * width / source_width))
+    if height:
+        return max(1, round(source_width * height / source_height)), height
+    return size
+
+def _convert(file_path, path, fmt, quality, width, height):
+    """Write the variant of a frame to ``path`` unless another process did meanwhile"""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError('Frame conversion requires Pillow')
+
+    pillow_format, extension, _ = FORMATS[variant_format(fmt)]
+    # Variants are many and small, their locks are not kept around
+    with disk_cache.build(path, '.' + extension, keep_lock=False) as tmp_path:
+        if tmp_path is None:
+            return path
+        image = Image.open(io.BytesIO(frame_pack.read_frame(file_path)))
+        size = target_size(image.size, width, height)
+        if image.format == 'JPEG' and size[0] < image.size[0] and size[1] < image.size[1]:
+            # Decode at the smallest DCT scale that is still at least the target size
+            image.draft(image.mode, size)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+        options = {} if pillow_format == 'PNG' else {'quality': quality}
+        image.save(tmp_path, pillow_format, **options)
+    return path
+
+class FrameConverter:
+    """Disk cache of converted frames with per-key single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight('frame-convert')
+
+    def init_app(self, app):
+        self.app = app
+
+    def variant_path(self, key, fmt):
+        extension = FORMATS[variant_format(fmt)][1]
+        return os.path.join(self.app.config['FRAME_VARIANT_CACHE_DIR'], key[:2], f'{key}.{extension}')
+
+    def get(self, frame, fmt, quality, width=None, height=None):
+        """``(key, path)`` of the variant, converting the frame first unless cached.
+
+        Blocks until the conversion is done, also when another request started it.
+        """
+        key = variant_key(frame, fmt, quality, width, height)
+        path = self.variant_path(key, fmt)
+        if not os.path.exists(path):
+            self._jobs.submit(
+                key, self.app.config['FRAME_CONVERT_WORKERS'], _convert,
+                frame.file_path, path, fmt, quality, width, height
+            ).result()
+        disk_cache.touch(path)
+        return key, path
+
+    def evict(self, max_bytes):
+        """Remove least recently used variants until the cache fits ``max_bytes``"""
+        return disk_cache.evict_lru(self.app.config['FRAME_VARIANT_CACHE_DIR'], max_bytes)
+
+frame_converter = FrameConverter()
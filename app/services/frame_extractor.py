@@ -0,0 +1,402 @@
+"""Batch frame extraction.
+
+A batch samples one video every ``interval_seconds`` between
+``start_seconds`` and ``end_seconds``. ffmpeg seeks to the start once and
+decodes the range in a single pass, emitting a JPEG per sample through the
+``fps`` filter, rather than seeking and decoding again for every frame.
+Batches run in a process pool, so several videos are extracted in parallel.
+A collector thread in the app process records the frames as their files
+appear: ``Frame`` rows are inserted with executemany in large batches and
+``FrameBatch.processed_frames`` moves along, which also serves as the
+heartbeat other processes use to spot abandoned batches. The CRC-32 of every
+frame is recorded too, so a batch can be streamed as a ZIP archive with all
+its headers known up front. Batches created with the ``pack`` storage
+format have their frames moved into one pack file as they are recorded (see
+``frame_pack``). Automatic batches (``FrameType.AUTO``) only keep the samples
+where the picture changed. Every frame gets a perceptual hash, and
+near-duplicates of recent frames are tagged or skipped (see ``motion_gate``).
+"""
+from app import db
+from app.models.frame import Frame, FrameBatch, FrameType
+from app.models.video import Video
+from app.services import frame_pack
+from app.services.motion_gate import SAMPLES_NAME, extract_gated_frames, read_samples
+from app.services.storage import storage_for
+from app.utils.zip_stream import file_crc32
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+import logging
+import math
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+FRAME_PREFIX = 'frame_'
+FRAME_PATTERN = FRAME_PREFIX + '%06d.jpg'
+
+def expected_frames(start_seconds, end_seconds, interval_seconds, max_frames=None):
+    """Number of samples in a batch, ``None`` when neither the end nor a cap is known"""
+    if end_seconds is None:
+        return max_frames
+    count = int(math.floor((end_seconds - start_seconds) / interval_seconds + 1e-9)) + 1
+    return min(count, max_frames) if max_frames else count
+
+def jpeg_dimensions(path):
+    """``(width, height)`` from a JPEG's start-of-frame marker"""
+    with open(path, 'rb') as f:
+        data = f.read(64 * 1024)
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = data[offset + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            offset += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack_from('>H', data, offset + 2)[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack_from('>HH', data, offset + 5)
+            return width, height
+        offset += 2 + length
+    return None, None
+
+def extract_frames(source, out_dir, start_seconds, duration, interval_seconds, frame_count,
+                   quality, width, height, options):
+    """Decode ``source`` once and write every sample to ``out_dir`` as ``frame_NNNNNN.jpg``.
+
+    Runs in a pool worker process, so it only takes and returns plain data.
+    Returns the number of frames written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    filters = [f'fps=1/{interval_seconds!r}']
+    if width or height:
+        filters.append(f'scale={width or -2}:{height or -2}')
+    if options.get('tile'):
+        # Sprite sheets: samples laid out in a COLUMNSxROWS grid per image
+        filters.append(f"tile={options['tile']}")
+    command = [options['ffmpeg_bin'], '-nostdin', '-v', 'error', '-y',
+               '-ss', f'{start_seconds:.3f}', '-i', source]
+    if duration is not None:
+        # Half an interval of slack so a sample right at the end is not lost
+        command += ['-t', f'{duration + interval_seconds / 2:.3f}']
+    command += ['-map', '0:v:0', '-an', '-vf', ','.join(filters),
+                '-q:v', str(quality), '-threads', str(options['threads'])]
+    if frame_count:
+        command += ['-frames:v', str(frame_count)]
+    command += ['-f', 'image2', '-start_number', '0', os.path.join(out_dir, FRAME_PATTERN)]
+    try:
+        subprocess.run(command, capture_output=True, check=True, timeout=options['timeout'])
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode(errors='replace').strip() or str(e))
+    return sum(1 for name in os.listdir(out_dir) if name.startswith(FRAME_PREFIX))
+
+class FrameExtractor:
+    """Process-pool batch extractor with an incremental recording collector"""
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._results = queue.Queue()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def batch_dir(self, batch_id):
+        return os.path.join(self.app.config['FRAMES_DIR'], 'batches', str(batch_id))
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.app.config['FRAME_WORKERS'])
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name='frame-collector', daemon=True)
+                self._collector.start()
+
+    def create_batch(self, video, params):
+        """Create and queue a batch for ``video`` from ``FrameBatchSchema`` data"""
+        start_seconds = params.get('start_seconds') or 0.0
+        end_seconds = params.get('end_seconds')
+        if video.duration_seconds is not None:
+            end_seconds = min(end_seconds, video.duration_seconds) if end_seconds is not None \
+                else video.duration_seconds
+            if start_seconds >= end_seconds:
+                raise ValueError('start_seconds is past the end of the video')
+        settings = {name: params.get(name) for name in ('quality', 'width', 'height')}
+        settings['storage'] = params.get('storage') or self.app.config['FRAME_STORAGE']
+        auto = params.get('frame_type') == FrameType.AUTO.value
+        if auto:
+            settings['frame_type'] = FrameType.AUTO.value
+            settings['motion_threshold'] = params.get('motion_threshold')
+            if settings['motion_threshold'] is None:
+                settings['motion_threshold'] = self.app.config['FRAME_MOTION_THRESHOLD']
+            settings['max_gap_seconds'] = params.get('max_gap_seconds')
+            if settings['max_gap_seconds'] is None:
+                settings['max_gap_seconds'] = self.app.config['FRAME_MOTION_MAX_GAP_SECONDS']
+        settings['dedupe'] = params.get('dedupe') or self.app.config['FRAME_DEDUPE']
+        settings['dedupe_distance'] = params.get('dedupe_distance')
+        if settings['dedupe_distance'] is None:
+            settings['dedupe_distance'] = self.app.config['FRAME_DEDUPE_DISTANCE']
+        settings['dedupe_window'] = self.app.config['FRAME_DEDUPE_WINDOW']
+        batch = FrameBatch(
+            batch_name=params.get('batch_name') or f'{video.filename} @ {params["interval_seconds"]:g}s',
+            folder_path='',
+            start_seconds=start_seconds,
+            end_seconds=end_seconds,
+            interval_seconds=params['interval_seconds'],
+            max_frames=params.get('max_frames'),
+            # How many samples an automatic batch keeps is only known at the end
+            total_frames=0 if auto else expected_frames(start_seconds, end_seconds, params['interval_seconds'],
+                                                        params.get('max_frames')) or 0,
+            processed_frames=0,
+            is_completed=False,
+            batch_settings=settings,
+            video_id=video.id,
+            user_id=video.user_id,
+            project_id=params.get('project_id') or video.project_id
+        )
+        db.session.add(batch)
+        db.session.flush()
+        batch.folder_path = self.batch_dir(batch.id)
+        db.session.commit()
+        # Leftovers of a batch that had this id in a database since reset
+        shutil.rmtree(batch.folder_path, ignore_errors=True)
+        self.submit(batch, video)
+        return batch
+
+    def submit(self, batch, video):
+        """Hand a batch to the pool"""
+        self._ensure_started()
+        settings = batch.batch_settings or {}
+        duration = batch.end_seconds - batch.start_seconds if batch.end_seconds is not None else None
+        auto = settings.get('frame_type') == FrameType.AUTO.value
+        with self._lock:
+            if batch.id in self._in_flight:
+                return False
+            self._in_flight[batch.id] = {
+                'folder': batch.folder_path,
+                'recorded': 0,
+                'dimensions': None,
+                'auto': auto,
+                'samples': {},
+                'samples_read': 0,
+                'pack': frame_pack.FramePackWriter(batch.folder_path) if settings.get('storage') == 'pack' else None,
+                'row': {
+                    'frame_type': FrameType.AUTO if auto else FrameType.BATCH,
+                    'quality': settings.get('quality'),
+                    'batch_id': batch.id,
+                    'video_id': batch.video_id,
+                    'user_id': batch.user_id,
+                    'project_id': batch.project_id,
+                },
+                'start_seconds': batch.start_seconds or 0.0,
+                'interval_seconds': batch.interval_seconds,
+            }
+        future = self._pool.submit(
+            extract_gated_frames,
+            storage_for(video.stored_path).media_input(video.stored_path),
+            batch.folder_path,
+            batch.start_seconds or 0.0,
+            duration,
+            batch.interval_seconds,
+            batch.max_frames if auto else batch.total_frames or None,
+            settings.get('quality') or 2,
+            settings.get('width'),
+            settings.get('height'),
+            {
+                'ffmpeg_bin': self.app.config['FFMPEG_BIN'],
+                'threads': self.app.config['FRAME_THREADS'],
+                'timeout': self.app.config['FRAME_EXTRACT_TIMEOUT'],
+                'motion_threshold': settings.get('motion_threshold'),
+                'max_gap_seconds': settings.get('max_gap_seconds'),
+                'dedupe': settings.get('dedupe'),
+                'dedupe_distance': settings.get('dedupe_distance'),
+                'dedupe_window': settings.get('dedupe_window'),
+            }
+        )
+        future.add_done_callback(lambda f, batch_id=batch.id: self._results.put((batch_id, f)))
+        return True
+
+    def _collect(self):
+        interval = self.app.config['FRAME_PROGRESS_SECONDS']
+        while True:
+            try:
+                batch_id, future = self._results.get(timeout=interval)
+            except queue.Empty:
+                batch_id = future = None
+            with self.app.app_context():
+                if future is not None:
+                    try:
+                        self._finish(batch_id, future)
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Failed to record frame batch %s", batch_id)
+                    finally:
+                        with self._lock:
+                            state = self._in_flight.pop(batch_id, None)
+                        if state is not None and state['pack'] is not None:
+                            state['pack'].close()
+                with self._lock:
+                    running = list(self._in_flight)
+                for running_id in running:
+                    try:
+                        self._record(running_id)
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Failed to record progress of frame batch %s", running_id)
+
+    def _record(self, batch_id, final=False):
+        """Insert rows for the frames written since the last call, return how many were recorded"""
+        with self._lock:
+            state = self._in_flight.get(batch_id)
+        if state is None:
+            return 0
+        try:
+            names = sorted(name for name in os.listdir(state['folder']) if name.startswith(FRAME_PREFIX))
+        except FileNotFoundError:
+            names = []
+        if not final:
+            names = names[:-1]  # The newest file may still be being written
+        # Packed frames leave the folder once recorded
+        new = names if state['pack'] is not None else names[state['recorded']:]
+        if new:
+            samples, state['samples_read'] = read_samples(os.path.join(state['folder'], SAMPLES_NAME),
+                                                          state['samples_read'])
+            state['samples'].update(samples)
+
+        insert_size = self.app.config['FRAME_INSERT_BATCH_SIZE']
+        now = datetime.utcnow()
+        rows, packed = [], []
+        for name in new:
+            index = int(name[len(FRAME_PREFIX):].split('.', 1)[0])
+            path = os.path.join(state['folder'], name)
+            if state['dimensions'] is None:
+                state['dimensions'] = jpeg_dimensions(path)
+            width, height = state['dimensions']
+            if state['pack'] is not None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                (number, _, _), = state['pack'].append([data])
+                packed.append(path)
+                file_path, file_size, crc = frame_pack.pack_ref(state['pack'].pack_path, number), len(data), zlib.crc32(data)
+            else:
+                file_path, file_size, crc = path, os.path.getsize(path), file_crc32(path)
+            score, perceptual_hash, duplicate_of, distance = state['samples'].pop(index, (None, None, None, None))
+            metadata = {'crc32': crc}
+            if state['auto']:
+                metadata['motion_score'] = score
+            if duplicate_of is not None:
+                metadata.update(duplicate_of=duplicate_of, hamming_distance=distance)
+            rows.append(dict(
+                state['row'],
+                filename=name,
+                file_path=file_path,
+                offset_seconds=round(state['start_seconds'] + index * state['interval_seconds'], 3),
+                width=width,
+                height=height,
+                file_size=file_size,
+                batch_index=index,
+                perceptual_hash=perceptual_hash,
+                is_duplicate=duplicate_of is not None,
+                frame_metadata=metadata,
+                created_at=now,
+                updated_at=now,
+            ))
+            if len(rows) >= insert_size:
+                db.session.execute(insert(Frame.__table__), rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(Frame.__table__), rows)
+        state['recorded'] += len(new)
+
+        # Also the heartbeat of a running batch
+        batches = FrameBatch.__table__
+        db.session.execute(
+            update(batches).where(batches.c.id == batch_id)
+            .values(processed_frames=state['recorded'], updated_at=now)
+        )
+        db.session.commit()
+        for path in packed:
+            os.remove(path)
+        return state['recorded']
+
+    def _finish(self, batch_id, future):
+        try:
+            future.result()
+            error = None
+        except Exception as e:
+            error = str(e)
+        recorded = self._record(batch_id, final=True)
+        batch = db.session.get(FrameBatch, batch_id)
+        if batch is None:
+            return
+        batch.is_completed = True
+        if error is None:
+            batch.total_frames = recorded
+            batch.error_message = None
+            logger.info("Frame batch %s extracted %d frames", batch_id, recorded)
+        else:
+            batch.error_message = error[-1000:]
+            logger.error("Frame batch %s failed: %s", batch_id, error)
+        db.session.commit()
+
+    def is_running(self, batch_id):
+        with self._lock:
+            return batch_id in self._in_flight
+
+    def discard(self, batch):
+        """Remove a batch's frames, rows and files"""
+        Frame.query.filter_by(batch_id=batch.id).delete(synchronize_session=False)
+        db.session.delete(batch)
+        db.session.commit()
+        frame_pack.forget(self.batch_dir(batch.id))
+        shutil.rmtree(self.batch_dir(batch.id), ignore_errors=True)
+
+    def requeue_stale(self, older_than_seconds):
+        """Restart batches whose worker died (e.g. a restart), return how many.
+
+        Every process refreshes the batches it runs, so only abandoned ones
+        go stale; claiming one is a conditional UPDATE only one process wins.
+        """
+        with self._lock:
+            running = list(self._in_flight)
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=older_than_seconds)
+        stale = FrameBatch.query.filter(
+            FrameBatch.is_completed.is_(False),
+            FrameBatch.updated_at < cutoff,
+            ~FrameBatch.id.in_(running)
+        ).all()
+        restarted = 0
+        for batch in stale:
+            won = FrameBatch.query.filter(
+                FrameBatch.id == batch.id, FrameBatch.updated_at == batch.updated_at
+            ).update({FrameBatch.processed_frames: 0, FrameBatch.updated_at: now}, synchronize_session=False)
+            db.session.commit()
+            if not won:
+                continue
+            Frame.query.filter_by(batch_id=batch.id).delete(synchronize_session=False)
+            db.session.commit()
+            frame_pack.forget(self.batch_dir(batch.id))
+            shutil.rmtree(self.batch_dir(batch.id), ignore_errors=True)
+            video = db.session.get(Video, batch.video_id)
+            if video is None:
+                batch.is_completed = True
+                batch.error_message = 'Source video no longer exists'
+                db.session.commit()
+                continue
+            db.session.refresh(batch)
+            restarted += self.submit(batch, video)
+        return restarted
+
+frame_extractor = FrameExtractor()
@@ -0,0 +1,154 @@
+"""Packed frame storage.
+
+A batch stored as a pack keeps all its JPEGs in one file, appended back to
+back, instead of one file per frame. The offset index next to the pack is a
+flat array of little-endian 64-bit offsets (frame ``i`` is
+``pack[offsets[i]:offsets[i + 1]]``), written append-only after the frame
+data so it never points past what is on disk. A day of frames at a one
+second interval is then two files rather than 86,400.
+
+``Frame.file_path`` of a packed frame is ``<pack path>#<frame number>``.
+``resolve`` turns any frame path into ``(path, offset, length)``. Plain
+frame files resolve to the whole file, so callers handle both formats the
+same way. ``read_frame`` returns a zero-copy ``memoryview`` slice of the
+memory-mapped pack.
+"""
+from array import array
+from collections import OrderedDict
+import mmap
+import os
+import sys
+import threading
+
+PACK_NAME = 'frames.pack'
+INDEX_NAME = 'frames.idx'
+MAGIC = b'FPI1\0\0\0\0'  # 8 bytes, keeps the offsets aligned
+
+# Memory-mapped packs kept open per process
+MAX_OPEN_PACKS = 64
+
+def pack_ref(pack_path, number):
+    """``Frame.file_path`` of the ``number``-th frame of a pack"""
+    return f'{pack_path}#{number}'
+
+def is_packed(file_path):
+    return '#' in os.path.basename(file_path)
+
+def _load_offsets(index_path):
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{index_path} is not a frame pack index')
+    data = data[len(MAGIC):]
+    offsets = array('Q')
+    offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets
+
+class FramePackWriter:
+    """Appends frames to a pack and its offset index"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.pack_path = os.path.join(directory, PACK_NAME)
+        index_path = os.path.join(directory, INDEX_NAME)
+        self._pack = open(self.pack_path, 'ab')
+        self._index = open(index_path, 'ab')
+        if self._index.tell() == 0:
+            self._write_offsets([0])
+            self.count = 0
+        else:
+            self.count = len(_load_offsets(index_path)) - 1
+        self.size = self._pack.tell()
+
+    def _write_offsets(self, offsets):
+        data = array('Q', offsets)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        if self._index.tell() == 0:
+            self._index.write(MAGIC)
+        self._index.write(data.tobytes())
+
+    def append(self, frames):
+        """Append encoded frames, return their ``(number, offset, length)``"""
+        added, boundaries = [], []
+        for data in frames:
+            self._pack.write(data)
+            added.append((self.count, self.size, len(data)))
+            self.count += 1
+            self.size += len(data)
+            boundaries.append(self.size)
+        # Data first, so the index never refers to bytes not yet written
+        self._pack.flush()
+        if boundaries:
+            self._write_offsets(boundaries)
+            self._index.flush()
+        return added
+
+    def close(self):
+        self._pack.close()
+        self._index.close()
+
+class FramePack:
+    """Read-only memory map of a pack and its offsets"""
+
+    def __init__(self, pack_path):
+        self.path = pack_path
+        self.offsets = _load_offsets(os.path.join(os.path.dirname(pack_path), INDEX_NAME))
+        with open(pack_path, 'rb') as f:
+            length = self.offsets[-1]
+            self._map = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) if length else b''
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def span(self, number):
+        """``(offset, length)`` of a frame"""
+        if not 0 <= number < len(self):
+            raise IndexError(f'{self.path} has no frame {number}')
+        return self.offsets[number], self.offsets[number + 1] - self.offsets[number]
+
+    def view(self, number):
+        """Zero-copy ``memoryview`` of a frame's bytes"""
+        offset, length = self.span(number)
+        return memoryview(self._map)[offset:offset + length]
+
+_open_packs = OrderedDict()
+_open_packs_lock = threading.Lock()
+
+def open_pack(pack_path, number=None):
+    """Mapped pack, mapped again when it has grown past ``number`` since"""
+    with _open_packs_lock:
+        pack = _open_packs.get(pack_path)
+        if pack is not None:
+            _open_packs.move_to_end(pack_path)
+    if pack is None or (number is not None and number >= len(pack)):
+        pack = FramePack(pack_path)
+        with _open_packs_lock:
+            # Evicted maps are closed once the last view of them is released
+            _open_packs[pack_path] = pack
+            while len(_open_packs) > MAX_OPEN_PACKS:
+                _open_packs.popitem(last=False)
+    return pack
+
+def forget(directory):
+    """Drop the maps of a batch directory that is being removed"""
+    with _open_packs_lock:
+        _open_packs.pop(os.path.join(directory, PACK_NAME), None)
+
+def resolve(file_path, size=None):
+    """``(path, offset, length)`` of a frame's bytes, packed or not"""
+    if is_packed(file_path):
+        pack_path, _, number = file_path.rpartition('#')
+        offset, length = open_pack(pack_path, int(number)).span(int(number))
+        return pack_path, offset, length
+    return file_path, 0, size if size is not None else os.path.getsize(file_path)
+
+def read_frame(file_path):
+    """A frame's encoded bytes, a zero-copy slice of the pack for packed frames"""
+    if is_packed(file_path):
+        pack_path, _, number = file_path.rpartition('#')
+        return open_pack(pack_path, int(number)).view(int(number))
+    with open(file_path, 'rb') as f:
+        return f.read()
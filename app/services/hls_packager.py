@@ -0,0 +1,211 @@
+"""On-demand HLS packaging.
+
+The first playlist request for a video remuxes it into MPEG-TS segments with
+ffmpeg stream copy (no re-encode) and records a ``Segment`` row per segment.
+Output is cached on disk per content checksum, so deduplicated videos share
+it and later requests only read files. Packaging runs in a small thread pool
+and is single-flight: concurrent requests, also from other worker processes,
+wait for the same run.
+"""
+from app import db
+from app.models.segment import Segment, SegmentStatus
+from app.services.storage import storage_for
+from app.utils import disk_cache
+from app.utils.upload_utils import format_size
+from concurrent.futures import TimeoutError
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+import logging
+import os
+import shutil
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_NAME = 'index.m3u8'
+SEGMENT_PATTERN = 'seg%05d.ts'
+
+class PackagingError(Exception):
+    """ffmpeg could not package the video, e.g. a codec MPEG-TS cannot carry"""
+    pass
+
+def _is_packaged(out_dir):
+    return os.path.exists(os.path.join(out_dir, PLAYLIST_NAME))
+
+def _package(source, out_dir, ffmpeg_bin, segment_seconds, timeout):
+    """Remux ``source`` into an HLS playlist and segments in ``out_dir``"""
+    with disk_cache.build(out_dir, ready=_is_packaged) as tmp_dir:
+        if tmp_dir is None:
+            return
+        os.makedirs(tmp_dir)
+        try:
+            subprocess.run(
+                [ffmpeg_bin, '-nostdin', '-v', 'error', '-i', source,
+                 '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy',
+                 '-f', 'hls', '-hls_time', str(segment_seconds),
+                 '-hls_playlist_type', 'vod', '-hls_list_size', '0',
+                 '-hls_segment_filename', os.path.join(tmp_dir, SEGMENT_PATTERN),
+                 os.path.join(tmp_dir, PLAYLIST_NAME)],
+                capture_output=True, check=True, timeout=timeout
+            )
+        except subprocess.CalledProcessError as e:
+            raise PackagingError(e.stderr.decode(errors='replace').strip() or str(e))
+
+def parse_playlist(path):
+    """``(filename, duration)`` of every segment in a media playlist"""
+    segments, duration = [], None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',', 1)[0])
+            elif line and not line.startswith('#') and duration is not None:
+                segments.append((line, duration))
+                duration = None
+    return segments
+
+class HlsPackager:
+    """Thread-pool packager with per-checksum single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight(
+            'hls', lambda checksum, e: logger.error("HLS packaging failed for %s: %s", checksum, e)
+        )
+
+    def init_app(self, app):
+        self.app = app
+
+    def package_dir(self, checksum):
+        return os.path.join(self.app.config['HLS_CACHE_DIR'], checksum[:2], checksum)
+
+    def is_packaged(self, checksum):
+        return _is_packaged(self.package_dir(checksum))
+
+    def package(self, checksum, location, wait_seconds=None):
+        """Package content unless cached, waiting up to ``wait_seconds``.
+
+        Returns whether the package is ready. Raises ``PackagingError`` when
+        ffmpeg failed.
+        """
+        if self.is_packaged(checksum):
+            return True
+        future = self._jobs.submit(
+            checksum, self.app.config['HLS_WORKERS'], _package,
+            storage_for(location).media_input(location),
+            self.package_dir(checksum),
+            self.app.config['FFMPEG_BIN'],
+            self.app.config['HLS_SEGMENT_SECONDS'],
+            self.app.config['HLS_PACKAGE_TIMEOUT']
+        )
+        try:
+            future.result(timeout=wait_seconds)
+        except TimeoutError:
+            return False
+        return True
+
+    def ensure_segments(self, video, wait_seconds=None):
+        """``Segment`` rows of a packaged video, packaging it on first use.
+
+        Returns ``None`` while packaging is still running, and an empty list
+        when the rows are being recorded by another request.
+        """
+        segments = video.segments.filter_by(status=SegmentStatus.READY).order_by(Segment.segment_index).all()
+        if segments and os.path.exists(segments[0].file_path):
+            return segments
+        if segments:
+            # The cached package was evicted, its rows are rebuilt below
+            video.segments.delete()
+            db.session.commit()
+
+        if not self.package(video.checksum, video.stored_path, wait_seconds):
+            return None
+
+        out_dir = self.package_dir(video.checksum)
+        now = datetime.utcnow()
+        segment_seconds = self.app.config['HLS_SEGMENT_SECONDS']
+        segments, start = [], 0.0
+        for index, (filename, duration) in enumerate(parse_playlist(os.path.join(out_dir, PLAYLIST_NAME))):
+            path = os.path.join(out_dir, filename)
+            size = os.path.getsize(path)
+            segments.append(Segment(
+                filename=filename,
+                file_path=path,
+                segment_index=index,
+                start_seconds=start,
+                end_seconds=start + duration,
+                duration_seconds=duration,
+                file_size=size,
+                file_size_human=format_size(size),
+                width=video.width,
+                height=video.height,
+                fps=video.fps,
+                bitrate=int(size * 8 / duration) if duration else None,
+                status=SegmentStatus.READY,
+                processing_started_at=now,
+                processing_completed_at=now,
+                segment_seconds=segment_seconds,
+                segment_metadata={'format': 'hls', 'container': 'mpegts', 'codec': 'copy'},
+                video_id=video.id,
+                user_id=video.user_id,
+                project_id=video.project_id
+            ))
+            start += duration
+        if not segments:
+            # A package without segments is unusable, the next request packages again
+            self.discard(video.checksum)
+            return None
+
+        try:
+            db.session.add_all(segments)
+            db.session.commit()
+        except IntegrityError:
+            # Recorded concurrently by another request for the same video
+            db.session.rollback()
+            segments = video.segments.order_by(Segment.segment_index).all()
+        return segments
+
+    def touch(self, checksum):
+        """Mark a package as used, packages idle for too long are evicted"""
+        try:
+            os.utime(os.path.join(self.package_dir(checksum), PLAYLIST_NAME))
+        except OSError:
+            pass
+
+    def discard(self, checksum):
+        """Remove the package of content that is no longer stored, and its rows"""
+        out_dir = self.package_dir(checksum)
+        Segment.query.filter(Segment.file_path.like(out_dir + os.sep + '%')).delete(synchronize_session=False)
+        db.session.commit()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    def evict_idle(self, max_idle_seconds):
+        """Remove packages whose playlist was not requested recently, and their rows"""
+        root = self.app.config['HLS_CACHE_DIR']
+        cutoff = time.time() - max_idle_seconds
+        evicted = 0
+        if not os.path.isdir(root):
+            return evicted
+        for shard in os.scandir(root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                playlist = os.path.join(entry.path, PLAYLIST_NAME)
+                if not entry.is_dir() or entry.name.startswith('.') or '.tmp' in entry.name \
+                        or not os.path.exists(playlist):
+                    continue
+                if os.path.getmtime(playlist) >= cutoff:
+                    continue
+                Segment.query.filter(Segment.file_path.like(entry.path + os.sep + '%')).delete(
+                    synchronize_session=False
+                )
+                db.session.commit()
+                # Renamed first so no request reads a half-deleted package
+                trash = os.path.join(shard.path, f'.evicted-{entry.name}')
+                os.rename(entry.path, trash)
+                shutil.rmtree(trash, ignore_errors=True)
+                evicted += 1
+        return evicted
+
+hls_packager = HlsPackager()
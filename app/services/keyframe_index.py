@@ -0,0 +1,160 @@
+"""Keyframe seek index per video content.
+
+The presentation time and byte offset of every keyframe are stored in a
+compact sidecar file per content checksum (two packed arrays, 16 bytes per
+keyframe), so seeking a long recording is a binary search instead of a decode
+from the start. MP4/MOV indexes are read from the container's sample tables,
+other containers are indexed from ffprobe's packet list without decoding.
+Indexes are built in the background right after upload and on first use for
+content stored before that.
+"""
+from app.services.storage import storage_for
+from app.utils import disk_cache, mp4_parser
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+import logging
+import os
+import struct
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'KFI1'
+HEADER = struct.Struct('<4sI')  # magic, keyframe count
+
+# Parsed indexes kept in memory
+MAX_LOADED_INDEXES = 256
+
+class KeyframeIndex:
+    """Sorted keyframe times (seconds) and their byte offsets"""
+
+    def __init__(self, times, offsets):
+        self.times = array('d', times)
+        self.offsets = array('q', offsets)
+
+    def __len__(self):
+        return len(self.times)
+
+    def seek(self, seconds):
+        """``(keyframe_number, keyframe_time, byte_offset)`` of the last keyframe at or before ``seconds``"""
+        if not self.times:
+            return None
+        number = max(bisect_right(self.times, seconds) - 1, 0)
+        return number, self.times[number], self.offsets[number]
+
+    def dumps(self):
+        times, offsets = array('d', self.times), array('q', self.offsets)
+        if sys.byteorder != 'little':
+            times.byteswap()
+            offsets.byteswap()
+        return HEADER.pack(MAGIC, len(times)) + times.tobytes() + offsets.tobytes()
+
+    @classmethod
+    def loads(cls, data):
+        magic, count = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + count * 16:
+            raise ValueError('Not a keyframe index')
+        index = cls((), ())
+        index.times.frombytes(data[HEADER.size:HEADER.size + count * 8])
+        index.offsets.frombytes(data[HEADER.size + count * 8:])
+        if sys.byteorder != 'little':
+            index.times.byteswap()
+            index.offsets.byteswap()
+        return index
+
+def scan_keyframes(source, ffprobe_bin='ffprobe', timeout=600):
+    """``(times, offsets)`` of the video keyframes of a local file or URL"""
+    if os.path.isfile(source):
+        try:
+            return mp4_parser.keyframes_file(source)
+        except (mp4_parser.UnsupportedContainer, ValueError) as e:
+            logger.debug("Container parser cannot index %s: %s", source, e)
+
+    # Packet flags are read from the demuxer, nothing is decoded
+    output = subprocess.run(
+        [ffprobe_bin, '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,pos,flags', '-of', 'compact=p=0', source],
+        capture_output=True, check=True, timeout=timeout
+    ).stdout.decode(errors='replace')
+    keyframes = []
+    for line in output.splitlines():
+        packet = dict(item.partition('=')[::2] for item in line.split('|'))
+        if 'K' not in packet.get('flags', ''):
+            continue
+        try:
+            keyframes.append((float(packet['pts_time']), int(packet['pos'])))
+        except (KeyError, ValueError):
+            continue  # No timestamp or position (N/A)
+    keyframes.sort()
+    return [time for time, _ in keyframes], [offset for _, offset in keyframes]
+
+class KeyframeIndexer:
+    """Builds, stores and loads keyframe indexes, one build per checksum at a time"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight(
+            'keyframes', lambda checksum, e: logger.error("Keyframe indexing failed for %s: %s", checksum, e)
+        )
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def index_path(self, checksum):
+        return os.path.join(self.app.config['KEYFRAME_INDEX_DIR'], checksum[:2], f'{checksum}.kfi')
+
+    def _build(self, checksum, location):
+        path = self.index_path(checksum)
+        if os.path.exists(path):
+            return path
+        times, offsets = scan_keyframes(storage_for(location).media_input(location), self.app.config['FFPROBE_BIN'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(KeyframeIndex(times, offsets).dumps())
+        os.replace(tmp_path, path)
+        logger.info("Indexed %d keyframes of %s", len(times), checksum)
+        return path
+
+    def submit(self, checksum, location):
+        """Build the index of content in the background, return the future"""
+        return self._jobs.submit(checksum, self.app.config['KEYFRAME_INDEX_WORKERS'], self._build, checksum, location)
+
+    def index_for(self, video, timeout=None):
+        """Keyframe index of ``video``'s content, building it first if needed"""
+        with self._lock:
+            index = self._loaded.get(video.checksum)
+            if index is not None:
+                self._loaded.move_to_end(video.checksum)
+                return index
+        path = self.index_path(video.checksum)
+        if not os.path.exists(path):
+            self.submit(video.checksum, video.stored_path).result(timeout=timeout)
+        with open(path, 'rb') as f:
+            index = KeyframeIndex.loads(f.read())
+        with self._lock:
+            self._loaded[video.checksum] = index
+            while len(self._loaded) > MAX_LOADED_INDEXES:
+                self._loaded.popitem(last=False)
+        return index
+
+    def seek(self, video, seconds, timeout=None):
+        """``(keyframe_time, byte_offset)`` to start reading ``video`` from for ``seconds``"""
+        found = self.index_for(video, timeout).seek(seconds)
+        return found[1:] if found else None
+
+    def discard(self, checksum):
+        """Remove the index of content that is no longer stored"""
+        with self._lock:
+            self._loaded.pop(checksum, None)
+        try:
+            os.remove(self.index_path(checksum))
+        except FileNotFoundError:
+            pass
+
+keyframe_indexer = KeyframeIndexer()
@@ -0,0 +1,202 @@
+"""Background media probing.
+
+Uploads are marked ``PROCESSING`` and handed to this pipeline, which probes
+them in a bounded process pool and fills the technical ``Video`` fields
+(duration, dimensions, fps, bitrate, codec) before moving them to ``READY``.
+Results are collected by one thread and committed in batches, so a burst of
+uploads costs a handful of UPDATEs rather than one transaction per file.
+"""
+from app import db
+from app.models.video import Video, VideoStatus
+from app.services.storage import storage_for
+from app.utils import mp4_parser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, update
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROBE_FIELDS = ('duration_seconds', 'width', 'height', 'fps', 'bitrate', 'codec')
+
+def _parse_rate(rate):
+    """Parse an ffprobe frame rate such as ``30000/1001``"""
+    try:
+        num, _, den = (rate or '').partition('/')
+        value = float(num) / float(den or 1)
+        return round(value, 3) if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def probe_container(path):
+    """Technical video fields read directly from an MP4/MOV container.
+
+    Returns ``None`` when the file needs an external prober.
+    """
+    try:
+        return mp4_parser.parse_file(path)
+    except (mp4_parser.UnsupportedContainer, OSError, ValueError) as e:
+        logger.debug("Container parser skipped %s: %s", path, e)
+        return None
+
+def probe_file(source, ffprobe_bin='ffprobe', timeout=60):
+    """Probe a media file or URL and return the technical video fields.
+
+    Local MP4/MOV files are read by the container parser, ffprobe is only
+    spawned for other containers and remote content. Runs in a pool worker
+    process, so it only takes and returns plain data.
+    """
+    if os.path.isfile(source):
+        fields = probe_container(source)
+        if fields is not None:
+            return fields
+
+    output = subprocess.run(
+        [ffprobe_bin, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', source],
+        capture_output=True, check=True, timeout=timeout
+    ).stdout
+    info = json.loads(output)
+    stream = next((s for s in info.get('streams', []) if s.get('codec_type') == 'video'), {})
+    fmt = info.get('format', {})
+
+    duration = stream.get('duration') or fmt.get('duration')
+    bitrate = fmt.get('bit_rate') or stream.get('bit_rate')
+    return {
+        'duration_seconds': float(duration) if duration else None,
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+        'fps': _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate')),
+        'bitrate': int(bitrate) if bitrate else None,
+        'codec': stream.get('codec_name'),
+    }
+
+class ProbePipeline:
+    """Process-pool prober with a batching result collector"""
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._results = queue.Queue()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.app.config['PROBE_WORKERS'])
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name='probe-collector', daemon=True)
+                self._collector.start()
+
+    def submit(self, checksum, location):
+        """Queue content for probing, every video with this checksum is updated"""
+        self._ensure_started()
+        with self._lock:
+            if checksum in self._in_flight:
+                return False
+            self._in_flight.add(checksum)
+
+        source = storage_for(location).media_input(location)
+        future = self._pool.submit(probe_file, source, self.app.config['FFPROBE_BIN'])
+        future.add_done_callback(lambda f: self._results.put((checksum, f)))
+        return True
+
+    def is_pending(self, checksum):
+        with self._lock:
+            return checksum in self._in_flight
+
+    def _collect(self):
+        batch_size = self.app.config['PROBE_BATCH_SIZE']
+        flush_seconds = self.app.config['PROBE_FLUSH_SECONDS']
+        while True:
+            batch = [self._results.get()]
+            deadline = time.monotonic() + flush_seconds
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._results.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._commit(batch)
+            except Exception:
+                logger.exception("Failed to store probe results for %d file(s)", len(batch))
+            finally:
+                with self._lock:
+                    self._in_flight.difference_update(checksum for checksum, _ in batch)
+
+    def _commit(self, batch):
+        ready, failed = [], []
+        for checksum, future in batch:
+            try:
+                fields = future.result()
+            except Exception as e:
+                logger.warning("Probe failed for %s: %s", checksum, e)
+                failed.append({'b_checksum': checksum})
+                continue
+            ready.append(dict({f'b_{name}': fields.get(name) for name in PROBE_FIELDS}, b_checksum=checksum))
+
+        # Core executemany against the table, one statement per outcome for the whole batch
+        videos = Video.__table__
+        with self.app.app_context():
+            now = datetime.utcnow()
+            if ready:
+                db.session.execute(
+                    update(videos)
+                    .where(videos.c.checksum == bindparam('b_checksum'))
+                    .values(status=VideoStatus.READY, updated_at=now,
+                            **{name: bindparam(f'b_{name}') for name in PROBE_FIELDS}),
+                    ready
+                )
+            if failed:
+                db.session.execute(
+                    update(videos)
+                    .where(videos.c.checksum == bindparam('b_checksum'))
+                    .values(status=VideoStatus.ERROR, updated_at=now),
+                    failed
+                )
+            db.session.commit()
+        logger.info("Stored probe results: %d ready, %d failed", len(ready), len(failed))
+
+    def requeue_stale(self, older_than_seconds, limit=500):
+        """Re-submit PROCESSING videos that no worker is probing, e.g. after a restart.
+
+        Every worker process runs this job; claiming the content is a
+        conditional UPDATE only one process wins.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=older_than_seconds)
+        rows = db.session.query(Video.checksum, Video.stored_path).filter(
+            Video.status == VideoStatus.PROCESSING,
+            Video.updated_at < cutoff
+        ).distinct().limit(limit).all()
+        videos = Video.__table__
+        requeued = 0
+        for checksum, location in rows:
+            if self.is_pending(checksum):
+                continue
+            won = db.session.execute(
+                update(videos)
+                .where(videos.c.checksum == checksum,
+                       videos.c.status == VideoStatus.PROCESSING,
+                       videos.c.updated_at < cutoff)
+                .values(updated_at=now)
+            ).rowcount
+            db.session.commit()
+            if won:
+                requeued += self.submit(checksum, location)
+        return requeued
+
+probe_pipeline = ProbePipeline()
@@ -0,0 +1,184 @@
+"""Gated batch frame extraction: motion gating and near-duplicate suppression.
+
+The batch decode pass is split in two: every sample is written as a full
+JPEG to a staging folder, and a tiny grayscale copy
+(``ANALYSIS_WIDTH`` x ``ANALYSIS_HEIGHT``) is streamed to the worker as raw
+video. The worker handles blocks of samples with NumPy. For each sample it
+computes a motion score: the mean absolute difference from the previous
+sample, 0 for identical pictures and 1 for black to white. It also computes
+a 64-bit difference hash (see ``perceptual_hash``).
+
+Automatic batches (``FrameType.AUTO``) keep a sample when its score reaches
+the threshold, or when nothing was kept for ``max_gap_seconds``. Interval
+batches keep every sample. A kept sample whose hash is within
+``dedupe_distance`` bits of one of the last ``dedupe_window`` original
+frames is a near-duplicate of it. With ``dedupe`` set to ``tag`` it is kept
+and marked; with ``skip`` it is dropped, unless the max gap forces it.
+
+Kept JPEGs are moved into the batch folder, where the collector records them
+like any batch frame. Every other JPEG is deleted right away. The score,
+hash and duplicate of each kept frame are appended to ``samples.tsv`` before
+the frame is moved, so the collector can record them with it.
+"""
+from app.utils.perceptual_hash import dhash, hamming, hash_hex
+from collections import deque
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+STAGING_DIR = '.staging'
+SAMPLES_NAME = 'samples.tsv'
+
+# Multiples of the 9x8 dHash grid
+ANALYSIS_WIDTH = 72
+ANALYSIS_HEIGHT = 64
+
+# Samples analysed per NumPy call
+BLOCK_FRAMES = 256
+
+def motion_scores(frames, previous=None):
+    """Mean absolute difference of each frame from the one before, scaled to 0..1.
+
+    ``frames`` is a ``(n, height, width)`` uint8 array; ``previous`` is the
+    frame before the first one, which scores 1 without it.
+    """
+    import numpy as np
+    stack = frames.astype(np.int16)
+    if previous is not None:
+        stack = np.concatenate((previous.astype(np.int16)[None], stack))
+    scores = np.abs(np.diff(stack, axis=0)).mean(axis=(1, 2)) / 255.0
+    if previous is None:
+        scores = np.concatenate(([1.0], scores))
+    return scores
+
+def read_samples(path, position=0):
+    """``({index: (score, hash, duplicate_of, distance)}, position)`` of the lines appended after ``position``"""
+    try:
+        with open(path) as f:
+            f.seek(position)
+            lines = f.read()
+    except FileNotFoundError:
+        return {}, position
+    complete = lines[:lines.rfind('\n') + 1]
+    samples = {}
+    for line in complete.splitlines():
+        index, score, value, duplicate_of, distance = line.split('\t')
+        samples[int(index)] = (round(float(score), 4), value,
+                               int(duplicate_of) if duplicate_of != '-' else None,
+                               int(distance) if distance != '-' else None)
+    return samples, position + len(complete)
+
+def extract_gated_frames(source, out_dir, start_seconds, duration, interval_seconds, max_frames,
+                         quality, width, height, options):
+    """Decode ``source`` once and keep the samples that pass the gates.
+
+    Runs in a pool worker process, so it only takes and returns plain data.
+    Returns the number of frames kept.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError('Gated frame extraction requires numpy')
+
+    staging = os.path.join(out_dir, STAGING_DIR)
+    os.makedirs(staging, exist_ok=True)
+    full = f'scale={width or -2}:{height or -2}' if width or height else 'null'
+    graph = (f'[0:v]fps=1/{interval_seconds!r},split=2[sample][low];[sample]{full}[full];'
+             f'[low]scale={ANALYSIS_WIDTH}:{ANALYSIS_HEIGHT},format=gray[analysis]')
+    command = [options['ffmpeg_bin'], '-nostdin', '-v', 'error', '-y',
+               '-ss', f'{start_seconds:.3f}', '-i', source]
+    if duration is not None:
+        command += ['-t', f'{duration + interval_seconds / 2:.3f}']
+    command += ['-filter_complex', graph, '-threads', str(options['threads']),
+                '-map', '[full]', '-q:v', str(quality), '-f', 'image2', '-atomic_writing', '1',
+                '-start_number', '0', os.path.join(staging, 'frame_%06d.jpg'),
+                '-map', '[analysis]', '-f', 'rawvideo', 'pipe:1']
+
+    threshold, max_gap = options.get('motion_threshold'), options.get('max_gap_seconds')
+    dedupe = options.get('dedupe') or 'off'
+    max_distance = options.get('dedupe_distance') or 0
+    originals = deque(maxlen=options.get('dedupe_window') or 1)  # (number, hash) of recent non-duplicates
+    frame_bytes = ANALYSIS_WIDTH * ANALYSIS_HEIGHT
+    kept, last_kept, previous, number = 0, None, None, 0
+    pending = deque()  # (number, sample line or None to drop) waiting for the JPEG of the sample
+
+    def decide(score, value):
+        """Sample line of a sample to keep, ``None`` to drop it"""
+        nonlocal last_kept
+        forced = last_kept is None or (max_gap is not None and (number - last_kept) * interval_seconds >= max_gap)
+        if threshold is not None and score < threshold and not forced:
+            return None
+        duplicate_of = distance = None
+        if dedupe != 'off' and originals:
+            distances = hamming([original for _, original in originals], value)
+            closest = int(distances.argmin())
+            if distances[closest] <= max_distance:
+                duplicate_of, distance = originals[closest][0], int(distances[closest])
+        if duplicate_of is not None and dedupe == 'skip' and not (threshold is not None and forced):
+            return None
+        if duplicate_of is None:
+            originals.append((number, value))
+        last_kept = number
+        return '\t'.join((str(number), f'{score:.6f}', hash_hex(value),
+                          '-' if duplicate_of is None else str(duplicate_of),
+                          '-' if distance is None else str(distance)))
+
+    def settle(finished=False):
+        nonlocal kept
+        while pending and (max_frames is None or kept < max_frames):
+            sample, line = pending[0]
+            name = f'frame_{sample:06d}.jpg'
+            path = os.path.join(staging, name)
+            if not os.path.exists(path):
+                if not finished:
+                    return
+            elif line is not None:
+                # The sample line goes first, the collector reads it when the frame appears
+                with open(os.path.join(out_dir, SAMPLES_NAME), 'a') as samples:
+                    samples.write(line + '\n')
+                os.rename(path, os.path.join(out_dir, name))
+                kept += 1
+            else:
+                os.remove(path)
+            pending.popleft()
+
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+        # The reads below block, a stalled input must not hold the worker forever
+        timed_out = threading.Event()
+        watchdog = threading.Timer(options['timeout'], lambda: (timed_out.set(), process.kill()))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            while max_frames is None or kept < max_frames:
+                data = process.stdout.read(frame_bytes * BLOCK_FRAMES)
+                count = len(data) // frame_bytes
+                if count:
+                    frames = np.frombuffer(data[:count * frame_bytes], dtype=np.uint8) \
+                        .reshape(count, ANALYSIS_HEIGHT, ANALYSIS_WIDTH)
+                    for score, value in zip(motion_scores(frames, previous).tolist(), dhash(frames)):
+                        pending.append((number, decide(score, value)))
+                        number += 1
+                    previous = frames[-1]
+                    settle()
+                if len(data) < frame_bytes * BLOCK_FRAMES:
+                    break
+            if max_frames is not None and kept >= max_frames:
+                process.kill()
+            process.wait()  # Bounded by the watchdog
+            settle(finished=True)
+        finally:
+            watchdog.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            shutil.rmtree(staging, ignore_errors=True)
+        if timed_out.is_set():
+            raise RuntimeError(f"ffmpeg timed out after {options['timeout']}s")
+        if process.returncode and not (max_frames is not None and kept >= max_frames):
+            errors.seek(0)
+            raise RuntimeError(errors.read().decode(errors='replace').strip() or
+                               f'ffmpeg exited with {process.returncode}')
+    return kept
@@ -0,0 +1,102 @@
+"""Low-resolution scrubbing proxies.
+
+Every stored video gets a small H.264 MP4 without audio: ``PROXY_HEIGHT``
+lines, a key frame every ``PROXY_KEYINT`` frames (1 makes it all-intra) and
+``moov`` at the front, so a dashboard can seek it anywhere while scrubbing
+and switch to the original on pause. Proxies are generated in the background
+by a bounded thread pool (ffmpeg does the work), cached on disk per content
+checksum and evicted least-recently-used once the cache outgrows
+``PROXY_CACHE_MAX_BYTES``. A later request simply generates the proxy again.
+"""
+from app.services.storage import storage_for
+from app.utils import disk_cache
+from concurrent.futures import TimeoutError
+import logging
+import os
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+class ProxyError(Exception):
+    """ffmpeg could not generate the proxy"""
+    pass
+
+def _generate(source, path, options):
+    """Encode the proxy of ``source`` to ``path`` unless another process did meanwhile"""
+    with disk_cache.build(path, '.mp4') as tmp_path:
+        if tmp_path is None:
+            return
+        try:
+            subprocess.run(
+                [options['ffmpeg_bin'], '-nostdin', '-v', 'error', '-y', '-i', source,
+                 '-map', '0:v:0', '-an', '-sn', '-dn',
+                 '-vf', f"scale=-2:min({options['height']}\\,ih)",
+                 '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'fastdecode',
+                 '-crf', str(options['crf']), '-pix_fmt', 'yuv420p',
+                 '-g', str(options['keyint']), '-keyint_min', str(options['keyint']), '-bf', '0',
+                 '-sc_threshold', '0', '-threads', str(options['threads']),
+                 '-movflags', '+faststart', tmp_path],
+                capture_output=True, check=True, timeout=options['timeout']
+            )
+        except subprocess.CalledProcessError as e:
+            raise ProxyError(e.stderr.decode(errors='replace').strip() or str(e))
+
+class ProxyGenerator:
+    """Thread-pool proxy generator with per-checksum single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight(
+            'proxy', lambda checksum, e: logger.error("Proxy generation failed for %s: %s", checksum, e)
+        )
+
+    def init_app(self, app):
+        self.app = app
+
+    def proxy_path(self, checksum):
+        # Encoding settings are part of the name, changing them makes new proxies
+        name = f"{checksum}-{self.app.config['PROXY_HEIGHT']}p-k{self.app.config['PROXY_KEYINT']}.mp4"
+        return os.path.join(self.app.config['PROXY_CACHE_DIR'], checksum[:2], name)
+
+    def submit(self, checksum, location):
+        """Generate the proxy of content in the background unless cached, return the future"""
+        return self._jobs.submit(
+            checksum, self.app.config['PROXY_WORKERS'], _generate,
+            storage_for(location).media_input(location),
+            self.proxy_path(checksum),
+            {
+                'ffmpeg_bin': self.app.config['FFMPEG_BIN'],
+                'height': self.app.config['PROXY_HEIGHT'],
+                'keyint': self.app.config['PROXY_KEYINT'],
+                'crf': self.app.config['PROXY_CRF'],
+                'threads': self.app.config['PROXY_THREADS'],
+                'timeout': self.app.config['PROXY_TIMEOUT'],
+            }
+        )
+
+    def ensure(self, checksum, location, wait_seconds=None):
+        """Path of the proxy, generating it first; ``None`` while still generating.
+
+        Raises ``ProxyError`` when ffmpeg failed.
+        """
+        path = self.proxy_path(checksum)
+        if not os.path.exists(path):
+            try:
+                self.submit(checksum, location).result(timeout=wait_seconds)
+            except TimeoutError:
+                return None
+        disk_cache.touch(path)
+        return path
+
+    def discard(self, checksum):
+        """Remove the proxy of content that is no longer stored"""
+        try:
+            os.remove(self.proxy_path(checksum))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_bytes):
+        """Remove least recently used proxies until the cache fits ``max_bytes``"""
+        return disk_cache.evict_lru(self.app.config['PROXY_CACHE_DIR'], max_bytes, '.mp4')
+
+proxy_generator = ProxyGenerator()
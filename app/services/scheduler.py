@@ -82,6 +82,135 @@ def close_job(message_id: str):
         db.session.rollback()
         logger.exception("Error during close_job")
 
-def start_scheduler():
+def purge_uploads_job(app):
+    with app.app_context():
+        try:
+            from app.services.upload_sessions import purge_expired_sessions
+            purge_expired_sessions()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error during purge_uploads_job")
+
+def probe_backlog_job(app):
+    with app.app_context():
+        try:
+            from app.services.media_probe import probe_pipeline
+            requeued = probe_pipeline.requeue_stale(Config.PROBE_STALE_SECONDS)
+            if requeued:
+                logger.info("Requeued %d video(s) for probing", requeued)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error during probe_backlog_job")
+
+def transcode_queue_job(app):
+    with app.app_context():
+        try:
+            from app.services.transcoder import transcoder
+            transcoder.requeue_stale(Config.TRANSCODE_STALE_SECONDS)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error during transcode_queue_job")
+
+def frame_batches_job(app):
+    with app.app_context():
+        try:
+            from app.services.frame_extractor import frame_extractor
+            restarted = frame_extractor.requeue_stale(Config.FRAME_BATCH_STALE_SECONDS)
+            if restarted:
+                logger.info("Restarted %d abandoned frame batch(es)", restarted)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error during frame_batches_job")
+
+def evict_hls_job(app):
+    with app.app_context():
+        try:
+            from app.services.hls_packager import hls_packager
+            evicted = hls_packager.evict_idle(Config.HLS_CACHE_MAX_IDLE_SECONDS)
+            if evicted:
+                logger.info("Evicted %d idle HLS package(s)", evicted)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error during evict_hls_job")
+
+def evict_proxies_job(app):
+    with app.app_context():
+        try:
+            from app.services.proxy_generator import proxy_generator
+            evicted = proxy_generator.evict(Config.PROXY_CACHE_MAX_BYTES)
+            if evicted:
+                logger.info("Evicted %d scrubbing proxies", evicted)
+        except Exception:
+            logger.exception("Error during evict_proxies_job")
+
+def evict_snapshots_job(app):
+    with app.app_context():
+        try:
+            from app.services.snapshot_cache import snapshot_cache
+            evicted = snapshot_cache.evict(Config.SNAPSHOT_CACHE_MAX_BYTES)
+            if evicted:
+                logger.info("Evicted %d cached snapshots", evicted)
+        except Exception:
+            logger.exception("Error during evict_snapshots_job")
+
+def evict_frame_variants_job(app):
+    with app.app_context():
+        try:
+            from app.services.frame_converter import frame_converter
+            evicted = frame_converter.evict(Config.FRAME_VARIANT_CACHE_MAX_BYTES)
+            if evicted:
+                logger.info("Evicted %d cached frame variants", evicted)
+        except Exception:
+            logger.exception("Error during evict_frame_variants_job")
+
+def start_scheduler(app=None):
+    if app is not None and not sched.get_job("purge_uploads"):
+        sched.add_job(func=purge_uploads_job,
+                      trigger="interval",
+                      minutes=Config.UPLOAD_PURGE_INTERVAL_MINUTES,
+                      args=[app],
+                      id="purge_uploads")
+    if app is not None and not sched.get_job("probe_backlog"):
+        sched.add_job(func=probe_backlog_job,
+                      trigger="interval",
+                      minutes=1,
+                      args=[app],
+                      id="probe_backlog")
+    if app is not None and not sched.get_job("transcode_queue"):
+        sched.add_job(func=transcode_queue_job,
+                      trigger="interval",
+                      minutes=1,
+                      args=[app],
+                      id="transcode_queue")
+    if app is not None and not sched.get_job("frame_batches"):
+        sched.add_job(func=frame_batches_job,
+                      trigger="interval",
+                      minutes=1,
+                      args=[app],
+                      id="frame_batches")
+    if app is not None and not sched.get_job("evict_hls"):
+        sched.add_job(func=evict_hls_job,
+                      trigger="interval",
+                      hours=1,
+                      args=[app],
+                      id="evict_hls")
+    if app is not None and not sched.get_job("evict_proxies"):
+        sched.add_job(func=evict_proxies_job,
+                      trigger="interval",
+                      minutes=10,
+                      args=[app],
+                      id="evict_proxies")
+    if app is not None and not sched.get_job("evict_snapshots"):
+        sched.add_job(func=evict_snapshots_job,
+                      trigger="interval",
+                      minutes=10,
+                      args=[app],
+                      id="evict_snapshots")
+    if app is not None and not sched.get_job("evict_frame_variants"):
+        sched.add_job(func=evict_frame_variants_job,
+                      trigger="interval",
+                      minutes=10,
+                      args=[app],
+                      id="evict_frame_variants")
     if not sched.running:
         sched.start()
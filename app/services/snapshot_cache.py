@@ -0,0 +1,83 @@
+"""Cached single-frame snapshots.
+
+A snapshot is one JPEG decoded at an offset of a video. Its cache key is
+the content checksum together with the offset (to the millisecond) and the
+output width, height and quality. Any request for the same still of the
+same content, from any video row that references it, is then served from
+the disk cache without decoding. Concurrent requests for a still that is not
+cached share one decode: a thread-pool job in this process, and a file lock
+across worker processes. The cache is evicted least-recently-used once it
+outgrows ``SNAPSHOT_CACHE_MAX_BYTES``.
+"""
+from app.services.storage import storage_for
+from app.utils import disk_cache
+import hashlib
+import os
+import subprocess
+
+class SnapshotError(Exception):
+    """ffmpeg could not decode a frame at the offset"""
+    pass
+
+def snapshot_key(checksum, offset_seconds, width=None, height=None, quality=2):
+    """Content address of a snapshot"""
+    params = f'{checksum}:{round(offset_seconds * 1000)}:{width or 0}:{height or 0}:{quality}'
+    return hashlib.sha256(params.encode()).hexdigest()
+
+def _decode(source, path, offset_seconds, width, height, quality, options):
+    """Write the frame at ``offset_seconds`` to ``path`` unless another process did meanwhile"""
+    # Snapshots are many and small, their locks are not kept around
+    with disk_cache.build(path, '.jpg', keep_lock=False) as tmp_path:
+        if tmp_path is None:
+            return path
+        command = [options['ffmpeg_bin'], '-nostdin', '-v', 'error', '-y',
+                   '-ss', f'{offset_seconds:.3f}', '-i', source, '-map', '0:v:0', '-an']
+        if width or height:
+            command += ['-vf', f'scale={width or -2}:{height or -2}']
+        command += ['-frames:v', '1', '-q:v', str(quality), '-f', 'image2', tmp_path]
+        try:
+            subprocess.run(command, capture_output=True, check=True, timeout=options['timeout'])
+        except subprocess.CalledProcessError as e:
+            raise SnapshotError(e.stderr.decode(errors='replace').strip() or str(e))
+        if not os.path.exists(tmp_path) or not os.path.getsize(tmp_path):
+            raise SnapshotError(f'No frame at {offset_seconds:.3f}s')
+    return path
+
+class SnapshotCache:
+    """Disk cache of decoded stills with per-key single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight('snapshot')
+
+    def init_app(self, app):
+        self.app = app
+
+    def snapshot_path(self, key):
+        return os.path.join(self.app.config['SNAPSHOT_CACHE_DIR'], key[:2], f'{key}.jpg')
+
+    def get(self, video, offset_seconds, width=None, height=None, quality=2):
+        """``(key, path)`` of the snapshot, decoding it first unless cached.
+
+        Raises ``SnapshotError`` when no frame can be decoded at the offset.
+        """
+        key = snapshot_key(video.checksum, offset_seconds, width, height, quality)
+        path = self.snapshot_path(key)
+        if not os.path.exists(path):
+            self._jobs.submit(
+                key, self.app.config['SNAPSHOT_WORKERS'], _decode,
+                storage_for(video.stored_path).media_input(video.stored_path),
+                path, round(offset_seconds, 3), width, height, quality,
+                {
+                    'ffmpeg_bin': self.app.config['FFMPEG_BIN'],
+                    'timeout': self.app.config['SNAPSHOT_TIMEOUT'],
+                }
+            ).result()
+        disk_cache.touch(path)
+        return key, path
+
+    def evict(self, max_bytes):
+        """Remove least recently used snapshots until the cache fits ``max_bytes``"""
+        return disk_cache.evict_lru(self.app.config['SNAPSHOT_CACHE_DIR'], max_bytes, '.jpg')
+
+snapshot_cache = SnapshotCache()
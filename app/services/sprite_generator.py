@@ -0,0 +1,149 @@
+"""Sprite sheets and WebVTT thumbnail tracks for timeline hover previews.
+
+Thumbnails are sampled with the batch frame decoder (one ffmpeg pass with an
+``fps`` filter) and tiled by ffmpeg into JPEG sheets of
+``SPRITE_COLUMNS`` x ``SPRITE_ROWS`` thumbnails. A WebVTT track maps each
+time range to a sheet and the thumbnail's rectangle in it
+(``sheet.jpg#xywh=x,y,w,h``). The sampling interval grows with the duration
+so a recording never has more than ``SPRITE_MAX_THUMBNAILS`` thumbnails, and
+a player previews a whole timeline from one or two images. Sheets are
+generated in the background after upload and cached on disk per content
+checksum.
+"""
+from app.services.frame_extractor import extract_frames, jpeg_dimensions
+from app.services.media_probe import probe_file
+from app.services.storage import storage_for
+from app.utils import disk_cache
+from concurrent.futures import TimeoutError
+import logging
+import math
+import os
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+TRACK_NAME = 'thumbnails.vtt'
+
+class SpriteError(Exception):
+    """The sprite sheets of a video cannot be generated"""
+    pass
+
+def _timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}'
+
+def webvtt_track(duration, interval, sheets, columns, rows, tile_width, tile_height):
+    """WebVTT cues pointing every interval of ``duration`` at its thumbnail in ``sheets``"""
+    per_sheet = columns * rows
+    count = min(math.ceil(duration / interval - 1e-9), len(sheets) * per_sheet)
+    lines = ['WEBVTT', '']
+    for number in range(count):
+        sheet, position = divmod(number, per_sheet)
+        row, column = divmod(position, columns)
+        lines.append(f'{_timestamp(number * interval)} --> {_timestamp(min((number + 1) * interval, duration))}')
+        lines.append(f'{sheets[sheet]}#xywh={column * tile_width},{row * tile_height},{tile_width},{tile_height}')
+        lines.append('')
+    return '\n'.join(lines)
+
+def _is_generated(path):
+    return os.path.exists(os.path.join(path, TRACK_NAME))
+
+def _generate(source, path, options):
+    """Write the sheets and track of ``source`` to the directory ``path``"""
+    with disk_cache.build(path, ready=_is_generated) as tmp_path:
+        if tmp_path is None:
+            return
+        try:
+            duration = probe_file(source, options['ffprobe_bin']).get('duration_seconds')
+        except subprocess.CalledProcessError as e:
+            raise SpriteError(e.stderr.decode(errors='replace').strip() or str(e))
+        if not duration:
+            raise SpriteError('Video duration is unknown')
+        interval = max(options['interval'], duration / options['max_thumbnails'])
+        columns, rows = options['columns'], options['rows']
+
+        try:
+            extract_frames(source, tmp_path, 0.0, duration, interval, None, options['quality'],
+                           options['width'], None, dict(options, tile=f'{columns}x{rows}'))
+        except RuntimeError as e:
+            raise SpriteError(str(e))
+        sheets = sorted(name for name in os.listdir(tmp_path) if name.endswith('.jpg'))
+        if not sheets:
+            raise SpriteError('No frames could be decoded')
+        sheet_width, sheet_height = jpeg_dimensions(os.path.join(tmp_path, sheets[0]))
+        with open(os.path.join(tmp_path, TRACK_NAME), 'w') as f:
+            f.write(webvtt_track(duration, interval, sheets, columns, rows,
+                                 sheet_width // columns, sheet_height // rows))
+
+class SpriteGenerator:
+    """Thread-pool sprite sheet generator with per-checksum single-flight"""
+
+    def __init__(self):
+        self.app = None
+        self._jobs = disk_cache.SingleFlight(
+            'sprites', lambda checksum, e: logger.error("Sprite generation failed for %s: %s", checksum, e)
+        )
+
+    def init_app(self, app):
+        self.app = app
+
+    def sprite_dir(self, checksum):
+        # Layout settings are part of the name, changing them makes new sheets
+        config = self.app.config
+        name = (f"{checksum}-w{config['SPRITE_WIDTH']}-{config['SPRITE_COLUMNS']}x{config['SPRITE_ROWS']}"
+                f"-i{config['SPRITE_INTERVAL_SECONDS']:g}-n{config['SPRITE_MAX_THUMBNAILS']}")
+        return os.path.join(config['SPRITE_CACHE_DIR'], checksum[:2], name)
+
+    def submit(self, checksum, location):
+        """Generate the sheets of content in the background unless cached, return the future"""
+        return self._jobs.submit(
+            checksum, self.app.config['SPRITE_WORKERS'], _generate,
+            storage_for(location).media_input(location),
+            self.sprite_dir(checksum),
+            {
+                'ffmpeg_bin': self.app.config['FFMPEG_BIN'],
+                'ffprobe_bin': self.app.config['FFPROBE_BIN'],
+                'width': self.app.config['SPRITE_WIDTH'],
+                'columns': self.app.config['SPRITE_COLUMNS'],
+                'rows': self.app.config['SPRITE_ROWS'],
+                'interval': self.app.config['SPRITE_INTERVAL_SECONDS'],
+                'max_thumbnails': self.app.config['SPRITE_MAX_THUMBNAILS'],
+                'quality': self.app.config['SPRITE_QUALITY'],
+                'threads': self.app.config['FRAME_THREADS'],
+                'timeout': self.app.config['FRAME_EXTRACT_TIMEOUT'],
+            }
+        )
+
+    def ensure(self, checksum, location, wait_seconds=None):
+        """Directory of the sheets and track, generating them first; ``None`` while still generating.
+
+        Raises ``SpriteError`` when they cannot be generated.
+        """
+        path = self.sprite_dir(checksum)
+        if not _is_generated(path):
+            try:
+                self.submit(checksum, location).result(timeout=wait_seconds)
+            except TimeoutError:
+                return None
+        return path
+
+    def move(self, checksum, new_checksum):
+        """Keep the sheets of content that was rewritten without changing its pictures"""
+        old_dir, new_dir = self.sprite_dir(checksum), self.sprite_dir(new_checksum)
+        if os.path.isdir(old_dir) and not os.path.exists(new_dir):
+            os.makedirs(os.path.dirname(new_dir), exist_ok=True)
+            os.rename(old_dir, new_dir)
+        self.discard(checksum)
+
+    def discard(self, checksum):
+        """Remove the sheets of content that is no longer stored"""
+        path = self.sprite_dir(checksum)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.remove(path + '.lock')
+        except FileNotFoundError:
+            pass
+
+sprite_generator = SpriteGenerator()
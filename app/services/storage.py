@@ -0,0 +1,239 @@
+"""Storage backends for video content.
+
+Content is written under a key (``ab/cd/<sha256>``) and referred to afterwards
+by the *location* the backend returns, which is what ends up in
+``Video.stored_path``: a filesystem path for the local backend and
+``s3://bucket/key`` for the S3-compatible one. Reads and deletes go to the
+backend owning a location, so rows written before a backend switch keep
+working.
+"""
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# Block size used when streaming content out of a backend
+READ_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+class StorageBackend(ABC):
+    """Interface implemented by every storage backend"""
+
+    @abstractmethod
+    def put_file(self, key, src_path):
+        """Store the local file ``src_path`` under ``key`` and return its location.
+
+        ``src_path`` is consumed.
+        """
+
+    @abstractmethod
+    def exists(self, location):
+        pass
+
+    @abstractmethod
+    def size(self, location):
+        pass
+
+    @abstractmethod
+    def delete(self, location):
+        pass
+
+    @abstractmethod
+    def iter_range(self, location, start=0, length=None, chunk_size=READ_CHUNK_SIZE):
+        """Yield the bytes of ``location`` from ``start``, ``length`` bytes or to the end"""
+
+    def local_path(self, location):
+        """Filesystem path of ``location`` if it can be read locally, else ``None``"""
+        return None
+
+    def url(self, location, expires_in=3600):
+        """URL external tools (ffmpeg, ffprobe) can read ``location`` from"""
+        return self.local_path(location)
+
+    def media_input(self, location):
+        """Path or URL to hand to media tools for ``location``"""
+        return self.local_path(location) or self.url(location)
+
+class LocalStorageBackend(StorageBackend):
+    """Files on a local or shared filesystem"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def put_file(self, key, src_path):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A rename when the source is on the same filesystem
+        shutil.move(src_path, path)
+        return path
+
+    def exists(self, location):
+        return os.path.exists(location)
+
+    def size(self, location):
+        return os.path.getsize(location)
+
+    def delete(self, location):
+        if os.path.exists(location):
+            os.remove(location)
+
+    def iter_range(self, location, start=0, length=None, chunk_size=READ_CHUNK_SIZE):
+        with open(location, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    def local_path(self, location):
+        return location
+
+class S3StorageBackend(StorageBackend):
+    """Objects in an S3-compatible bucket (AWS S3, MinIO, ...)
+
+    Large files are uploaded as multipart uploads with parts sent in parallel,
+    reads are ranged GETs.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None,
+                 access_key_id=None, secret_access_key=None,
+                 part_size=64 * 1024 * 1024, max_concurrency=8):
+        try:
+            import boto3
+            from botocore.config import Config as BotoConfig
+        except ImportError:
+            raise RuntimeError('The S3 storage backend requires boto3')
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # S3 minimum part size
+        self.max_concurrency = max_concurrency
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            config=BotoConfig(max_pool_connections=max(10, max_concurrency * 2))
+        )
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _split(self, location):
+        bucket, _, key = location[len('s3://'):].partition('/')
+        return bucket, key
+
+    def put_file(self, key, src_path):
+        object_key = self._object_key(key)
+        size = os.path.getsize(src_path)
+        if size <= self.part_size:
+            with open(src_path, 'rb') as f:
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=f)
+        else:
+            self._multipart_upload(object_key, src_path, size)
+        os.remove(src_path)
+        return f"s3://{self.bucket}/{object_key}"
+
+    def _multipart_upload(self, object_key, src_path, size):
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=object_key)['UploadId']
+        offsets = range(0, size, self.part_size)
+
+        def upload_part(part):
+            part_number, offset = part
+            length = min(self.part_size, size - offset)
+            # Each worker reads its own slice, no shared file position
+            with open(src_path, 'rb') as f:
+                data = os.pread(f.fileno(), length, offset)
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                PartNumber=part_number, Body=data
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                parts = list(pool.map(upload_part, enumerate(offsets, start=1)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+        logger.info("Uploaded %s in %d parts", object_key, len(offsets))
+
+    def exists(self, location):
+        from botocore.exceptions import ClientError
+        bucket, key = self._split(location)
+        try:
+            self.client.head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def size(self, location):
+        bucket, key = self._split(location)
+        return self.client.head_object(Bucket=bucket, Key=key)['ContentLength']
+
+    def delete(self, location):
+        bucket, key = self._split(location)
+        self.client.delete_object(Bucket=bucket, Key=key)
+
+    def iter_range(self, location, start=0, length=None, chunk_size=READ_CHUNK_SIZE):
+        if length == 0:
+            return
+        bucket, key = self._split(location)
+        byte_range = f"bytes={start}-{start + length - 1}" if length is not None else f"bytes={start}-"
+        body = self.client.get_object(Bucket=bucket, Key=key, Range=byte_range)['Body']
+        try:
+            for data in body.iter_chunks(chunk_size):
+                yield data
+        finally:
+            body.close()
+
+    def url(self, location, expires_in=3600):
+        bucket, key = self._split(location)
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=expires_in
+        )
+
+_backends = {}
+
+def _build_backend(name, config):
+    if name == 'local':
+        return LocalStorageBackend(config['VIDEO_STORE_DIR'])
+    if name == 's3':
+        return S3StorageBackend(
+            bucket=config['S3_BUCKET'],
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            secret_access_key=config.get('S3_SECRET_ACCESS_KEY'),
+            part_size=config.get('S3_MULTIPART_CHUNK_SIZE', 64 * 1024 * 1024),
+            max_concurrency=config.get('S3_MAX_CONCURRENCY', 8)
+        )
+    raise ValueError(f'Unknown storage backend: {name}')
+
+def _backend(name):
+    if name not in _backends:
+        _backends[name] = _build_backend(name, current_app.config)
+    return _backends[name]
+
+def get_storage():
+    """Backend new content is written to"""
+    return _backend(current_app.config.get('STORAGE_BACKEND', 'local'))
+
+def storage_for(location):
+    """Backend holding an existing location"""
+    return _backend('s3' if location.startswith('s3://') else 'local')
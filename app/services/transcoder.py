@@ -0,0 +1,255 @@
+"""Adaptive-bitrate rendition ladder.
+
+Each rung of ``RENDITION_LADDER`` is transcoded to an H.264/AAC HLS rendition
+by ffmpeg in a CPU-bounded process pool. ``Rendition`` rows are the job queue:
+they are created ``QUEUED`` and claimed atomically by whichever worker process
+has a free slot, so several app processes share the work and every rendition
+is encoded once per content checksum. Key frames are forced on the segment
+grid so players can switch renditions at any segment boundary.
+"""
+from app import db
+from app.models.rendition import Rendition, RenditionStatus
+from app.models.video import Video
+from app.services.storage import storage_for
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_NAME = 'index.m3u8'
+
+def parse_ladder(spec):
+    """Rungs of a ladder spec like ``1080:5000,720:2800,360:800`` (height:kbps)
+
+    Returns ``(name, height, video_bitrate)`` tuples, tallest first.
+    """
+    rungs = []
+    for item in spec.split(','):
+        height, _, kbps = item.strip().partition(':')
+        rungs.append((f'{int(height)}p', int(height), int(kbps) * 1000))
+    return sorted(rungs, key=lambda rung: rung[1], reverse=True)
+
+def scaled_width(width, height, target_height):
+    """Even output width keeping the source aspect ratio"""
+    if not width or not height:
+        return None
+    return int(round(width * target_height / height / 2)) * 2
+
+def transcode(source, out_dir, height, video_bitrate, audio_bitrate, options):
+    """Encode ``source`` to an HLS rendition in ``out_dir``, return its size in bytes.
+
+    Runs in a pool worker process, so it only takes and returns plain data.
+    """
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.transcoding-', dir=parent)
+    segment_seconds = options['segment_seconds']
+    try:
+        subprocess.run(
+            [options['ffmpeg_bin'], '-nostdin', '-v', 'error', '-i', source,
+             '-map', '0:v:0', '-map', '0:a:0?',
+             '-vf', f'scale=-2:{height}',
+             '-c:v', 'libx264', '-preset', options['preset'], '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+             '-b:v', str(video_bitrate), '-maxrate', str(int(video_bitrate * 1.07)),
+             '-bufsize', str(int(video_bitrate * 1.5)),
+             '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})', '-sc_threshold', '0',
+             '-threads', str(options['threads']),
+             '-c:a', 'aac', '-b:a', str(audio_bitrate), '-ac', '2',
+             '-f', 'hls', '-hls_time', str(segment_seconds),
+             '-hls_playlist_type', 'vod', '-hls_list_size', '0',
+             '-hls_segment_filename', os.path.join(tmp_dir, 'seg%05d.ts'),
+             os.path.join(tmp_dir, PLAYLIST_NAME)],
+            capture_output=True, check=True, timeout=options['timeout']
+        )
+        size = sum(entry.stat().st_size for entry in os.scandir(tmp_dir))
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.rename(tmp_dir, out_dir)
+        return size
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode(errors='replace').strip() or str(e))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+class Transcoder:
+    """Process-pool transcoder fed from the ``renditions`` table"""
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._results = queue.Queue()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def rendition_dir(self, checksum, name):
+        return os.path.join(self.app.config['RENDITIONS_DIR'], checksum[:2], checksum, name)
+
+    def ladder_for(self, video):
+        """Ladder rungs worth encoding for ``video``, never upscaling"""
+        rungs = parse_ladder(self.app.config['RENDITION_LADDER'])
+        if video.height:
+            fitting = [rung for rung in rungs if rung[1] <= video.height]
+            # Smaller than every rung: one rendition at the source height
+            return fitting or [(f'{video.height}p', video.height, rungs[-1][2])]
+        return rungs
+
+    def enqueue(self, video, names=None):
+        """Queue the missing renditions of ``video``'s content, return all of them"""
+        for name, height, video_bitrate in self.ladder_for(video):
+            if names and name not in names:
+                continue
+            if Rendition.query.filter_by(checksum=video.checksum, name=name).first() is not None:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(Rendition(
+                        checksum=video.checksum,
+                        name=name,
+                        width=scaled_width(video.width, video.height, height),
+                        height=height,
+                        # Spending more bits than the source has buys nothing
+                        video_bitrate=min(video_bitrate, video.bitrate) if video.bitrate else video_bitrate,
+                        audio_bitrate=self.app.config['RENDITION_AUDIO_BITRATE'],
+                        status=RenditionStatus.QUEUED
+                    ))
+            except IntegrityError:
+                pass  # Queued concurrently for another video with this content
+        db.session.commit()
+        self.dispatch()
+        return self.renditions(video.checksum)
+
+    def renditions(self, checksum):
+        return Rendition.query.filter_by(checksum=checksum).order_by(Rendition.height.desc()).all()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.app.config['TRANSCODE_WORKERS'])
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name='transcode-collector', daemon=True)
+                self._collector.start()
+
+    def dispatch(self):
+        """Claim queued renditions while this process has free worker slots"""
+        self._ensure_started()
+        options = {
+            'ffmpeg_bin': self.app.config['FFMPEG_BIN'],
+            'preset': self.app.config['TRANSCODE_PRESET'],
+            'threads': self.app.config['TRANSCODE_THREADS'],
+            'segment_seconds': self.app.config['HLS_SEGMENT_SECONDS'],
+            'timeout': self.app.config['TRANSCODE_TIMEOUT'],
+        }
+        claimed = 0
+        while True:
+            with self._lock:
+                if len(self._in_flight) >= self.app.config['TRANSCODE_WORKERS']:
+                    break
+            rendition = Rendition.query.filter_by(status=RenditionStatus.QUEUED).order_by(Rendition.id).first()
+            if rendition is None:
+                break
+            # Only one process wins the QUEUED -> PROCESSING transition
+            won = Rendition.query.filter_by(id=rendition.id, status=RenditionStatus.QUEUED).update({
+                Rendition.status: RenditionStatus.PROCESSING,
+                Rendition.attempts: Rendition.attempts + 1,
+                Rendition.processing_started_at: datetime.utcnow(),
+                Rendition.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+            if not won:
+                continue
+
+            source = db.session.query(Video.stored_path).filter(Video.checksum == rendition.checksum).first()
+            if source is None:
+                self._finish(rendition.id, error='Source video no longer exists')
+                continue
+            source = source[0]
+            with self._lock:
+                self._in_flight.add(rendition.id)
+            future = self._pool.submit(
+                transcode,
+                storage_for(source).media_input(source),
+                self.rendition_dir(rendition.checksum, rendition.name),
+                rendition.height, rendition.video_bitrate, rendition.audio_bitrate, options
+            )
+            future.add_done_callback(lambda f, rendition_id=rendition.id: self._results.put((rendition_id, f)))
+            claimed += 1
+        return claimed
+
+    def _collect(self):
+        while True:
+            rendition_id, future = self._results.get()
+            size = error = None
+            try:
+                size = future.result()
+            except Exception as e:
+                error = str(e)
+            with self._lock:
+                self._in_flight.discard(rendition_id)
+            with self.app.app_context():
+                try:
+                    self._finish(rendition_id, size=size, error=error)
+                    # A slot is free, pull the next queued rendition
+                    self.dispatch()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Failed to record transcoding result for rendition %s", rendition_id)
+
+    def _finish(self, rendition_id, size=None, error=None):
+        rendition = Rendition.query.get(rendition_id)
+        if rendition is None:
+            return
+        rendition.processing_completed_at = datetime.utcnow()
+        if error is None:
+            rendition.status = RenditionStatus.READY
+            rendition.size_bytes = size
+            rendition.playlist_path = os.path.join(self.rendition_dir(rendition.checksum, rendition.name), PLAYLIST_NAME)
+            rendition.error_message = None
+            logger.info("Rendition %s of %s ready", rendition.name, rendition.checksum)
+        else:
+            rendition.status = RenditionStatus.ERROR
+            rendition.error_message = error[-2000:]
+            logger.error("Rendition %s of %s failed: %s", rendition.name, rendition.checksum, error)
+        db.session.commit()
+
+    def requeue_stale(self, older_than_seconds, max_attempts=3):
+        """Re-queue renditions whose worker died (e.g. a restart) and pick up queued work.
+
+        Called periodically by every app process, each first refreshes the
+        rows it is still encoding so only abandoned ones go stale.
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            in_flight = list(self._in_flight)
+        if in_flight:
+            Rendition.query.filter(Rendition.id.in_(in_flight)).update(
+                {Rendition.updated_at: now}, synchronize_session=False
+            )
+            db.session.commit()
+        stale = Rendition.query.filter(
+            Rendition.status == RenditionStatus.PROCESSING,
+            Rendition.updated_at < now - timedelta(seconds=older_than_seconds)
+        ).all()
+        for rendition in stale:
+            rendition.status = RenditionStatus.QUEUED if rendition.attempts < max_attempts else RenditionStatus.ERROR
+        db.session.commit()
+        return self.dispatch()
+
+    def discard(self, checksum):
+        """Remove the renditions of content that is no longer stored"""
+        Rendition.query.filter_by(checksum=checksum).delete(synchronize_session=False)
+        db.session.commit()
+        shutil.rmtree(os.path.join(self.app.config['RENDITIONS_DIR'], checksum[:2], checksum), ignore_errors=True)
+
+transcoder = Transcoder()
@@ -0,0 +1,290 @@
+"""Resumable chunked uploads.
+
+Chunks are written at their offset into a single preallocated ``.part`` file,
+so finalizing a session is a move into the video store rather than a
+concatenation. Every chunk is hashed as it arrives. Chunks that arrive in
+order also feed a running whole-file SHA-256, so a sequentially uploaded file
+is fully hashed by the time the last chunk lands.
+
+The running hash lives in the memory of one worker process, since a SHA-256
+state cannot be stored. It only grows while consecutive chunks reach the
+process holding it. With several worker processes (the Docker image runs
+four), chunks usually land on different ones. Finalizing then reads the
+part file again from the end of the hashed prefix, which is most of the
+file, unless the deployment routes an upload's requests to one process.
+"""
+from app import db
+from app.models.upload_session import UploadSession, UploadChunk, UploadStatus
+from app.utils.upload_utils import UPLOAD_CHUNK_SIZE
+from sqlalchemy.exc import IntegrityError
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from uuid import uuid4
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PART_DIR = os.path.join('data', 'uploads')
+
+class ChunkError(Exception):
+    """Raised when a chunk cannot be accepted"""
+
+class _RunningHash:
+    """Whole-file SHA-256 over the contiguous prefix received so far"""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.offset = 0
+        self.busy = False
+
+_hash_lock = threading.Lock()
+_running_hashes = {}
+_chunk_writers = {}  # (upload_id, chunk_index) -> [lock, waiting requests]
+
+@contextmanager
+def _chunk_lock(upload_id, chunk_index):
+    """Serialize the threads of this process writing the same chunk.
+
+    Record locks on the part file only keep other processes out.
+    """
+    key = (upload_id, chunk_index)
+    with _hash_lock:
+        entry = _chunk_writers.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _hash_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _chunk_writers[key]
+
+def create_session(filename, original_filename, size_bytes, ttl_seconds, chunk_size=None, **fields):
+    """Create an upload session and preallocate its part file"""
+    chunk_size = chunk_size or 8 * 1024 * 1024
+    upload_id = uuid4().hex
+    os.makedirs(UPLOAD_PART_DIR, exist_ok=True)
+    part_path = os.path.join(UPLOAD_PART_DIR, f"{upload_id}.part")
+
+    # Sparse file of the final size, chunks are written in place at their offset
+    with open(part_path, 'wb') as f:
+        f.truncate(size_bytes)
+
+    session = UploadSession(
+        upload_id=upload_id,
+        filename=filename,
+        original_filename=original_filename,
+        part_path=part_path,
+        size_bytes=size_bytes,
+        chunk_size=chunk_size,
+        total_chunks=(size_bytes + chunk_size - 1) // chunk_size,
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+        **fields
+    )
+    db.session.add(session)
+    db.session.commit()
+
+    with _hash_lock:
+        _running_hashes[upload_id] = _RunningHash()
+
+    return session
+
+def chunk_range(session, chunk_index):
+    """Return (offset, length) of a chunk within the final file"""
+    if chunk_index < 0 or chunk_index >= session.total_chunks:
+        raise ChunkError(f'Chunk index must be between 0 and {session.total_chunks - 1}')
+    offset = chunk_index * session.chunk_size
+    return offset, min(session.chunk_size, session.size_bytes - offset)
+
+def write_chunk(session, chunk_index, stream, expected_checksum=None, ttl_seconds=None):
+    """Write one chunk from ``stream`` into the part file and record it.
+
+    Received chunks are immutable: re-sending one (e.g. after a lost response)
+    is acknowledged without touching the file. Concurrent writers of the same
+    chunk, in any process, take turns on its byte range of the part file, and
+    only the first one writes.
+    """
+    offset, length = chunk_range(session, chunk_index)
+
+    existing = _existing_chunk(session, chunk_index, expected_checksum)
+    if existing is not None:
+        return existing
+
+    with _chunk_lock(session.upload_id, chunk_index), open(session.part_path, 'r+b') as f:
+        fcntl.lockf(f, fcntl.LOCK_EX, length, offset)
+        # A new transaction sees the chunk if the writer we waited for recorded it
+        db.session.commit()
+        existing = _existing_chunk(session, chunk_index, expected_checksum)
+        if existing is not None:
+            return existing
+
+        # Feed the running hash only when this chunk extends the hashed prefix
+        running = _claim_running_hash(session.upload_id, offset)
+        running_sha256 = running.sha256.copy() if running else None
+
+        chunk_sha256 = hashlib.sha256()
+        received = 0
+        try:
+            f.seek(offset)
+            while received < length:
+                data = stream.read(min(UPLOAD_CHUNK_SIZE, length - received))
+                if not data:
+                    break
+                f.write(data)
+                chunk_sha256.update(data)
+                if running_sha256 is not None:
+                    running_sha256.update(data)
+                received += len(data)
+            f.flush()
+
+            if received != length or stream.read(1):
+                raise ChunkError(f'Chunk {chunk_index} must be exactly {length} bytes')
+
+            checksum = chunk_sha256.hexdigest()
+            if expected_checksum and expected_checksum.lower() != checksum:
+                raise ChunkError(f'Checksum mismatch for chunk {chunk_index}')
+        except Exception:
+            _release_running_hash(session.upload_id, running, None)
+            raise
+
+        chunk = UploadChunk(session_id=session.id, chunk_index=chunk_index, offset=offset, size_bytes=length, checksum=checksum)
+        db.session.add(chunk)
+
+        # Keep sessions that are still receiving data alive
+        if ttl_seconds:
+            session.expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Recorded by a writer on another host sharing the part file
+            db.session.rollback()
+            _release_running_hash(session.upload_id, running, None)
+            return session.chunks.filter_by(chunk_index=chunk_index).one()
+
+    _release_running_hash(session.upload_id, running, running_sha256, session, length)
+    return chunk
+
+def _existing_chunk(session, chunk_index, expected_checksum):
+    existing = session.chunks.filter_by(chunk_index=chunk_index).first()
+    if existing is not None and expected_checksum and expected_checksum.lower() != existing.checksum:
+        raise ChunkError(f'Chunk {chunk_index} was already received with a different checksum')
+    return existing
+
+def received_chunks(session):
+    """Return the chunk rows received so far, ordered by index"""
+    return session.chunks.order_by(UploadChunk.chunk_index).all()
+
+def missing_chunks(session):
+    """Return the chunk indexes that still have to be uploaded"""
+    present = {index for (index,) in session.chunks.with_entities(UploadChunk.chunk_index)}
+    return [index for index in range(session.total_chunks) if index not in present]
+
+def finalize_session(session):
+    """Verify a complete session and mark it completed.
+
+    Returns the SHA-256 of the assembled file, which is left at
+    ``session.part_path`` for the caller to move into the video store.
+    """
+    missing = missing_chunks(session)
+    if missing:
+        raise ChunkError(f'{len(missing)} chunk(s) missing, first missing chunk is {missing[0]}')
+
+    checksum = _final_checksum(session)
+    if session.checksum and session.checksum.lower() != checksum:
+        raise ChunkError('Checksum of the assembled file does not match the declared checksum')
+
+    session.status = UploadStatus.COMPLETED
+    session.completed_at = datetime.utcnow()
+    with _hash_lock:
+        _running_hashes.pop(session.upload_id, None)
+    return checksum
+
+def abort_session(session, status=UploadStatus.ABORTED):
+    """Drop a session's partial data"""
+    if os.path.exists(session.part_path):
+        os.remove(session.part_path)
+    session.chunks.delete()
+    session.status = status
+    with _hash_lock:
+        _running_hashes.pop(session.upload_id, None)
+
+def purge_expired_sessions(now=None):
+    """Expire active sessions past their deadline and remove their part files"""
+    now = now or datetime.utcnow()
+    expired = UploadSession.query.filter(
+        UploadSession.status == UploadStatus.ACTIVE,
+        UploadSession.expires_at < now
+    ).all()
+    for session in expired:
+        abort_session(session, status=UploadStatus.EXPIRED)
+    db.session.commit()
+    if expired:
+        logger.info("Expired %d upload session(s)", len(expired))
+    return len(expired)
+
+def _claim_running_hash(upload_id, offset):
+    with _hash_lock:
+        running = _running_hashes.get(upload_id)
+        if running is None and offset == 0:
+            # Session created by another worker, start hashing here
+            running = _running_hashes[upload_id] = _RunningHash()
+        if running is None or running.busy or running.offset != offset:
+            return None
+        running.busy = True
+        return running
+
+def _release_running_hash(upload_id, running, sha256, session=None, length=0):
+    if running is None:
+        return
+    with _hash_lock:
+        running.busy = False
+        if sha256 is None or _running_hashes.get(upload_id) is not running:
+            return
+        running.sha256 = sha256
+        running.offset += length
+        running.busy = True
+
+    # Chunks that arrived out of order are folded in now, while still in page cache
+    try:
+        chunks = session.chunks.filter(UploadChunk.offset >= running.offset).order_by(UploadChunk.chunk_index).all()
+        with open(session.part_path, 'rb') as f:
+            for chunk in chunks:
+                if chunk.offset != running.offset:
+                    break
+                f.seek(chunk.offset)
+                _hash_range(f, running.sha256, chunk.size_bytes)
+                running.offset += chunk.size_bytes
+    finally:
+        with _hash_lock:
+            running.busy = False
+
+def _final_checksum(session):
+    with _hash_lock:
+        running = _running_hashes.get(session.upload_id)
+        if running is not None and running.busy:
+            running = None
+
+    if running is not None and running.offset == session.size_bytes:
+        return running.sha256.hexdigest()
+
+    # Chunks landed on other workers or out of order, hash whatever is left
+    sha256 = running.sha256.copy() if running is not None else hashlib.sha256()
+    offset = running.offset if running is not None else 0
+    logger.info("Upload %s: hashing %d trailing bytes on finalize", session.upload_id, session.size_bytes - offset)
+    with open(session.part_path, 'rb') as f:
+        f.seek(offset)
+        _hash_range(f, sha256, session.size_bytes - offset)
+    return sha256.hexdigest()
+
+def _hash_range(f, sha256, length):
+    while length > 0:
+        data = f.read(min(UPLOAD_CHUNK_SIZE, length))
+        if not data:
+            break
+        sha256.update(data)
+        length -= len(data)
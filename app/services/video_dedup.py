@@ -0,0 +1,67 @@
+"""Content deduplication for videos.
+
+Several ``Video`` rows may share one stored file when their checksums match,
+e.g. the same camera export uploaded to two projects. Each of them holds a
+reference on the content in the video store.
+"""
+from app import db
+from app.models.video import Video, VideoBlob
+from app.services import video_store
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Technical fields that describe the content and can be copied between duplicates
+CONTENT_FIELDS = (
+    'stored_path', 'stored_name', 'size_bytes', 'size_human', 'checksum', 'mimetype',
+    'duration_seconds', 'width', 'height', 'fps', 'bitrate', 'codec', 'status'
+)
+
+def find_existing(checksum, size_bytes=None):
+    """Return a video whose stored file has this content, if any.
+
+    Content that was stored normalized (faststart) is found by the checksum
+    and size it had when uploaded as well.
+    """
+    checksum = checksum.lower()
+    query = Video.query.filter(Video.checksum == checksum)
+    if size_bytes is not None:
+        query = query.filter(Video.size_bytes == size_bytes)
+    videos = query.order_by(Video.id).all()
+    
+    if not videos:
+        alias = VideoBlob.query.filter(VideoBlob.original_checksum == checksum)
+        if size_bytes is not None:
+            alias = alias.filter(VideoBlob.original_size_bytes == size_bytes)
+        blob = alias.first()
+        if blob is not None:
+            videos = Video.query.filter(Video.checksum == blob.checksum).order_by(Video.id).all()
+    
+    for video in videos:
+        if video_store.content_exists(video.stored_path):
+            return video
+    return None
+
+def link_video(source, filename, original_filename, user_id=None, project_id=None, video_metadata=None):
+    """Create a new video row that shares ``source``'s stored file"""
+    video_store.acquire(source.checksum, source.stored_path, source.size_bytes)
+    video = Video(
+        filename=filename,
+        original_filename=original_filename,
+        user_id=user_id,
+        project_id=project_id,
+        video_metadata=video_metadata or {},
+        **{field: getattr(source, field) for field in CONTENT_FIELDS}
+    )
+    db.session.add(video)
+    logger.info("Linked %s to existing content of video %s", filename, source.id)
+    return video
+
+def is_file_shared(video):
+    """Whether another video still references ``video``'s stored file.
+
+    Only needed for files that are not tracked by the video store.
+    """
+    return db.session.query(
+        Video.query.filter(Video.stored_path == video.stored_path, Video.id != video.id).exists()
+    ).scalar()
@@ -0,0 +1,107 @@
+"""Content-addressable video store.
+
+Video files are stored once per SHA-256 under a two-level fan-out key
+(``ab/cd/abcd...``) so no directory or key prefix grows past a few thousand
+entries. The bytes live in the configured storage backend. A ``VideoBlob``
+row per checksum counts the videos referencing the content; it is deleted
+from the backend when the last reference is released.
+"""
+from app import db
+from app.models.video import VideoBlob
+from app.services.chunk_cache import chunk_cache
+from app.services.storage import get_storage, storage_for
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from uuid import uuid4
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+def blob_key(checksum):
+    """Sharded storage key of ``checksum``'s content"""
+    checksum = checksum.lower()
+    return f"{checksum[:2]}/{checksum[2:4]}/{checksum}"
+
+def incoming_path(name=''):
+    """Local scratch path for a file being written.
+
+    It sits under the local store root so moving it into the local backend
+    is a rename.
+    """
+    incoming_dir = os.path.join(current_app.config['VIDEO_STORE_DIR'], '.incoming')
+    os.makedirs(incoming_dir, exist_ok=True)
+    return os.path.join(incoming_dir, f"{uuid4().hex}__{name}" if name else uuid4().hex)
+
+def content_exists(location):
+    """Whether stored content is still present in its backend"""
+    return storage_for(location).exists(location)
+
+def store_file(src_path, checksum, size_bytes):
+    """Move a fully written file into the store and take a reference on it.
+
+    If the content is already stored ``src_path`` is dropped instead. Must be
+    called before adding the referencing video to the session, the caller
+    commits both together.
+    """
+    existing = VideoBlob.query.filter_by(checksum=checksum).first()
+    if existing is not None and content_exists(existing.stored_path):
+        os.remove(src_path)
+        location = existing.stored_path
+    else:
+        location = get_storage().put_file(blob_key(checksum), src_path)
+    return acquire(checksum, location, size_bytes)
+
+def acquire(checksum, stored_path, size_bytes=None):
+    """Take a reference on stored content, creating its blob row if needed"""
+    updated = VideoBlob.query.filter_by(checksum=checksum).update(
+        {VideoBlob.ref_count: VideoBlob.ref_count + 1}, synchronize_session=False
+    )
+    if not updated:
+        try:
+            with db.session.begin_nested():
+                db.session.add(VideoBlob(
+                    checksum=checksum,
+                    stored_path=stored_path,
+                    size_bytes=size_bytes or 0,
+                    ref_count=1
+                ))
+        except IntegrityError:
+            # Created concurrently by another upload of the same content
+            VideoBlob.query.filter_by(checksum=checksum).update(
+                {VideoBlob.ref_count: VideoBlob.ref_count + 1}, synchronize_session=False
+            )
+    return VideoBlob.query.filter_by(checksum=checksum).first()
+
+def release(checksum):
+    """Drop a reference on stored content.
+
+    Returns the location to unlink once the caller has committed when this
+    was the last reference, ``None`` otherwise. Raises ``LookupError`` when
+    the content is not tracked by the store (files stored before it existed).
+    """
+    blob = VideoBlob.query.filter_by(checksum=checksum).with_for_update().first()
+    if blob is None:
+        raise LookupError(checksum)
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        return None
+    db.session.delete(blob)
+    return blob.stored_path
+
+def unlink(location, checksum):
+    """Remove released content unless it was stored again meanwhile.
+
+    The checksum's blob row (or its gap in the index) stays locked until the
+    file is gone, so no reference can be taken on it halfway through.
+    """
+    if VideoBlob.query.filter_by(checksum=checksum).with_for_update().first() is not None:
+        db.session.rollback()
+        return False
+    try:
+        storage_for(location).delete(location)
+        chunk_cache.invalidate(location)
+    finally:
+        db.session.commit()
+    logger.info("Removed unreferenced video content %s", checksum)
+    return True
@@ -0,0 +1,138 @@
+"""Building blocks of the on-disk caches of derived media.
+
+Proxies, sprite sheets, HLS packages, keyframe indexes, snapshots and frame
+variants are all files (or directories) derived from stored content and
+built on first use:
+
+- ``SingleFlight`` runs the builds in a bounded thread pool, one job per key
+  at a time, so concurrent requests in a process wait for the same build.
+- ``build`` serializes a build across worker processes with a file lock and
+  publishes the result atomically: it is written under a temporary name and
+  renamed into place, so readers never see a partial entry.
+- ``touch`` and ``evict_lru`` keep a cache within a size budget, least
+  recently used entries first, ordered by access time.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import fcntl
+import os
+import shutil
+import threading
+import time
+
+class SingleFlight:
+    """Bounded thread pool running at most one job per key at a time"""
+
+    def __init__(self, thread_name_prefix, on_error=None):
+        self.thread_name_prefix = thread_name_prefix
+        self.on_error = on_error
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, max_workers, fn, *args):
+        """Future of the job running for ``key``, starting ``fn(*args)`` unless there is one.
+
+        The pool is created on first use with ``max_workers`` threads.
+        ``on_error(key, exception)`` is called when a job fails.
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.thread_name_prefix)
+            future = self._jobs.get(key)
+            if future is not None:
+                return future
+            future = self._jobs[key] = self._pool.submit(fn, *args)
+        # Outside the lock: a job that already finished runs the callback right here
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._jobs.get(key) is future:
+                del self._jobs[key]
+        if self.on_error is not None and future.exception() is not None:
+            self.on_error(key, future.exception())
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+@contextmanager
+def build(path, suffix='', ready=os.path.exists, keep_lock=True):
+    """Build the cache entry ``path`` once across threads and worker processes.
+
+    Holds an exclusive lock on ``path + '.lock'`` and yields a temporary path
+    ending in ``suffix`` to write the entry to, which is renamed onto ``path``
+    when the block completes. Yields ``None`` instead when ``ready(path)``
+    finds the entry already built. The temporary file or directory is removed
+    when the block raises. ``keep_lock=False`` also removes the lock file, for
+    caches of many small entries.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if ready(path):
+                yield None
+                return
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}'
+            try:
+                yield tmp_path
+                if os.path.isdir(path):
+                    # A directory entry is replaced as a whole
+                    shutil.rmtree(path)
+                os.rename(tmp_path, path)
+            finally:
+                _remove(tmp_path)
+        finally:
+            if not keep_lock:
+                _remove(lock.name)
+
+def touch(path):
+    """Record a use of a cache entry in its access time, the eviction order.
+
+    The modification time is kept, it identifies the build (e.g. in ETags).
+    """
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+def evict_lru(root, max_bytes, suffix=''):
+    """Remove least recently used entries under ``root`` until they fit ``max_bytes``.
+
+    Entries are the files ending in ``suffix`` in the shard directories of
+    ``root``; locks and unfinished builds are skipped. Returns the number of
+    entries removed.
+    """
+    if not os.path.isdir(root):
+        return 0
+    entries, total = [], 0
+    for shard in os.scandir(root):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.name.endswith(suffix) or entry.name.endswith('.lock') or '.tmp' in entry.name:
+                continue
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    return evicted
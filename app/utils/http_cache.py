@@ -0,0 +1,60 @@
+"""Conditional request helpers (ETag, Last-Modified, If-Range)."""
+from datetime import timezone
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+import hashlib
+import json
+
+def media_validators(video):
+    """Strong ETag and Last-Modified of a video's content.
+
+    The content is addressed by its SHA-256, so the checksum is the ETag.
+    """
+    return video.checksum, video.updated_at
+
+def record_validators(record, data):
+    """Strong ETag and Last-Modified of a row's JSON representation ``data``.
+
+    The ETag hashes the representation itself: MySQL keeps ``updated_at`` to
+    the second, so two changes within one second would share a stamp.
+    """
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    etag = hashlib.sha1(f'{record.__tablename__}:{record.id}:{body}'.encode()).hexdigest()
+    return etag, record.updated_at
+
+def frame_validators(frame):
+    """Strong ETag and Last-Modified of a frame's stored image.
+
+    The image is identified by its CRC-32, or its size for frames extracted
+    before CRCs were recorded.
+    """
+    crc = (frame.frame_metadata or {}).get('crc32', frame.file_size)
+    etag = hashlib.sha1(f'frames:{frame.id}:{crc}'.encode()).hexdigest()
+    return etag, frame.updated_at
+
+def is_fresh(etag, last_modified=None):
+    """Whether the client's cached copy is current (If-None-Match / If-Modified-Since)"""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def if_range_matches(etag, last_modified=None):
+    """Whether a Range request may be answered with part of the content.
+
+    True without an If-Range header. A date only matches exactly, as the
+    whole content must be sent when it might have changed since.
+    """
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return last_modified is not None and \
+            if_range.date == last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return True
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+def not_modified(etag, last_modified=None):
+    return set_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,294 @@
+"""Minimal ISO base media (MP4/MOV) box parser.
+
+Reads the technical video fields straight from the ``moov`` box without
+spawning a prober. The file is memory-mapped and only the box headers on the
+way to ``moov`` and the few boxes inside it that are needed are touched, so
+the cost does not depend on the size of the media data.
+"""
+import mmap
+import os
+import struct
+
+# Boxes that may start a file we can parse. Old QuickTime files have no ftyp.
+LEADING_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot'}
+
+# Sample entry fourcc -> codec name as reported by ffprobe
+CODEC_NAMES = {
+    b'avc1': 'h264', b'avc3': 'h264',
+    b'hvc1': 'hevc', b'hev1': 'hevc',
+    b'av01': 'av1',
+    b'vp08': 'vp8', b'vp09': 'vp9',
+    b'mp4v': 'mpeg4',
+    b's263': 'h263', b'h263': 'h263',
+    b'jpeg': 'mjpeg', b'mjpa': 'mjpeg', b'mjpb': 'mjpeg',
+    b'apch': 'prores', b'apcn': 'prores', b'apcs': 'prores', b'apco': 'prores',
+    b'ap4h': 'prores', b'ap4x': 'prores',
+}
+
+class UnsupportedContainer(Exception):
+    """The file is not an MP4/MOV this parser can read"""
+    pass
+
+def _iter_boxes(buf, start, end):
+    """Yield ``(type, payload_start, box_end)`` for the boxes in ``buf[start:end]``"""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', buf, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                break
+            size = struct.unpack_from('>Q', buf, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise UnsupportedContainer(f'Truncated {box_type!r} box at offset {offset}')
+        yield box_type, offset + header, offset + size
+        offset += size
+
+def _find(buf, start, end, box_type):
+    for found, payload, box_end in _iter_boxes(buf, start, end):
+        if found == box_type:
+            return payload, box_end
+    return None
+
+def _timescale_duration(buf, offset, version):
+    """Timescale and duration from a full box with creation/modification times (mvhd, mdhd)"""
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', buf, offset + 4 + 16)
+    else:
+        timescale, duration = struct.unpack_from('>II', buf, offset + 4 + 8)
+    return timescale, duration
+
+def _parse_track(buf, start, end):
+    """Technical fields of a video track, ``None`` for any other kind of track"""
+    mdia = _find(buf, start, end, b'mdia')
+    if mdia is None:
+        return None
+    hdlr = _find(buf, *mdia, b'hdlr')
+    if hdlr is None or buf[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+        return None
+
+    track = {}
+    mdhd = _find(buf, *mdia, b'mdhd')
+    if mdhd is not None:
+        track['timescale'], track['duration'] = _timescale_duration(buf, mdhd[0], buf[mdhd[0]])
+
+    tkhd = _find(buf, start, end, b'tkhd')
+    if tkhd is not None:
+        # Display size in 16.16 fixed point after the matrix
+        dims_offset = tkhd[0] + (88 if buf[tkhd[0]] == 1 else 76)
+        width, height = struct.unpack_from('>II', buf, dims_offset)
+        track['width'], track['height'] = width >> 16, height >> 16
+
+    minf = _find(buf, *mdia, b'minf')
+    stbl = _find(buf, *minf, b'stbl') if minf is not None else None
+    if stbl is None:
+        return track
+
+    stsd = _find(buf, *stbl, b'stsd')
+    if stsd is not None and struct.unpack_from('>I', buf, stsd[0] + 4)[0] > 0:
+        entry = stsd[0] + 8
+        fourcc = bytes(buf[entry + 4:entry + 8])
+        track['codec'] = CODEC_NAMES.get(fourcc, fourcc.decode('latin-1').strip().lower())
+        # Visual sample entry: coded size follows 8 bytes of header and 16 reserved
+        width, height = struct.unpack_from('>HH', buf, entry + 8 + 8 + 16)
+        if width and height:
+            track['width'], track['height'] = width, height
+
+    stts = _find(buf, *stbl, b'stts')
+    if stts is not None:
+        entry_count = struct.unpack_from('>I', buf, stts[0] + 4)[0]
+        track['sample_count'] = sum(
+            struct.unpack_from('>I', buf, stts[0] + 8 + i * 8)[0] for i in range(entry_count)
+        )
+    return track
+
+def parse_moov(buf, start, end):
+    """Technical video fields from the ``moov`` box spanning ``buf[start:end]``"""
+    fields = {'duration_seconds': None, 'width': None, 'height': None, 'fps': None, 'codec': None}
+
+    mvhd = _find(buf, start, end, b'mvhd')
+    if mvhd is not None:
+        timescale, duration = _timescale_duration(buf, mvhd[0], buf[mvhd[0]])
+        if timescale:
+            fields['duration_seconds'] = duration / timescale
+
+    for box_type, payload, box_end in _iter_boxes(buf, start, end):
+        if box_type != b'trak':
+            continue
+        track = _parse_track(buf, payload, box_end)
+        if track is None:
+            continue
+        fields['width'] = track.get('width') or None
+        fields['height'] = track.get('height') or None
+        fields['codec'] = track.get('codec')
+        timescale, duration = track.get('timescale'), track.get('duration')
+        if timescale and duration:
+            if fields['duration_seconds'] is None:
+                fields['duration_seconds'] = duration / timescale
+            if track.get('sample_count'):
+                fields['fps'] = round(track['sample_count'] * timescale / duration, 3)
+        break
+    return fields
+
+def _is_video_track(buf, start, end):
+    mdia = _find(buf, start, end, b'mdia')
+    hdlr = _find(buf, *mdia, b'hdlr') if mdia is not None else None
+    return hdlr is not None and buf[hdlr[0] + 8:hdlr[0] + 12] == b'vide'
+
+def _table(buf, box, fmt, header=8):
+    """Entries of a sample table box: a 32-bit count then fixed-size records"""
+    count = struct.unpack_from('>I', buf, box[0] + header - 4)[0]
+    width = len(fmt)
+    values = struct.unpack_from(f'>{count * width}{fmt[0]}' if width == 1 else '>' + fmt * count,
+                                buf, box[0] + header)
+    return [values[i:i + width] for i in range(0, len(values), width)] if width > 1 else list(values)
+
+def parse_keyframes(buf, start, end):
+    """Presentation times (seconds) and file offsets of the video track's sync samples.
+
+    Reads the sample tables of the ``moov`` box spanning ``buf[start:end]``.
+    Times are shifted by the first edit list entry like players do.
+    """
+    trak = next((
+        (payload, box_end) for box_type, payload, box_end in _iter_boxes(buf, start, end)
+        if box_type == b'trak' and _is_video_track(buf, payload, box_end)
+    ), None)
+    if trak is None:
+        raise UnsupportedContainer('No video track')
+    mdia = _find(buf, *trak, b'mdia')
+    mdhd = _find(buf, *mdia, b'mdhd')
+    timescale, _ = _timescale_duration(buf, mdhd[0], buf[mdhd[0]])
+    minf = _find(buf, *mdia, b'minf')
+    stbl = _find(buf, *minf, b'stbl') if minf is not None else None
+    if not timescale or stbl is None:
+        raise UnsupportedContainer('No sample tables')
+    boxes = {box_type: (payload, box_end) for box_type, payload, box_end in _iter_boxes(buf, *stbl)}
+    if b'stts' not in boxes or b'stsc' not in boxes or b'stsz' not in boxes:
+        raise UnsupportedContainer('Incomplete sample tables')
+
+    sample_size, sample_count = struct.unpack_from('>II', buf, boxes[b'stsz'][0] + 4)
+    if sample_count == 0:
+        # Fragmented MP4, the samples are described by moof boxes
+        raise UnsupportedContainer('No samples in moov')
+    sizes = _table(buf, boxes[b'stsz'], 'I', header=12) if sample_size == 0 else None
+    if b'stco' in boxes:
+        chunk_offsets = _table(buf, boxes[b'stco'], 'I')
+    elif b'co64' in boxes:
+        chunk_offsets = _table(buf, boxes[b'co64'], 'Q')
+    else:
+        raise UnsupportedContainer('No chunk offsets')
+    # Without stss every sample is a sync sample
+    sync = set(_table(buf, boxes[b'stss'], 'I')) if b'stss' in boxes else None
+
+    composition = []
+    if b'ctts' in boxes:
+        signed = buf[boxes[b'ctts'][0]] == 1
+        for count, offset in _table(buf, boxes[b'ctts'], 'Ii' if signed else 'II'):
+            composition.extend([offset] * count)
+
+    shift = 0
+    edts = _find(buf, *trak, b'edts')
+    elst = _find(buf, *edts, b'elst') if edts is not None else None
+    if elst is not None:
+        version = buf[elst[0]]
+        for entry in _table(buf, elst, 'Qqi' if version == 1 else 'Iii'):
+            if entry[1] != -1:
+                shift = entry[1]
+                break
+
+    # Decode time of every sample
+    decode_times, time = [], 0
+    for count, delta in _table(buf, boxes[b'stts'], 'II'):
+        for _ in range(count):
+            decode_times.append(time)
+            time += delta
+
+    times, offsets = [], []
+    runs = _table(buf, boxes[b'stsc'], 'III')
+    sample = 0  # 0-based sample number
+    for run, (first_chunk, samples_per_chunk, _) in enumerate(runs):
+        last_chunk = runs[run + 1][0] - 1 if run + 1 < len(runs) else len(chunk_offsets)
+        for chunk in range(first_chunk - 1, last_chunk):
+            offset = chunk_offsets[chunk]
+            for _ in range(samples_per_chunk):
+                if sample >= sample_count:
+                    break
+                if sync is None or sample + 1 in sync:
+                    dts = decode_times[sample] if sample < len(decode_times) else time
+                    cts = composition[sample] if sample < len(composition) else 0
+                    times.append(max(0, dts + cts - shift) / timescale)
+                    offsets.append(offset)
+                offset += sample_size or sizes[sample]
+                sample += 1
+    return times, offsets
+
+def parse_file(path):
+    """Technical ``Video`` fields of an MP4/MOV file.
+
+    Raises ``UnsupportedContainer`` for anything else, or when the file has
+    no ``moov`` box (e.g. an incomplete recording).
+    """
+    size = os.path.getsize(path)
+    if size < 8:
+        raise UnsupportedContainer('File too small')
+
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[4:8] not in LEADING_BOXES:
+                raise UnsupportedContainer('Not an ISO base media file')
+            try:
+                moov = _find(buf, 0, size, b'moov')
+                if moov is None:
+                    raise UnsupportedContainer('No moov box')
+                fields = parse_moov(buf, *moov)
+            except struct.error as e:
+                raise UnsupportedContainer(f'Malformed box: {e}')
+
+    if fields['width'] is None and fields['codec'] is None:
+        raise UnsupportedContainer('No video track')
+    duration = fields['duration_seconds']
+    fields['bitrate'] = int(size * 8 / duration) if duration else None
+    return fields
+
+def faststart_muxer(path):
+    """ffmpeg muxer to rewrite an MP4/MOV whose ``moov`` follows its media data.
+
+    Returns ``'mp4'`` or ``'mov'`` (QuickTime brand) when the file would
+    start playback faster with ``moov`` in front, ``None`` when it already
+    has it there or is not a complete MP4/MOV.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if len(buf) < 8 or buf[4:8] not in LEADING_BOXES:
+                return None
+            brand, seen_mdat = None, False
+            try:
+                for box_type, payload, _ in _iter_boxes(buf, 0, len(buf)):
+                    if box_type == b'ftyp':
+                        brand = bytes(buf[payload:payload + 4])
+                    elif box_type == b'mdat':
+                        seen_mdat = True
+                    elif box_type == b'moov':
+                        if not seen_mdat:
+                            return None
+                        return 'mov' if brand in (None, b'qt  ') else 'mp4'
+            except (UnsupportedContainer, struct.error):
+                return None
+    return None
+
+def keyframes_file(path):
+    """``(times, offsets)`` of the keyframes of an MP4/MOV file, see ``parse_keyframes``"""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if len(buf) < 8 or buf[4:8] not in LEADING_BOXES:
+                raise UnsupportedContainer('Not an ISO base media file')
+            try:
+                moov = _find(buf, 0, len(buf), b'moov')
+                if moov is None:
+                    raise UnsupportedContainer('No moov box')
+                return parse_keyframes(buf, *moov)
+            except struct.error as e:
+                raise UnsupportedContainer(f'Malformed box: {e}')
@@ -0,0 +1,34 @@
+"""Difference hashes (dHash) of frames, computed with NumPy a block at a time.
+
+A frame is shrunk to ``HASH_SIZE + 1`` x ``HASH_SIZE`` gray cells; bit ``i``
+of the hash is set when a cell is brighter than its left neighbour. Pictures
+that look alike get hashes a few bits apart, whatever their encoding,
+scaling or small exposure changes, so the Hamming distance between two
+hashes tells near-duplicates apart from different pictures.
+"""
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+def dhash(frames):
+    """64-bit difference hashes of a ``(n, height, width)`` uint8 array, as uint64.
+
+    ``height`` must be a multiple of ``HASH_SIZE`` and ``width`` of
+    ``HASH_SIZE + 1``; each cell is the mean of its block of pixels.
+    """
+    import numpy as np
+    count, height, width = frames.shape
+    cells = frames.reshape(count, HASH_SIZE, height // HASH_SIZE, HASH_SIZE + 1, width // (HASH_SIZE + 1)) \
+        .mean(axis=(2, 4))
+    bits = (cells[:, :, 1:] > cells[:, :, :-1]).reshape(count, HASH_BITS)
+    return np.packbits(bits, axis=1).view('>u8').reshape(count).astype(np.uint64)
+
+def hamming(hashes, value):
+    """Number of differing bits between each of ``hashes`` (uint64 array) and ``value``"""
+    import numpy as np
+    differences = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.uint64(value))
+    return np.unpackbits(differences.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def hash_hex(value):
+    """Fixed-width hex form of a hash, as stored on ``Frame.perceptual_hash``"""
+    return f'{int(value):016x}'
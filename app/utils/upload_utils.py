@@ -0,0 +1,98 @@
+import hashlib
+import mimetypes
+import os
+
+# Size of the blocks written to disk while an upload is streamed in
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+ALLOWED_VIDEO_EXTENSIONS = {'.mp4', '.mov', '.mkv', '.avi', '.webm'}
+
+def format_size(size_bytes):
+    """Human readable size used for the size_human columns"""
+    return f"{size_bytes / 1024 / 1024:.1f} MB"
+
+def build_video_metadata(upload_data):
+    """Video metadata stored from validated upload parameters"""
+    return {
+        'description': upload_data.get('description'),
+        'tags': upload_data.get('tags') or [],
+        'category': upload_data.get('category'),
+        'is_public': upload_data.get('is_public', False),
+        'allow_download': upload_data.get('allow_download', True),
+        'allow_streaming': upload_data.get('allow_streaming', True)
+    }
+
+def sniff_mimetype(head, filename=None):
+    """Detect a video MIME type from the first bytes of a file.
+
+    Falls back to the filename extension when the container is not recognised.
+    """
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return 'video/quicktime'
+        return 'video/mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        # EBML header, the DocType tells WebM and Matroska apart
+        return 'video/webm' if b'webm' in head[:64] else 'video/x-matroska'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video/x-msvideo'
+    if filename:
+        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return 'application/octet-stream'
+
+class HashingFileWriter:
+    """File object that hashes, counts and sniffs bytes while writing them.
+
+    Used as the werkzeug stream factory for uploads so the request body goes
+    straight to its final location in a single pass with constant memory.
+    """
+
+    SNIFF_BYTES = 64
+
+    def __init__(self, path, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.path = path
+        self.size_bytes = 0
+        self._sha256 = hashlib.sha256()
+        self._head = b''
+        self._file = open(path, 'w+b', buffering=chunk_size)
+
+    def write(self, data):
+        if len(self._head) < self.SNIFF_BYTES:
+            self._head += bytes(data[:self.SNIFF_BYTES - len(self._head)])
+        self._sha256.update(data)
+        self.size_bytes += len(data)
+        return self._file.write(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    @property
+    def checksum(self):
+        return self._sha256.hexdigest()
+
+    def mimetype(self, filename=None):
+        return sniff_mimetype(self._head, filename)
+
+    def discard(self):
+        """Close the file and remove whatever was written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,139 @@
+"""Stored ZIP archives streamed straight from their member files.
+
+Every member is stored (method 0): the archive is the members' bytes with a
+local header in front of each and the central directory at the end. When the
+CRC-32 and size of every member are known up front, all headers can be
+written before any member is read. That means the total length is known
+before the first byte is sent, and any byte range of the archive can be
+produced without building the archive on disk. Archives over 4GB or with more
+than 65535 members get the ZIP64 records.
+"""
+from bisect import bisect_right
+import struct
+import zlib
+
+READ_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_OF_CENTRAL_DIR = struct.Struct('<IHHHHIIH')
+ZIP64_END_OF_CENTRAL_DIR = struct.Struct('<IQHHIIQQQQ')
+ZIP64_LOCATOR = struct.Struct('<IIQI')
+
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP32_COUNT_LIMIT = 0xFFFF
+UTF8_NAMES = 0x800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+UNIX_FILE_ATTRIBUTES = (0o100644 << 16)
+
+def file_crc32(path, chunk_size=READ_CHUNK_SIZE):
+    """CRC-32 of a file as stored in ZIP headers"""
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+def _dos_datetime(moment):
+    """DOS ``(time, date)`` of a datetime (2-second resolution, 1980 at the earliest)"""
+    if moment is None or moment.year < 1980:
+        return 0, (1 << 5) | 1
+    return ((moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+            ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day)
+
+class ZipStream:
+    """Byte layout of a stored ZIP archive of local files.
+
+    ``members`` are ``(name, path, offset, size, crc32, modified)`` tuples,
+    the member being ``size`` bytes of ``path`` from ``offset``. ``size`` is
+    the exact length of the archive, ``iter_range`` yields any part of it.
+    """
+
+    def __init__(self, members):
+        self._starts = []
+        self._segments = []
+        central = []
+        offset = 0
+        for name, path, member_offset, size, crc, modified in members:
+            encoded = name.encode()
+            flags = 0 if encoded.isascii() else UTF8_NAMES
+            dos_time, dos_date = _dos_datetime(modified)
+
+            # Sizes move to the ZIP64 extra field when they do not fit
+            large = size >= ZIP32_LIMIT
+            local_extra = struct.pack('<HHQQ', 0x0001, 16, size, size) if large else b''
+            version = VERSION_ZIP64 if large else VERSION_DEFAULT
+            stored_size = ZIP32_LIMIT if large else size
+            local = LOCAL_HEADER.pack(
+                0x04034b50, version, flags, 0, dos_time, dos_date,
+                crc, stored_size, stored_size, len(encoded), len(local_extra)
+            ) + encoded + local_extra
+            self._add(offset, local)
+            header_offset = offset
+            offset += len(local)
+            if size:
+                self._add(offset, (path, member_offset, size))
+                offset += size
+
+            zip64_fields = [size, size] if large else []
+            if header_offset >= ZIP32_LIMIT:
+                zip64_fields.append(header_offset)
+            central_extra = b''
+            if zip64_fields:
+                central_extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001,
+                                            8 * len(zip64_fields), *zip64_fields)
+                version = VERSION_ZIP64
+            central.append(CENTRAL_HEADER.pack(
+                0x02014b50, version, version, flags, 0, dos_time, dos_date,
+                crc, stored_size, stored_size, len(encoded), len(central_extra), 0,
+                0, 0, UNIX_FILE_ATTRIBUTES, min(header_offset, ZIP32_LIMIT)
+            ) + encoded + central_extra)
+
+        directory = b''.join(central)
+        directory_offset, directory_size, count = offset, len(directory), len(central)
+        tail = []
+        if count >= ZIP32_COUNT_LIMIT or directory_offset >= ZIP32_LIMIT or directory_size >= ZIP32_LIMIT:
+            zip64_end_offset = directory_offset + directory_size
+            tail.append(ZIP64_END_OF_CENTRAL_DIR.pack(
+                0x06064b50, ZIP64_END_OF_CENTRAL_DIR.size - 12, VERSION_ZIP64, VERSION_ZIP64,
+                0, 0, count, count, directory_size, directory_offset
+            ))
+            tail.append(ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1))
+        tail.append(END_OF_CENTRAL_DIR.pack(
+            0x06054b50, 0, 0, min(count, ZIP32_COUNT_LIMIT), min(count, ZIP32_COUNT_LIMIT),
+            min(directory_size, ZIP32_LIMIT), min(directory_offset, ZIP32_LIMIT), 0
+        ))
+        self._add(offset, directory + b''.join(tail))
+        self.size = offset + directory_size + sum(len(part) for part in tail)
+
+    def _add(self, offset, segment):
+        self._starts.append(offset)
+        self._segments.append(segment)
+
+    def iter_range(self, start, length, chunk_size=READ_CHUNK_SIZE):
+        """Yield ``length`` bytes of the archive from ``start``"""
+        index = max(bisect_right(self._starts, start) - 1, 0)
+        position, remaining = start, min(length, self.size - start)
+        while remaining > 0:
+            segment = self._segments[index]
+            skip = position - self._starts[index]
+            if isinstance(segment, bytes):
+                data = segment[skip:skip + remaining]
+                yield data
+                position += len(data)
+                remaining -= len(data)
+            else:
+                path, member_offset, size = segment
+                todo = min(size - skip, remaining)
+                with open(path, 'rb') as f:
+                    f.seek(member_offset + skip)
+                    while todo > 0:
+                        data = f.read(min(chunk_size, todo))
+                        if not data:
+                            raise IOError(f'{path} is shorter than recorded')
+                        yield data
+                        todo -= len(data)
+                        position += len(data)
+                        remaining -= len(data)
+            index += 1
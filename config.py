@@ -19,6 +19,20 @@ class Config:
     ESCALATE_AFTER_SECONDS = int(os.environ.get('ESCALATE_AFTER_SECONDS', '900'))  # 15 minutes
     CLOSE_AFTER_SECONDS = int(os.environ.get('CLOSE_AFTER_SECONDS', '3600'))  # 1 hour
     
+    # Background job configuration (app/services/scheduler.py)
+    UPLOAD_PURGE_INTERVAL_MINUTES = int(os.environ.get('UPLOAD_PURGE_INTERVAL_MINUTES', '15'))
+    
+    # Stale job recovery: work not finished after this long was lost with its worker and is requeued
+    PROBE_STALE_SECONDS = int(os.environ.get('PROBE_STALE_SECONDS', '300'))  # Videos stuck in processing
+    TRANSCODE_STALE_SECONDS = int(os.environ.get('TRANSCODE_STALE_SECONDS', '600'))  # Renditions
+    FRAME_BATCH_STALE_SECONDS = int(os.environ.get('FRAME_BATCH_STALE_SECONDS', '300'))  # Frame batches
+    
+    # Cache eviction: HLS packages unwatched for this long, other caches least recently used first
+    HLS_CACHE_MAX_IDLE_SECONDS = int(os.environ.get('HLS_CACHE_MAX_IDLE_SECONDS', str(7 * 24 * 3600)))
+    PROXY_CACHE_MAX_BYTES = int(os.environ.get('PROXY_CACHE_MAX_BYTES', str(20 * 1024 ** 3)))
+    SNAPSHOT_CACHE_MAX_BYTES = int(os.environ.get('SNAPSHOT_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+    FRAME_VARIANT_CACHE_MAX_BYTES = int(os.environ.get('FRAME_VARIANT_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+    
     # Alternate channels configuration
     ALT_CHANNELS_FILE = os.environ.get('ALT_CHANNELS_FILE', 'alternate_channels.json')
     
@@ -0,0 +1,51 @@
+"""Add transcoded renditions
+
+Revision ID: add_renditions
+Revises: segments_unique_index
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_renditions'
+down_revision = 'segments_unique_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('renditions',
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('video_bitrate', sa.Integer(), nullable=False),
+    sa.Column('audio_bitrate', sa.Integer(), nullable=False),
+    sa.Column('codec', sa.String(length=50), nullable=False),
+    sa.Column('playlist_path', sa.String(length=500), nullable=True),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('status', sa.Enum('QUEUED', 'PROCESSING', 'READY', 'ERROR', name='renditionstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('processing_started_at', sa.DateTime(), nullable=True),
+    sa.Column('processing_completed_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('checksum', 'name', name='uq_renditions_checksum_name')
+    )
+    with op.batch_alter_table('renditions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_renditions_checksum'), ['checksum'], unique=False)
+        batch_op.create_index('ix_renditions_status_updated_at', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('renditions', schema=None) as batch_op:
+        batch_op.drop_index('ix_renditions_status_updated_at')
+        batch_op.drop_index(batch_op.f('ix_renditions_checksum'))
+
+    op.drop_table('renditions')
@@ -0,0 +1,41 @@
+"""Add content-addressable video blobs with reference counts
+
+Revision ID: add_video_blobs
+Revises: videos_checksum_non_unique
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_video_blobs'
+down_revision = 'videos_checksum_non_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('video_blobs',
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('stored_path', sa.String(length=500), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('checksum')
+    )
+
+    # Existing files keep their flat paths, they are tracked from now on
+    op.execute(
+        "INSERT INTO video_blobs (checksum, stored_path, size_bytes, ref_count, created_at, updated_at) "
+        "SELECT checksum, MIN(stored_path), MAX(size_bytes), COUNT(*), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM videos GROUP BY checksum"
+    )
+
+
+def downgrade():
+    op.drop_table('video_blobs')
@@ -0,0 +1,28 @@
+"""Perceptual hash and near-duplicate flag on frames
+
+Revision ID: frames_perceptual_hash
+Revises: frames_search_indexes
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'frames_perceptual_hash'
+down_revision = 'frames_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('frames', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('perceptual_hash', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('is_duplicate', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('frames', schema=None) as batch_op:
+        batch_op.drop_column('is_duplicate')
+        batch_op.drop_column('perceptual_hash')
@@ -0,0 +1,34 @@
+"""Composite indexes for frame search and keyset pagination
+
+Revision ID: frames_search_indexes
+Revises: video_blobs_original_checksum
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'frames_search_indexes'
+down_revision = 'video_blobs_original_checksum'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('frames', schema=None) as batch_op:
+        batch_op.create_index('ix_frames_video_id_offset_seconds', ['video_id', 'offset_seconds', 'id'], unique=False)
+        batch_op.create_index('ix_frames_video_id_created_at', ['video_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_frames_batch_id_batch_index', ['batch_id', 'batch_index', 'id'], unique=False)
+        batch_op.create_index('ix_frames_project_id_created_at', ['project_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_frames_created_at', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('frames', schema=None) as batch_op:
+        batch_op.drop_index('ix_frames_created_at')
+        batch_op.drop_index('ix_frames_project_id_created_at')
+        batch_op.drop_index('ix_frames_batch_id_batch_index')
+        batch_op.drop_index('ix_frames_video_id_created_at')
+        batch_op.drop_index('ix_frames_video_id_offset_seconds')
@@ -0,0 +1,26 @@
+"""Make segment indexes unique per video
+
+Revision ID: segments_unique_index
+Revises: add_video_blobs
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'segments_unique_index'
+down_revision = 'add_video_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('segments', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_segments_video_id_segment_index', ['video_id', 'segment_index'])
+
+
+def downgrade():
+    with op.batch_alter_table('segments', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_segments_video_id_segment_index', type_='unique')
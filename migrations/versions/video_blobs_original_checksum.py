@@ -0,0 +1,30 @@
+"""Remember the checksum of content before faststart normalization
+
+Revision ID: video_blobs_original_checksum
+Revises: add_renditions
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'video_blobs_original_checksum'
+down_revision = 'add_renditions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('video_blobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('original_checksum', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('original_size_bytes', sa.BigInteger(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_video_blobs_original_checksum'), ['original_checksum'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('video_blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_video_blobs_original_checksum'))
+        batch_op.drop_column('original_size_bytes')
+        batch_op.drop_column('original_checksum')
@@ -0,0 +1,28 @@
+"""Allow several videos to share content by checksum
+
+Revision ID: videos_checksum_non_unique
+Revises: add_upload_sessions
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'videos_checksum_non_unique'
+down_revision = 'add_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.create_index('ix_videos_checksum', ['checksum'], unique=False)
+        batch_op.drop_constraint('checksum', type_='unique')
+
+
+def downgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.create_unique_constraint('checksum', ['checksum'])
+        batch_op.drop_index('ix_videos_checksum')
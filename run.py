@@ -5,7 +5,7 @@ from app.services.scheduler import start_scheduler
 app = create_app()
 
 # Start the background scheduler for message processing
-start_scheduler()
+start_scheduler(app)
 
 @app.shell_context_processor
 def make_shell_context():
@@ -0,0 +1,19 @@
+import pytest
+
+from app import create_app, db
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        FRAMES_DIR=str(tmp_path / 'frames'),
+        VIDEO_STORE_DIR=str(tmp_path / 'videos'),
+    )
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,64 @@
+import http.client
+import os
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from app import db
+from app.models import Frame, Video
+from app.models.frame import FrameType
+from app.services import frame_pack
+
+@pytest.fixture
+def server(app):
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+
+def add_frame(file_path, size):
+    video = Video(filename='v.mp4', original_filename='v.mp4', stored_name='v.mp4', stored_path='/v.mp4',
+                  mimetype='video/mp4', size_bytes=1, size_human='1 B', checksum='0' * 64)
+    db.session.add(video)
+    db.session.flush()
+    frame = Frame(frame_type=FrameType.BATCH, filename='frame_000001.jpg', file_path=file_path,
+                  offset_seconds=1.0, file_size=size, video_id=video.id)
+    db.session.add(frame)
+    db.session.commit()
+    return frame.id
+
+def get(server, path):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.status, response.headers, response.read()
+
+def test_packed_frame_through_wsgi_server(app, server, tmp_path):
+    frames = [b'\xff\xd8first\xff\xd9', b'\xff\xd8second frame\xff\xd9']
+    writer = frame_pack.FramePackWriter(str(tmp_path / 'pack'))
+    writer.append(frames)
+    writer.close()
+    with app.app_context():
+        frame_id = add_frame(frame_pack.pack_ref(writer.pack_path, 1), len(frames[1]))
+
+    for path in (f'/api/v2/frames/{frame_id}/image', f'/api/v2/frames/{frame_id}/download'):
+        status, headers, body = get(server, path)
+        assert status == 200
+        assert headers['Content-Type'] == 'image/jpeg'
+        assert body == frames[1]
+        assert int(headers['Content-Length']) == len(frames[1])
+
+def test_frame_file_through_wsgi_server(app, server, tmp_path):
+    data = b'\xff\xd8plain frame\xff\xd9'
+    path = tmp_path / 'frame_000001.jpg'
+    path.write_bytes(data)
+    with app.app_context():
+        frame_id = add_frame(str(path), len(data))
+
+    status, _, body = get(server, f'/api/v2/frames/{frame_id}/image')
+    assert (status, body) == (200, data)
+    os.remove(path)
+    status, _, _ = get(server, f'/api/v2/frames/{frame_id}/image')
+    assert status == 404
@@ -0,0 +1,25 @@
+from app import db
+from app.models import Video
+from app.models.rendition import Rendition, RenditionStatus
+
+def test_variant_without_a_width(app):
+    with app.app_context():
+        # The source's width is unknown, the rendition's is not
+        video = Video(filename='v.mp4', original_filename='v.mp4', stored_name='v.mp4', stored_path='/v.mp4',
+                      mimetype='video/mp4', size_bytes=1, size_human='1 B', checksum='0' * 64,
+                      codec='h264', height=240, bitrate=100000)
+        rendition = Rendition(checksum='0' * 64, name='240p', width=320, height=240,
+                              video_bitrate=60000, audio_bitrate=35800, status=RenditionStatus.READY)
+        db.session.add_all([video, rendition])
+        db.session.commit()
+        video_id = video.id
+        assert rendition.bandwidth == 100000
+
+    response = app.test_client().get(f'/api/v2/videos/{video_id}/hls/master.m3u8')
+
+    assert response.status_code == 200
+    lines = response.data.decode().splitlines()
+    assert lines[0] == '#EXTM3U'
+    assert '#EXT-X-STREAM-INF:BANDWIDTH=100000' in lines
+    assert '#EXT-X-STREAM-INF:BANDWIDTH=100000,RESOLUTION=320x240' in lines
+    assert {'index.m3u8', '240p/index.m3u8'} <= set(lines)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from app import db
+from app.models import Project
+
+def test_change_within_the_same_second_changes_the_etag(app):
+    stamp = datetime(2024, 1, 1, 12, 0, 0)
+    with app.app_context():
+        project = Project(name='before', owner_id=1, updated_at=stamp)
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+
+    client = app.test_client()
+    first = client.get(f'/api/v2/projects/{project_id}')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get(f'/api/v2/projects/{project_id}', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        # MySQL keeps DATETIME to the second: the stamp is unchanged after the update
+        db.session.execute(
+            Project.__table__.update().where(Project.id == project_id).values(name='after', updated_at=stamp)
+        )
+        db.session.commit()
+
+    second = client.get(f'/api/v2/projects/{project_id}', headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.json['data']['name'] == 'after'
+    assert second.headers['ETag'] != etag
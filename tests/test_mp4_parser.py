@@ -0,0 +1,33 @@
+import struct
+
+import pytest
+
+from app.utils.mp4_parser import parse_moov
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+def tkhd(version, width, height):
+    """Track header with the display size in 16.16 fixed point"""
+    times = struct.pack('>QQIIQ', 0, 0, 1, 0, 0) if version == 1 else struct.pack('>IIIII', 0, 0, 1, 0, 0)
+    matrix = struct.pack('>9I', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    payload = (bytes([version, 0, 0, 3]) + times + bytes(8) + struct.pack('>hhhH', 0, 0, 0, 0)
+               + matrix + struct.pack('>II', width << 16, height << 16))
+    return box(b'tkhd', payload)
+
+def video_moov(track_header):
+    """moov with one video track whose sample entry has no coded size"""
+    hdlr = box(b'hdlr', bytes(8) + b'vide' + bytes(12) + b'\0')
+    mdhd = box(b'mdhd', bytes(4) + struct.pack('>IIIIHH', 0, 0, 1000, 10000, 0, 0))
+    entry = struct.pack('>I4s', 86, b'avc1') + bytes(6) + struct.pack('>H', 1) + bytes(16) + struct.pack('>HH', 0, 0) + bytes(50)
+    stsd = box(b'stsd', bytes(4) + struct.pack('>I', 1) + entry)
+    stbl = box(b'stbl', stsd)
+    mdia = box(b'mdia', mdhd + hdlr + box(b'minf', stbl))
+    return box(b'moov', box(b'trak', track_header + mdia))
+
+@pytest.mark.parametrize('version', [0, 1])
+def test_tkhd_display_size(version):
+    moov = video_moov(tkhd(version, 1920, 1080))
+    fields = parse_moov(moov, 8, len(moov))
+    assert (fields['width'], fields['height']) == (1920, 1080)
+    assert fields['codec'] == 'h264'
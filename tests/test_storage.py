@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from app.services import storage
+from app.services.storage import LocalStorageBackend, S3StorageBackend, StorageBackend
+
+moto = pytest.importorskip('moto')
+
+BUCKET = 'videos'
+PART_SIZE = 5 * 1024 * 1024
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        backend = S3StorageBackend(BUCKET, prefix='content', region='us-east-1',
+                                   part_size=PART_SIZE, max_concurrency=4)
+        backend.client.create_bucket(Bucket=BUCKET)
+        yield backend
+
+def write_file(path, size):
+    data = os.urandom(size)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
+
+def test_backends_must_implement_the_interface():
+    class Partial(StorageBackend):
+        def exists(self, location):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_small_file_is_one_put(s3, tmp_path):
+    data = write_file(tmp_path / 'small', 1000)
+    location = s3.put_file('ab/cd/small', str(tmp_path / 'small'))
+
+    assert location == f's3://{BUCKET}/content/ab/cd/small'
+    assert not (tmp_path / 'small').exists()
+    assert s3.exists(location) and s3.size(location) == 1000
+    assert b''.join(s3.iter_range(location)) == data
+    assert '-' not in s3.client.head_object(Bucket=BUCKET, Key='content/ab/cd/small')['ETag']
+
+def test_large_file_is_a_multipart_upload(s3, tmp_path):
+    data = write_file(tmp_path / 'large', 2 * PART_SIZE + 123)
+    location = s3.put_file('ab/cd/large', str(tmp_path / 'large'))
+
+    head = s3.client.head_object(Bucket=BUCKET, Key='content/ab/cd/large')
+    # Multipart objects have an ETag ending in their number of parts
+    assert head['ETag'].strip('"').endswith('-3')
+    assert head['ContentLength'] == len(data)
+    assert b''.join(s3.iter_range(location)) == data
+    assert not s3.client.list_multipart_uploads(Bucket=BUCKET).get('Uploads')
+
+def test_failed_part_aborts_the_upload(s3, tmp_path, monkeypatch):
+    write_file(tmp_path / 'large', 2 * PART_SIZE)
+    upload_part = s3.client.upload_part
+
+    def failing_upload_part(**kwargs):
+        if kwargs['PartNumber'] == 2:
+            raise ConnectionError('connection reset')
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(s3.client, 'upload_part', failing_upload_part)
+    with pytest.raises(ConnectionError):
+        s3.put_file('ab/cd/large', str(tmp_path / 'large'))
+
+    assert not s3.client.list_multipart_uploads(Bucket=BUCKET).get('Uploads')
+    assert not s3.exists(f's3://{BUCKET}/content/ab/cd/large')
+    assert (tmp_path / 'large').exists()
+
+def test_ranged_reads(s3, tmp_path):
+    data = write_file(tmp_path / 'file', 3000)
+    location = s3.put_file('ab/cd/file', str(tmp_path / 'file'))
+
+    assert b''.join(s3.iter_range(location, 100, 50)) == data[100:150]
+    assert b''.join(s3.iter_range(location, 2990)) == data[2990:]
+    assert b''.join(s3.iter_range(location, 0, 3000, chunk_size=512)) == data
+    assert list(s3.iter_range(location, 10, 0)) == []
+
+def test_missing_object(s3):
+    location = f's3://{BUCKET}/content/missing'
+    assert not s3.exists(location)
+    s3.delete(location)
+
+def test_storage_for_dispatches_on_the_location(app, s3, monkeypatch):
+    monkeypatch.setattr(storage, '_backends', {'s3': s3})
+    with app.app_context():
+        app.config['STORAGE_BACKEND'] = 'local'
+        local = storage.storage_for(os.path.join(app.config['VIDEO_STORE_DIR'], 'ab', 'cd', 'x'))
+        assert isinstance(local, LocalStorageBackend)
+        assert local.root == app.config['VIDEO_STORE_DIR']
+        assert storage.get_storage() is local
+
+        assert storage.storage_for(f's3://{BUCKET}/content/ab/cd/x') is s3
+        app.config['STORAGE_BACKEND'] = 's3'
+        assert storage.get_storage() is s3
+
+def test_s3_backend_is_built_from_config(app, monkeypatch):
+    monkeypatch.setattr(storage, '_backends', {})
+    app.config.update(S3_BUCKET=BUCKET, S3_PREFIX='/content/', S3_REGION='us-east-1',
+                      S3_MULTIPART_CHUNK_SIZE=1024, S3_MAX_CONCURRENCY=2)
+    with app.app_context():
+        backend = storage.storage_for(f's3://{BUCKET}/content/x')
+    assert isinstance(backend, S3StorageBackend)
+    assert (backend.bucket, backend.prefix, backend.max_concurrency) == (BUCKET, 'content', 2)
+    # Parts are never smaller than the S3 minimum
+    assert backend.part_size == PART_SIZE